@@ -1,19 +1,28 @@
 # --- Imports ---
 
 # Standard
-from io import BytesIO
 import logging
+import os
 import random
+import re
+import select
+import socket
+import struct
 import sys
-from time import sleep
+import threading
+from time import monotonic, sleep
+from xml.etree import ElementTree
 
 # Third party
-from PIL import Image
+import cv2
+import numpy as np
 from ppadb.client import Client as AdbClient
 from ppadb.device import Device as AdbDevice
-import pyautogui
 from pyscreeze import Box, center
 
+# Local
+from sprites import SpriteBank
+
 
 # --- Global Configuration ---
 
@@ -30,6 +39,22 @@ DEFAULT_ADB_CLIENT_IP = '127.0.0.1'
 DEFAULT_ADB_LISTEN_PORT = 5037
 DEFAULT_ADB_PUSH_DEST_FILE_NAME = 'image.png'
 DEFAULT_ADB_PUSH_DEST_FOLDER = '/sdcard/adb-push-files/'
+DEFAULT_ADB_STAGING_FOLDER = '/sdcard/adb-push-files/.staging/' # hidden from gallery
+DEFAULT_ADB_SHELL_TIMEOUT = 30 # seconds
+DEFAULT_APP_LAUNCH_TIMEOUT = 20 # seconds
+DEFAULT_ELEMENT_LOCATOR = 'uiautomator'
+ELEMENT_LOCATORS = ['uiautomator', 'sprite']
+DEFAULT_INPUT_FOCUS_WAIT_TIME = 0.2 # seconds
+DEFAULT_TAP_RESPONSE_TIMEOUT = 3 # seconds
+DEFAULT_UI_DUMP_FILE = '/sdcard/window_dump.xml'
+DEFAULT_WAIT_TIMEOUT = 10 # seconds
+DEFAULT_WAIT_MIN_INTERVAL = 0.05 # seconds
+DEFAULT_WAIT_MAX_INTERVAL = 1 # seconds
+DEFAULT_WAIT_BACKOFF = 1.5
+ADB_SHELL_MARKER = '__ISOPB_DONE_{}__'
+DEFAULT_SCREENCAP_BACKEND = 'raw'
+SCREENCAP_BACKENDS = ['raw', 'png']
+SCREENCAP_RAW_FORMATS = [1, 2] # RGBA_8888, RGBX_8888
 SPRITE_ADDSTICKER = './resources/sprites/addsticker.png'
 SPRITE_ADDTOSTORY = './resources/sprites/addtostory.png'
 SPRITE_CLOSEFRIENDS = './resources/sprites/closefriends.png'
@@ -44,9 +69,56 @@ SPRITE_RECENTS = './resources/sprites/recents.png'
 SPRITE_SEARCHFIELD = './resources/sprites/searchfield.png'
 SPRITE_URLFIELD = './resources/sprites/urlfield.png'
 SPRITE_YOURSTORY = './resources/sprites/yourstory.png'
-
-# Pyautogui's setup
-pyautogui.useImageNotFoundException(True)
+SPRITES = [SPRITE_ADDSTICKER,
+           SPRITE_ADDTOSTORY,
+           SPRITE_CLOSEFRIENDS,
+           SPRITE_CUSTOMIZESTICKERTEXT,
+           SPRITE_DONE,
+           SPRITE_LINKSTICKER_BLACK,
+           SPRITE_LINKSTICKER_BLUE,
+           SPRITE_LINKSTICKER_COLOURED,
+           SPRITE_LINKSTICKER_WHITE,
+           SPRITE_LINKSTICKER,
+           SPRITE_RECENTS,
+           SPRITE_SEARCHFIELD,
+           SPRITE_URLFIELD,
+           SPRITE_YOURSTORY]
+LINKSTICKER_COLORS = [SPRITE_LINKSTICKER_BLACK,
+                      SPRITE_LINKSTICKER_BLUE,
+                      SPRITE_LINKSTICKER_COLOURED,
+                      SPRITE_LINKSTICKER_WHITE]
+SPRITE_REGIONS = { # (left, top, right, bottom), as fractions of screen size
+    SPRITE_ADDSTICKER: (0, 0, 1, 0.2),
+    SPRITE_ADDTOSTORY: (0, 0, 1, 0.4),
+    SPRITE_CLOSEFRIENDS: (0, 0.8, 1, 1),
+    SPRITE_DONE: (0.5, 0, 1, 0.5),
+    SPRITE_RECENTS: (0, 0, 1, 0.5),
+    SPRITE_SEARCHFIELD: (0, 0, 1, 0.5),
+    SPRITE_YOURSTORY: (0, 0.8, 1, 1),
+}
+UI_EXCLUDED_NODES = { # node attribute matches (case insensitive) never taken for a sprite
+    SPRITE_LINKSTICKER: [{'class': 'android.widget.EditText'}, # search field typed "link" into
+                         {'focused': 'true'}],
+}
+UI_BOUNDS_PATTERN = re.compile(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]')
+UI_SELECTORS = { # alternative node attribute matches (case insensitive), per sprite
+    SPRITE_ADDSTICKER: [{'content-desc': 'Add sticker'},
+                        {'content-desc': 'Stickers'}],
+    SPRITE_ADDTOSTORY: [{'content-desc': 'Add to story'}],
+    SPRITE_CLOSEFRIENDS: [{'text': 'Close Friends'},
+                          {'content-desc': 'Close Friends'}],
+    SPRITE_CUSTOMIZESTICKERTEXT: [{'text': 'Customize sticker text'}],
+    SPRITE_DONE: [{'text': 'Done'},
+                  {'content-desc': 'Done'}],
+    SPRITE_LINKSTICKER: [{'content-desc': 'Link sticker'},
+                         {'text': 'LINK'}],
+    SPRITE_RECENTS: [{'text': 'Recents'}],
+    SPRITE_SEARCHFIELD: [{'resource-id': 'com.instagram.android:id/row_search_edit_text'},
+                         {'class': 'android.widget.EditText', 'text': 'Search'}],
+    SPRITE_URLFIELD: [{'class': 'android.widget.EditText', 'text': 'URL'}],
+    SPRITE_YOURSTORY: [{'text': 'Your story'},
+                       {'content-desc': 'Your story'}],
+}
 
 
 # --- The Device class ---
@@ -62,7 +134,10 @@ class Device:
                  device_id:str,
                  device_screen_width:int,
                  device_screen_height:int,
-                 device_name:str
+                 device_name:str,
+                 screencap_backend:str = DEFAULT_SCREENCAP_BACKEND,
+                 sprite_bank:SpriteBank|None = None,
+                 element_locator:str = DEFAULT_ELEMENT_LOCATOR
                  ):
         
         # Instance logger setup
@@ -98,6 +173,16 @@ class Device:
         if not device_name:
             raise ValueError("Missing device name.")
 
+        # Validate screencap backend
+        if screencap_backend not in SCREENCAP_BACKENDS:
+            raise ValueError(f'Invalid screencap backend "{screencap_backend}". '\
+                             f'Valid backends: {SCREENCAP_BACKENDS}.')
+
+        # Validate element locator
+        if element_locator not in ELEMENT_LOCATORS:
+            raise ValueError(f'Invalid element locator "{element_locator}". '\
+                             f'Valid locators: {ELEMENT_LOCATORS}.')
+
         # Set object attributes
         self.client_ip = client_ip
         self.client_port = client_port
@@ -106,6 +191,14 @@ class Device:
         self.device_screen_width = device_screen_width
         self.device_screen_height = device_screen_height
         self.device_name = device_name
+        self.screencap_backend = screencap_backend
+        self.sprite_bank = sprite_bank or SpriteBank.get(sprite_paths=SPRITES)
+        self.shell_session = ShellSession(device_adb=device_adb)
+        self.element_locator = element_locator
+        self._ui_hierarchy = None # cached until next shell command
+        self._unreliable_ui_selectors = set()
+        self._staging_folders = set()
+        self._posted_images = []
 
 
     # __str__
@@ -125,7 +218,9 @@ class Device:
     def get(cls,
             device_name:str = 'Android phone',
             client_ip:str = DEFAULT_ADB_CLIENT_IP,
-            listen_port:int = DEFAULT_ADB_LISTEN_PORT
+            listen_port:int = DEFAULT_ADB_LISTEN_PORT,
+            screencap_backend:str = DEFAULT_SCREENCAP_BACKEND,
+            element_locator:str = DEFAULT_ELEMENT_LOCATOR
             ):
         # TODO Add a docstring
 
@@ -146,32 +241,63 @@ class Device:
         except IndexError:
             _get_logger.error(f'Failed. No devices found at {client_ip}:{listen_port}.', exc_info=False)
             sys.exit()
-        else:
-            device_id = device_adb.serial
-            _get_logger.debug(f'Connected to device '\
-                              f'with serial number "{device_id}". '\
-                              f'Named device as "{device_name}".')
 
-        # Get device's screen width and height
-        _get_logger.debug(f"Getting device screen resolution ...")
-        screen_size = device_adb.shell('wm size') # returns: 'Physical size: [width]x[height]'
-        screen_size = screen_size.replace('Physical size: ', '') # returns: '[width]x[height]'
-        screen_width, screen_height = screen_size.split(sep='x') # returns: ('[width]', '[height]')
-        screen_width = int(screen_width)
-        screen_height = int(screen_height)
-        _get_logger.debug(f"Device screen resolution: {screen_width} by {screen_height} pixels.")
+        # Return Device object
+        return cls._get_from_adb_device(device_adb=device_adb,
+                                        device_name=device_name,
+                                        client_ip=client_ip,
+                                        listen_port=listen_port,
+                                        screencap_backend=screencap_backend,
+                                        element_locator=element_locator)
 
-        _get_logger.info(f'Connected to android device "{device_name}" ("{device_id}") at {client_ip}:{listen_port}.')
 
-        # Return Device object
-        return cls(client_ip=client_ip,
-                   client_port=listen_port,
-                   device_adb=device_adb,
-                   device_id=device_id,
-                   device_screen_width=screen_width,
-                   device_screen_height=screen_height,
-                   device_name=device_name,
-                   )
+    # Get all Devices
+    @classmethod
+    def get_all(cls,
+                device_name:str = 'Android phone',
+                client_ip:str = DEFAULT_ADB_CLIENT_IP,
+                listen_port:int = DEFAULT_ADB_LISTEN_PORT,
+                screencap_backend:str = DEFAULT_SCREENCAP_BACKEND,
+                element_locator:str = DEFAULT_ELEMENT_LOCATOR,
+                max_devices:int|None = None
+                ) -> list:
+        """
+        Connects to every android device attached to the adb server (up to
+        max_devices, if set), each with its own screen resolution, logger
+        and shell session. Devices are named after device_name and their
+        position in adb's device list (e.g. "Android phone 1").
+        Returns a list of Device objects.
+        """
+
+        # Logger set up
+        _get_all_logger = logging.getLogger(__name__).getChild(cls.__name__).getChild('get_all')
+
+        _get_all_logger.info(f'Connecting to android devices at {client_ip}:{listen_port}...')
+
+        # Connect to adb client
+        _get_all_logger.debug(f'Connecting to ADB client at {client_ip}:{listen_port}...')
+        client = AdbClient(host=client_ip, port=listen_port)
+        _get_all_logger.debug(f'Connected to ADB client (version: {client.version()}).')
+
+        # List available adb devices
+        devices_adb = client.devices()[:max_devices]
+        if not devices_adb:
+            _get_all_logger.error(f'Failed. No devices found at {client_ip}:{listen_port}.', exc_info=False)
+            sys.exit()
+        _get_all_logger.debug(f'Found {len(devices_adb)} android devices.')
+
+        # Get a Device object per adb device
+        devices = [cls._get_from_adb_device(device_adb=device_adb,
+                                            device_name=f'{device_name} {index+1}',
+                                            client_ip=client_ip,
+                                            listen_port=listen_port,
+                                            screencap_backend=screencap_backend,
+                                            element_locator=element_locator)
+                   for index, device_adb in enumerate(devices_adb)]
+        _get_all_logger.info(f'Connected to {len(devices)} android devices.')
+
+        # Return Device objects
+        return devices
 
 
     # Post Instagram Story
@@ -182,100 +308,225 @@ class Device:
                              close_friends_only:bool = True,
                              test_call:bool = False,
                              adb_push_dest_file_name:str = DEFAULT_ADB_PUSH_DEST_FILE_NAME,
-                             adb_push_dest_folder:str = DEFAULT_ADB_PUSH_DEST_FOLDER
+                             adb_push_dest_folder:str = DEFAULT_ADB_PUSH_DEST_FOLDER,
+                             post_image_staged:bool = False
                              ) -> None:
-        # TODO Add a docstring
+        """
+        Posts post_image as an Instagram story. post_image is a host file
+        path; or, if post_image_staged, a device file path returned by
+        stage_story_images, which is only now moved into the gallery (so
+        gallery's most recent image is always the one being posted) and
+        is left there until clean_up_story_images.
+        """
 
-        # Push post image to device's sd card
-        self._logger.info(f'Pushing post image to device SD card...')
-        post_image = self._push_image_to_sdcard(src_file_path=post_image,
-                                                dest_file_name=adb_push_dest_file_name,
-                                                dest_folder=adb_push_dest_folder)
-        self._logger.info(f'Pushed post image to device SD card.')
+        # If post image already staged on device, move it into gallery
+        if post_image_staged:
+            self._logger.info(f'Moving staged post image into device gallery...')
+            post_image = self._promote_staged_image(staged_file_path=post_image,
+                                                    dest_folder=adb_push_dest_folder)
+            self._logger.info(f'Moved staged post image into device gallery.')
 
-        # Launch Instagram app
+        # Else, push post image to device's sd card
+        else:
+            self._logger.info(f'Pushing post image to device SD card...')
+            post_image = self._push_image_to_sdcard(src_file_path=post_image,
+                                                    dest_file_name=adb_push_dest_file_name,
+                                                    dest_folder=adb_push_dest_folder)
+            self._logger.info(f'Pushed post image to device SD card.')
+
+        # Launch Instagram app, waiting until its home screen is ready
         self._logger.info('Launching Instagram app on android device...')
-        self._launch_instagram_app(2)
+        self._launch_instagram_app()
+        sprite_box = self._find_on_screen(SPRITE_ADDTOSTORY,
+                                          '"Add to story" button',
+                                          DEFAULT_APP_LAUNCH_TIMEOUT)
         self._logger.info('Launched Instagram app.')
 
         # Click on "Add to story" button (blue circle with white cross)
+        # until gallery shows up
         self._logger.info('Creating new story post...')
-        sprite_box = self._find_on_screen(SPRITE_ADDTOSTORY, '"Add to story" button', 3, 1)
+        recents_box = None
         while sprite_box:
-            self._input_screen_tap(sprite_box, 1)
-            sprite_box = self._find_on_screen(SPRITE_ADDTOSTORY, '"Add to story" button', 1, 0)
+            self._input_screen_tap(sprite_box)
+            recents_box = self._find_on_screen(SPRITE_RECENTS,
+                                               '"Recents" header',
+                                               DEFAULT_TAP_RESPONSE_TIMEOUT)
+            if recents_box:
+                break
+            sprite_box = self._find_on_screen(SPRITE_ADDTOSTORY,
+                                              '"Add to story" button',
+                                              0)
         self._logger.info('Created new story post.')
 
         # Select post image from gallery
         self._logger.info('Selecting post image from gallery...')
-        sprite_box = self._find_on_screen(SPRITE_RECENTS, '"Recents" header')
-        self._input_screen_tap(sprite_box, 0.5, 0, 300)
+        sprite_box = recents_box \
+                     or self._find_on_screen(SPRITE_RECENTS, '"Recents" header')
+        self._input_screen_tap(sprite_box, 0, 0, 300)
         self._logger.info('Selected post image from gallery.')
 
+        # Set story public's button (it sits on the editor's bottom bar)
+        if close_friends_only:
+            share_sprite, share_sprite_name = SPRITE_CLOSEFRIENDS, '"Close Friends" button'
+        else:
+            share_sprite, share_sprite_name = SPRITE_YOURSTORY, '"Your Story" button'
+
         # If link sticker url provided:
         if linksticker_url:
 
-            # Click on "Add a sticker"
+            # Click on "Add a sticker" once the editor shows up
             self._logger.info('Adding link sticker...')
-            sprite_box = self._find_on_screen(SPRITE_ADDSTICKER, 
+            sprite_box = self._find_on_screen(SPRITE_ADDSTICKER,
                                               '"Add sticker" button')
-            self._input_screen_tap(sprite_box, 0.5)
+            self._input_screen_tap(sprite_box)
 
-            # Search for link sticker
+            # Search for link sticker (focus on search field can't be seen
+            # on screen, so wait a little before typing)
             sprite_box = self._find_on_screen(SPRITE_SEARCHFIELD, 
                                               '"Search" field')
-            self._input_screen_tap(sprite_box, 0.2)
+            self._input_screen_tap(sprite_box, DEFAULT_INPUT_FOCUS_WAIT_TIME)
             self._input_text('link')
 
             # Select link sticker
             sprite_box = self._find_on_screen(SPRITE_LINKSTICKER, 
                                               '"LINK" sticker')
-            self._input_screen_tap(sprite_box, 0.1)
+            self._input_screen_tap(sprite_box)
 
-            # Input link sticker url
+            # Input link sticker url once url field shows up
+            self._find_on_screen(SPRITE_URLFIELD, '"URL" field')
             self._input_text(linksticker_url)
 
             # If link sticker custom text provided, use it:
             if linksticker_custom_text:
                 sprite_box = self._find_on_screen(SPRITE_CUSTOMIZESTICKERTEXT, 
                                                   '"Customize sticker text" button')
-                self._input_screen_tap(sprite_box, 0.1)
+                self._input_screen_tap(sprite_box, DEFAULT_INPUT_FOCUS_WAIT_TIME)
                 self._input_text(linksticker_custom_text)
 
             # Click on "Done"
             sprite_box = self._find_on_screen(SPRITE_DONE, 
                                               '"Done" button')
-            self._input_screen_tap(sprite_box, 0.5)
+            self._input_screen_tap(sprite_box)
 
-            # Change link sticker color
+            # Change link sticker color, waiting for it to change after
+            # each tap (sprites are told apart by colour)
             sprite_box = self._find_on_screen(SPRITE_LINKSTICKER_BLUE, 
                                               'blue link sticker')
+            sticker_color = SPRITE_LINKSTICKER_BLUE
             for _ in range(3):
-                self._input_screen_tap(sprite_box, 0.4)
-
-            # Drag link sticker to final position (bottom, center)
-            self._input_screen_drag_and_drop(sprite_box, 0, 920, 2000, 1)
+                self._input_screen_tap(sprite_box)
+                sprite_boxes = self._find_all_on_screen({sprite: 'link sticker' 
+                                                         for sprite in LINKSTICKER_COLORS
+                                                         if sprite != sticker_color},
+                                                        DEFAULT_TAP_RESPONSE_TIMEOUT)
+                sticker_color, sprite_box = next(((sprite, box) for sprite, box
+                                                  in sprite_boxes.items() if box),
+                                                 (sticker_color, sprite_box))
+
+            # Drag link sticker to final position (bottom, center), then
+            # wait for the editor's bottom bar (hidden while dragging) to
+            # show up again
+            self._input_screen_drag_and_drop(sprite_box, 0, 920, 2000)
+            self._find_on_screen(share_sprite, share_sprite_name)
             self._logger.info('Added link sticker.')
 
         # If not a test call, post story to specified public
         if not test_call:
             if close_friends_only:
                 self._logger.info('Posting story to Close Friends...')
-                sprite_box = self._find_on_screen(SPRITE_CLOSEFRIENDS, 
-                                                  '"Close Friends" button')
             else:
                 self._logger.info('Posting story to all followers...')
-                sprite_box = self._find_on_screen(SPRITE_YOURSTORY, 
-                                                  '"Your Story" button')
-            self._input_screen_tap(sprite_box, 0)
+            sprite_box = self._find_on_screen(share_sprite, 
+                                              share_sprite_name)
+            self._input_screen_tap(sprite_box)
             self._logger.info('Posted Instagram story.')
         else:
             self._logger.info('This is a test, story will not be posted.')
 
-        # Delete post image from device's sd card
-        self._logger.info('Deleting post image from device sd card...')
-        self._delete_image_from_sdcard(post_image)
-        self._logger.info('Deleted post image from device sd card.')
+        # If post image was staged, leave it for bulk clean up
+        if post_image_staged:
+            self._posted_images.append(post_image)
+
+        # Else, delete post image from device's sd card
+        else:
+            self._logger.info('Deleting post image from device sd card...')
+            self._delete_image_from_sdcard(post_image)
+            self._logger.info('Deleted post image from device sd card.')
+
+        # Return nothing
+        return None
+
+
+    # Stage story images
+    def stage_story_images(self,
+                           src_file_paths:list,
+                           staging_folder:str = DEFAULT_ADB_STAGING_FOLDER
+                           ) -> list:
+        """
+        Pushes a batch of post images ahead of posting into a staging
+        folder that the media scanner ignores (it holds a .nomedia file),
+        each under its source file's (unique) name. Returns the staged file paths on device, for
+        post_instagram_story(..., post_image_staged=True).
+        """
+
+        # Create staging folder, hidden from media scanner (once per folder)
+        if staging_folder not in self._staging_folders:
+            self._logger.debug(f'Creating staging folder "{staging_folder}"...')
+            self._run_shell_command(f'mkdir -p {staging_folder} '\
+                                    f'&& touch {staging_folder}.nomedia',
+                                    retry_safe=True)
+            self._staging_folders.add(staging_folder)
+            self._logger.debug(f'Created staging folder "{staging_folder}".')
+
+        # Push files from host machine to staging folder (one sync
+        # connection per file: ppadb leaves part of adbd's reply to a push
+        # unread, so a sync connection can't be reused for the next one)
+        staged_file_paths = [f'{staging_folder}{os.path.basename(src_file_path)}'
+                             for src_file_path in src_file_paths]
+        self._logger.info(f'Staging {len(src_file_paths)} post images on device...')
+        for src_file_path, staged_file_path in zip(src_file_paths, staged_file_paths):
+            self._logger.debug(f'Pushing file "{src_file_path}" to "{staged_file_path}"...')
+            self.device_adb.push(src=src_file_path, dest=staged_file_path, mode=0o644)
+        self._logger.info(f'Staged {len(src_file_paths)} post images.')
+
+        # Return staged file paths
+        return staged_file_paths
+
+
+    # Clean up story images
+    def clean_up_story_images(self, dest_folder:str = DEFAULT_ADB_PUSH_DEST_FOLDER) -> None:
+        """
+        Deletes, in bulk, every post image posted from staging and every
+        staging folder, then issues a single media scan of dest_folder so
+        the gallery forgets the posted images.
+        """
+
+        # If nothing staged, stop
+        if not (self._posted_images or self._staging_folders):
+            return None
+
+        # Delete posted images and staging folders in one go
+        self._logger.info(f'Cleaning up {len(self._posted_images)} posted images on device...')
+        self._run_shell_command('rm -rf ' + ' '.join(self._posted_images
+                                                     + sorted(self._staging_folders)),
+                                retry_safe=True)
+        self._scan_media_file(dest_folder)
+        self._posted_images.clear()
+        self._staging_folders.clear()
+        self._logger.info('Cleaned up posted images on device.')
+
+        # Return nothing
+        return None
+
+
+    # Close device
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Close persistent shell session
+        self._logger.info('Closing device...')
+        self.shell_session.close()
+        self._logger.info('Closed device.')
 
         # Return nothing
         return None
@@ -289,66 +540,218 @@ class Device:
         
         # Delete file from device's SD card
         self._logger.debug(f'Deleting "{file_path}"...')
-        self.device_adb.shell(f'rm {file_path}')
+        self._run_shell_command(f'rm {file_path}', retry_safe=True)
         self._logger.debug(f'Deleted "{file_path}".')
 
         # Return nothing
         return None
 
 
+    # Dump UI hierarchy
+    def _dump_ui_hierarchy(self) -> list|None:
+        """
+        Dumps device's current UI hierarchy with uiautomator.
+        Returns a list of node attribute dicts; or None, if dump failed
+        (e.g. while screen is animating).
+        """
+
+        # Dump UI hierarchy to a file and print it (dumping to /dev/tty needs
+        # a terminal, which one-off adb shell connections lack)
+        self._logger.debug('Dumping UI hierarchy...')
+        output = self._run_shell_command(f'uiautomator dump {DEFAULT_UI_DUMP_FILE} '\
+                                         f'&& cat {DEFAULT_UI_DUMP_FILE}',
+                                         retry_safe=True)
+        start, end = output.find('<?xml'), output.rfind('>')
+        if start < 0 or end < start:
+            self._logger.debug(f'Failed to dump UI hierarchy ("{output.strip()}").')
+            return None
+
+        # Parse nodes' attributes
+        try:
+            hierarchy = ElementTree.fromstring(output[start:end+1])
+        except ElementTree.ParseError as e:
+            self._logger.debug(f'Failed to parse UI hierarchy ({e}).')
+            return None
+        ui_nodes = [node.attrib for node in hierarchy.iter('node')]
+        self._logger.debug(f'Dumped UI hierarchy ({len(ui_nodes)} nodes).')
+
+        # Return nodes
+        return ui_nodes
+
+
+    # Find all on screen
+    def _find_all_on_screen(self,
+                            search_images:dict,
+                            timeout:float = DEFAULT_WAIT_TIMEOUT,
+                            confidence_lvl:float = 0.9,
+                            required_images:list|None = None,
+                            search_regions:dict = SPRITE_REGIONS
+                            ) -> dict:
+        """
+        Locates several images (dict of image path -> image name) on the
+        same device screencap, polling the screen until found or until
+        timeout (in seconds) runs out; a timeout of 0 polls only once.
+        Images with UI selectors are first looked up in the device's UI
+        hierarchy (uiautomator dump); others, or those not found there, are
+        matched as sprites: where last found, then inside their search
+        region (if any), then on the whole screen.
+        Polling stops once every required image is found (by default, once
+        any image is found). Returns a dict of image path -> pyscreeze.Box
+        object; or None, for images not found.
+        """
+
+        # Set boxes of search images (kept between polls)
+        search_image_boxes = {search_image: None for search_image in search_images}
+
+        # Set screen state condition: try to locate every search image not
+        # found yet on screen, tell if required images found (first poll
+        # may reuse a cached UI hierarchy, later ones need a fresh one)
+        poll_counter = 0
+        def search_images_found() -> bool:
+            nonlocal poll_counter
+            poll_counter += 1
+
+            # Get device UI hierarchy, if any search image left is located by it
+            missing_images = [search_image for search_image, search_image_box
+                              in search_image_boxes.items() if not search_image_box]
+            ui_nodes = None
+            if any(self._uses_ui_hierarchy(search_image) for search_image in missing_images):
+                ui_nodes = self._get_ui_hierarchy(refresh=poll_counter > 1)
+
+            # Attempt to locate every search image not found yet on screen
+            frame_pyramid = None
+            for search_image in missing_images:
+                search_image_name = search_images[search_image]
+                self._logger.debug(f"Locating {search_image_name} "\
+                                   f"on device screen...")
+
+                # Locate by UI hierarchy, if possible
+                search_image_box = None
+                by_ui_hierarchy = ui_nodes is not None and self._uses_ui_hierarchy(search_image)
+                if by_ui_hierarchy:
+                    search_image_box = self._locate_in_ui_hierarchy(search_image, ui_nodes)
+
+                # Else, fall back to sprite matching (screen frame pyramid
+                # levels are shared by all images)
+                if not search_image_box:
+                    if frame_pyramid is None:
+                        frame_pyramid = SpriteBank.get_frame_pyramid(self._take_screen_frame())
+                    search_image_box = self.sprite_bank.locate(search_image,
+                                                               frame_pyramid,
+                                                               confidence_lvl,
+                                                               search_regions.get(search_image))
+
+                    # If sprite found where UI hierarchy failed, stop
+                    # trusting image's UI selectors
+                    if search_image_box and by_ui_hierarchy:
+                        self._logger.warning(f'{search_image_name} found as a sprite, '\
+                                             f'but not in UI hierarchy. '\
+                                             f'Using sprite matching for it from now on.')
+                        self._unreliable_ui_selectors.add(search_image)
+
+                search_image_boxes[search_image] = search_image_box
+                if search_image_boxes[search_image]:
+                    self._logger.debug(f'Located {search_image_name} '\
+                                       f'at {search_image_boxes[search_image]}')
+                else:
+                    self._logger.debug(f'Failed to locate {search_image_name}.')
+
+            # Tell if required images found
+            if required_images:
+                return all(search_image_boxes[search_image] for search_image in required_images)
+            return any(search_image_boxes.values())
+
+        # Poll screen until search images found, return whatever was found
+        self._wait_until(search_images_found,
+                         ', '.join(search_images.values()),
+                         timeout)
+        return search_image_boxes
+
+
     # Find on screen
     def _find_on_screen(self,
                         search_image:str,
                         search_image_name:str = 'search_image',
-                        max_attempts:int = 3,
-                        time_between_attempts:int = 3,
-                        confidence_lvl:float = 0.9
+                        timeout:float = DEFAULT_WAIT_TIMEOUT,
+                        confidence_lvl:float = 0.9,
+                        search_region:tuple|None = None
                         ) -> Box|None:
-        # TODO Improve this docstring
         """
-        Locates an image on device screen.
+        Locates an image on device screen, polling the screen until found
+        or until timeout (in seconds) runs out.
         Returns a pyscreeze.Box object with image location; or None, if not found.
         """
 
-        # Start attempts to find search image
-        search_image_box = None
-        attempt_counter = 0
-        while True:
+        # Find search image alone (in its default region, if none given)
+        search_region = search_region or SPRITE_REGIONS.get(search_image)
+        return self._find_all_on_screen({search_image: search_image_name},
+                                        timeout,
+                                        confidence_lvl,
+                                        search_regions={search_image: search_region})[search_image]
 
-            # Take device screencap
-            device_screencap = Image.open(fp=BytesIO(self._take_screencap()),
-                                          mode='r')
 
-            # Attempt to locate search image in screencap
-            attempt_counter += 1
-            self._logger.debug(f"Locating {search_image_name} "\
-                               f"on device screen "\
-                               f"(attempt {attempt_counter} "\
-                               f"of {max_attempts})...")
-            try:
-                search_image_box = pyautogui.locate(needleImage=search_image,
-                                                    haystackImage=device_screencap,
-                                                    confidence=confidence_lvl)
-
-            # If search image not found:
-            except pyautogui.ImageNotFoundException:
-
-                # If more attempts left, wait, move to next attempt
-                if attempt_counter < max_attempts:
-                    self._logger.debug(f'Failed. Next attempt in '\
-                                       f'{time_between_attempts} seconds.')
-                    self._sleep(time_between_attempts)
-                    continue
+    # Get from adb device
+    @classmethod
+    def _get_from_adb_device(cls,
+                             device_adb:AdbDevice,
+                             device_name:str,
+                             client_ip:str,
+                             listen_port:int,
+                             screencap_backend:str,
+                             element_locator:str
+                             ):
+        # TODO Add a docstring
 
-                # If no attempts left, stop, return nothing
-                else:
-                    self._logger.debug(f'Failed. No attempts left.')
-                    return None
+        # Logger set up
+        _get_logger = logging.getLogger(__name__).getChild(cls.__name__).getChild('get')
 
-            # If search image found, return its pyscreeze.Box object
-            else:
-                self._logger.debug(f'Located image at {search_image_box}')
-                return search_image_box
+        # Get device id
+        device_id = device_adb.serial
+        _get_logger.debug(f'Connected to device '\
+                          f'with serial number "{device_id}". '\
+                          f'Named device as "{device_name}".')
+
+        # Get device's screen width and height
+        _get_logger.debug(f"Getting device screen resolution ...")
+        screen_size = device_adb.shell('wm size') # returns: 'Physical size: [width]x[height]'
+        screen_size = screen_size.replace('Physical size: ', '') # returns: '[width]x[height]'
+        screen_width, screen_height = screen_size.split(sep='x') # returns: ('[width]', '[height]')
+        screen_width = int(screen_width)
+        screen_height = int(screen_height)
+        _get_logger.debug(f"Device screen resolution: {screen_width} by {screen_height} pixels.")
+
+        _get_logger.info(f'Connected to android device "{device_name}" ("{device_id}") at {client_ip}:{listen_port}.')
+
+        # Preload sprites as matching templates
+        _get_logger.debug('Loading sprite bank...')
+        sprite_bank = SpriteBank.get(sprite_paths=SPRITES)
+        _get_logger.debug('Loaded sprite bank.')
+
+        # Return Device object
+        return cls(client_ip=client_ip,
+                   client_port=listen_port,
+                   device_adb=device_adb,
+                   device_id=device_id,
+                   device_screen_width=screen_width,
+                   device_screen_height=screen_height,
+                   device_name=device_name,
+                   screencap_backend=screencap_backend,
+                   sprite_bank=sprite_bank,
+                   element_locator=element_locator,
+                   )
+
+
+    # Get UI hierarchy
+    def _get_ui_hierarchy(self, refresh:bool = False) -> list|None:
+        # TODO Add a docstring
+
+        # If no cached UI hierarchy (screen may have changed) or refresh
+        # required, dump a new one
+        if refresh or self._ui_hierarchy is None:
+            self._ui_hierarchy = self._dump_ui_hierarchy()
+
+        # Return UI hierarchy nodes
+        return self._ui_hierarchy
 
 
     # Input screen drag-and-drop
@@ -357,7 +760,7 @@ class Device:
                                     dx:int,
                                     dy:int,
                                     duration:int,
-                                    wait_time:float = 1,
+                                    wait_time:float = 0,
                                     centered_drag:bool=False
                                     ) -> None:
         # TODO Add a docstring
@@ -377,15 +780,17 @@ class Device:
                            f'from (x,y)=({x_0},{y_0}) '\
                            f'to (x,y)=({x_0+dx},{y_0+dy}) '\
                            f'with duration={duration}...')
-        self.device_adb.shell(f'input draganddrop {x_0} {y_0} '\
-                              f'{x_0+dx} {y_0+dy} {duration}')
+        self._run_shell_command(f'input draganddrop {x_0} {y_0} '\
+                                f'{x_0+dx} {y_0+dy} {duration}')
         self._logger.debug(f'Drag-and-dropped '\
                            f'from (x,y)=({x_0},{y_0}) '\
                            f'to (x,y)=({x_0+dx},{y_0+dy}) '\
                            f'with duration={duration}.')
 
-        # Wait some time (for convenience)
-        self._sleep(wait_time)
+        # Wait some time, if required (for state changes that can't be
+        # seen on screen)
+        if wait_time:
+            self._sleep(wait_time)
 
         # Return nothing
         return None
@@ -394,7 +799,7 @@ class Device:
     # Input screen tap
     def _input_screen_tap(self,
                           tap_box:Box,
-                          wait_time:float = 1,
+                          wait_time:float = 0,
                           x_offset:int = 0,
                           y_offset:int = 0,
                           centered_tap:bool = False
@@ -413,11 +818,13 @@ class Device:
 
         # Input tap on device's screen
         self._logger.debug(f'Tapping on (x,y)=({x},{y})...')
-        self.device_adb.shell(f'input tap {x} {y}')
+        self._run_shell_command(f'input tap {x} {y}')
         self._logger.debug(f'Tapped on (x,y)=({x},{y}).')
 
-        # Wait some time (for convenience)
-        self._sleep(wait_time)
+        # Wait some time, if required (for state changes that can't be
+        # seen on screen)
+        if wait_time:
+            self._sleep(wait_time)
 
         # Return nothing
         return None
@@ -429,7 +836,7 @@ class Device:
 
         # Input text
         self._logger.debug(f'Inputting "{text}"...')
-        self.device_adb.input_text(text)
+        self._run_shell_command(f'input text "{text}"')
         self._logger.debug(f'Inputted "{text}".')
 
         # Return nothing
@@ -437,30 +844,82 @@ class Device:
 
 
     # Launch Instagram app
-    def _launch_instagram_app(self,
-                              wait_time:float = 3,
-                              force_restart:bool = True
-                              ) -> None:
+    def _launch_instagram_app(self, force_restart:bool = True) -> None:
         # TODO Add a docstring
 
         # Force-stop Instagram app if required
         if force_restart==True:
             self._logger.debug('Force-stopping Instagram app...')
-            self.device_adb.shell('am force-stop com.instagram.android')
+            self._run_shell_command('am force-stop com.instagram.android', retry_safe=True)
             self._logger.debug('Force-stopped Instagram app.')
 
         # Launch Instagram app
         self._logger.debug('Launching Instagram app...')
-        self.device_adb.shell('monkey -p com.instagram.android 1')
+        self._run_shell_command('monkey -p com.instagram.android 1')
         self._logger.debug('Launched Instagram app.')
 
-        # Wait some time (for convenience)
-        self._sleep(wait_time)
-
         # Return nothing
         return None
 
 
+    # Locate in UI hierarchy
+    def _locate_in_ui_hierarchy(self,
+                                search_image:str,
+                                ui_nodes:list
+                                ) -> Box|None:
+        """
+        Locates an image's element in UI hierarchy nodes, by any of its
+        UI selectors (skipping nodes matching any of its excluded nodes).
+        Returns a pyscreeze.Box object with element bounds; or None, if
+        not found.
+        """
+
+        # Find first visible node matching any selector, and no exclusion
+        def matches(ui_node, selector:dict) -> bool:
+            return all(ui_node.get(attribute, '').casefold() == value.casefold()
+                       for attribute, value in selector.items())
+        for selector in UI_SELECTORS[search_image]:
+            for ui_node in ui_nodes:
+                if not matches(ui_node, selector) \
+                   or any(matches(ui_node, exclusion)
+                          for exclusion in UI_EXCLUDED_NODES.get(search_image, [])):
+                    continue
+                bounds = UI_BOUNDS_PATTERN.fullmatch(ui_node.get('bounds', ''))
+                if not bounds:
+                    continue
+                left, top, right, bottom = map(int, bounds.groups())
+                if right > left and bottom > top:
+                    return Box(left, top, right - left, bottom - top)
+
+        # If not found, return None
+        return None
+
+
+    # Promote staged image
+    def _promote_staged_image(self,
+                              staged_file_path:str,
+                              dest_folder:str
+                              ) -> str:
+        # TODO Add a docstring
+
+        # Set destination file path, keeping staged file (unique) name
+        dest_file_path = f'{dest_folder}{os.path.basename(staged_file_path)}'
+
+        # Move file out of staging folder (same storage, so no copying),
+        # refreshing its timestamp so gallery lists it first
+        self._logger.debug(f'Moving "{staged_file_path}" to "{dest_file_path}"...')
+        self._run_shell_command(f'mkdir -p {dest_folder} '\
+                                f'&& mv -f {staged_file_path} {dest_file_path} '\
+                                f'&& touch {dest_file_path}')
+        self._logger.debug(f'Moved "{staged_file_path}" to "{dest_file_path}".')
+
+        # Make Android device "recognize" file as a media file
+        self._scan_media_file(dest_file_path)
+
+        # Return destination file path
+        return dest_file_path
+
+
     # Push image to SD card
     def _push_image_to_sdcard(self,
                               src_file_path:str,
@@ -469,7 +928,10 @@ class Device:
                               ) -> str:
         # TODO Add a docstring
         
-        # Set destination file path
+        # Set destination file path, keeping source file extension
+        # (media scanner tells image type by extension)
+        dest_file_name = os.path.splitext(dest_file_name)[0] \
+                         + os.path.splitext(src_file_path)[1]
         dest_file_path = f'{dest_folder}{dest_file_name}'
 
         # Push file from host machine to android device
@@ -478,14 +940,52 @@ class Device:
         self._logger.debug(f'Pushed file "{src_file_path}" to "{dest_file_path}".')
 
         # Make Android device "recognize" JPG file as a media file
-        self._logger.debug(f'Scanning file "{dest_file_path}" with media scanner...')
-        self.device_adb.shell(f'am broadcast -a android.intent.action.MEDIA_SCANNER_SCAN_FILE -d file://{dest_file_path}')
-        self._logger.debug(f'Scanned file "{dest_file_path}" with media scanner.')
+        self._scan_media_file(dest_file_path)
 
         # Return destination file path
         return dest_file_path
 
 
+    # Run shell command
+    def _run_shell_command(self, command:str, retry_safe:bool = False) -> str:
+        """
+        Runs a command over the persistent shell session. Only commands
+        that are retry_safe (running them twice does no harm, e.g. rm -rf,
+        uiautomator dump) are run again, on a one-off adb shell connection,
+        if the session fails; others (taps, text input...) may already
+        have run, so the error is raised.
+        """
+
+        # Drop cached UI hierarchy, if command may change screen state
+        if not command.startswith('uiautomator'):
+            self._ui_hierarchy = None
+
+        # Run command over the persistent shell session, falling back to a
+        # one-off adb shell connection if the session fails (and command is
+        # safe to run again)
+        try:
+            return self.shell_session.run(command, retry_safe=retry_safe)
+        except (OSError, RuntimeError) as e:
+            if not retry_safe:
+                raise
+            self._logger.warning(f'Shell session failed ({e}). '\
+                                 f'Running "{command}" on a new connection...')
+            return self.device_adb.shell(command)
+
+
+    # Scan media file
+    def _scan_media_file(self, file_path:str) -> None:
+        # TODO Add a docstring
+
+        # Broadcast file to media scanner
+        self._logger.debug(f'Scanning file "{file_path}" with media scanner...')
+        self._run_shell_command(f'am broadcast -a android.intent.action.MEDIA_SCANNER_SCAN_FILE -d file://{file_path}')
+        self._logger.debug(f'Scanned file "{file_path}" with media scanner.')
+
+        # Return nothing
+        return None
+
+
     # Sleep
     def _sleep(self, wait_time:float) -> None:
         # TODO Add a docstring
@@ -499,6 +999,62 @@ class Device:
         return None
 
 
+    # Take raw screen frame
+    def _take_raw_screen_frame(self) -> np.ndarray:
+        # TODO Add a docstring
+
+        # Pull raw framebuffer bytes (no on-device PNG encoding), giving up
+        # on a stalled connection
+        self._logger.debug('Taking raw device screencap...')
+        with self.device_adb.create_connection(timeout=DEFAULT_ADB_SHELL_TIMEOUT) as connection:
+            connection.send('exec:screencap')
+            data = bytearray()
+            while True:
+                chunk = connection.read(1 << 20)
+                if not chunk:
+                    break
+                data += chunk
+        self._logger.debug('Took raw device screencap.')
+
+        # Read header: width, height, pixel format (+ colorspace on Android 8+)
+        if len(data) < 12:
+            raise ValueError('Raw screencap too short.')
+        width, height, pixel_format = struct.unpack_from('<III', data)
+        header_size = len(data) - width*height*4
+        if header_size not in (12, 16) or pixel_format not in SCREENCAP_RAW_FORMATS:
+            raise ValueError(f'Unsupported raw screencap '\
+                             f'(format {pixel_format}, {len(data)} bytes).')
+
+        # Wrap pixels as a (height, width, 4) RGBA array, without copying
+        return np.frombuffer(data,
+                             dtype=np.uint8,
+                             count=width*height*4,
+                             offset=header_size).reshape(height, width, 4)
+
+
+    # Take screen frame
+    def _take_screen_frame(self) -> np.ndarray:
+        # TODO Add a docstring
+
+        # Prefer raw framebuffer, falling back to PNG for good if unsupported,
+        # or for this frame if connection failed (e.g. exec service refused,
+        # socket timed out)
+        if self.screencap_backend == 'raw':
+            try:
+                return cv2.cvtColor(self._take_raw_screen_frame(), cv2.COLOR_RGBA2BGR)
+            except ValueError as e:
+                self._logger.warning(f'Raw screencap failed ({e}). '\
+                                     f'Switching to PNG screencaps...')
+                self.screencap_backend = 'png'
+            except (OSError, RuntimeError) as e:
+                self._logger.warning(f'Raw screencap failed ({e}). '\
+                                     f'Taking a PNG screencap instead...')
+
+        # Decode PNG screencap
+        return cv2.imdecode(np.frombuffer(self._take_screencap(), dtype=np.uint8),
+                            cv2.IMREAD_COLOR)
+
+
     # Take screencap
     def _take_screencap(self, output_path:str|None = None) -> bytearray:
         # TODO Add a docstring
@@ -518,3 +1074,226 @@ class Device:
         # Return screencap as bytearray
         return screencap
 
+
+    # Uses UI hierarchy
+    def _uses_ui_hierarchy(self, search_image:str) -> bool:
+        # TODO Add a docstring
+
+        # Tell if image is located by (trusted) UI selectors
+        return self.element_locator == 'uiautomator' \
+               and search_image in UI_SELECTORS \
+               and search_image not in self._unreliable_ui_selectors
+
+
+    # Wait until
+    def _wait_until(self,
+                    condition,
+                    condition_name:str = 'condition',
+                    timeout:float = DEFAULT_WAIT_TIMEOUT,
+                    min_interval:float = DEFAULT_WAIT_MIN_INTERVAL,
+                    max_interval:float = DEFAULT_WAIT_MAX_INTERVAL,
+                    backoff:float = DEFAULT_WAIT_BACKOFF
+                    ):
+        """
+        Polls condition (a callable) until it returns a truthy value or
+        until timeout (in seconds) runs out; a timeout of 0 polls only once.
+        Intervals between polls start short (UI usually settles quickly)
+        and grow by backoff up to max_interval.
+        Returns condition's last returned value.
+        """
+
+        # Poll condition until it holds or timeout runs out
+        deadline = monotonic() + timeout
+        interval = min_interval
+        poll_counter = 0
+        while True:
+            poll_counter += 1
+            result = condition()
+            if result:
+                self._logger.debug(f'Waited for {condition_name} '\
+                                   f'({poll_counter} polls).')
+                return result
+
+            # If no time left, stop, return last result
+            time_left = deadline - monotonic()
+            if time_left <= 0:
+                self._logger.warning(f'Timed out waiting for {condition_name} '\
+                                     f'after {timeout} seconds ({poll_counter} polls).')
+                return result
+
+            # Wait before next poll, backing off interval
+            sleep(min(interval, time_left))
+            interval = min(interval*backoff, max_interval)
+
+
+# --- The ShellSession class ---
+class ShellSession:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 device_adb:AdbDevice|None,
+                 timeout:float = DEFAULT_ADB_SHELL_TIMEOUT
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)\
+                              .getChild(str(getattr(device_adb, 'serial', None)))
+
+        # Validate device adb object
+        if not device_adb:
+            raise ValueError("Missing adb device object.")
+
+        # Set object attributes
+        self.device_adb = device_adb
+        self.timeout = timeout
+        self._connection = None
+        self._command_counter = 0
+        self._lock = threading.Lock()
+
+
+    # --- Public methods ---
+
+    # Close session
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Close shell connection, if open
+        with self._lock:
+            self._close_connection()
+
+        # Return nothing
+        return None
+
+
+    # Run command
+    def run(self, command:str, retry_safe:bool = False) -> str:
+        """
+        Runs a command on the device's long-lived interactive shell.
+        Returns the command output. Reconnects (once) and sends command
+        again if the shell died before command was written to it; if it
+        fails after that, command may have run, so the error is raised
+        (unless command is retry_safe).
+        """
+
+        with self._lock:
+
+            # Send command, reconnecting if shell died (a command never
+            # written never ran, so it is safe to send again)
+            try:
+                if not (self._connection and self._is_alive()):
+                    self._close_connection()
+                    self._open_connection()
+                marker = self._send_command(command)
+            except (OSError, RuntimeError):
+                self._logger.debug('Shell session failed. Reconnecting...')
+                self._close_connection()
+                self._open_connection()
+                marker = self._send_command(command)
+
+            # Read command output, dropping the shell if that fails
+            try:
+                return self._read_output(marker)
+            except (OSError, RuntimeError):
+                self._close_connection()
+                if not retry_safe:
+                    raise
+                self._logger.debug('Shell session failed. Reconnecting...')
+                self._open_connection()
+                return self._read_output(self._send_command(command))
+
+
+    # --- Helper methods ---
+
+    # Close connection
+    def _close_connection(self) -> None:
+        # TODO Add a docstring
+
+        # Ask shell to exit, then drop the socket
+        if self._connection:
+            self._logger.debug('Closing shell session...')
+            try:
+                self._connection.write(b'exit\n')
+            except OSError:
+                pass
+            self._connection.close()
+            self._connection = None
+            self._logger.debug('Closed shell session.')
+
+        # Return nothing
+        return None
+
+
+    # Check connection
+    def _is_alive(self) -> bool:
+        # TODO Add a docstring
+
+        # An idle shell has nothing to read; a readable socket with no data
+        # was closed by the device
+        connection_socket = self._connection.socket
+        try:
+            readable, _, _ = select.select([connection_socket], [], [], 0)
+            return not readable \
+                   or bool(connection_socket.recv(1, socket.MSG_PEEK))
+        except OSError:
+            return False
+
+
+    # Open connection
+    def _open_connection(self) -> None:
+        # TODO Add a docstring
+
+        # Open an interactive shell on the device
+        self._logger.debug('Opening shell session...')
+        self._connection = self.device_adb.create_connection(timeout=self.timeout)
+        self._connection.send('shell:')
+
+        # Silence echo and prompt, so only command output comes back
+        self._run_raw('stty -echo 2>/dev/null; export PS1=""')
+        self._logger.debug('Opened shell session.')
+
+        # Return nothing
+        return None
+
+
+    # Read command output
+    def _read_output(self, marker:bytes) -> str:
+        # TODO Add a docstring
+
+        # Read until marker shows up
+        output = bytearray()
+        while marker not in output:
+            chunk = self._connection.read(4096)
+            if not chunk:
+                raise RuntimeError('Shell session closed by device.')
+            output += chunk
+
+        # Return output before marker
+        output = output[:output.index(marker)]
+        return output.decode('utf-8', errors='replace').replace('\r\n', '\n')
+
+
+    # Run raw command
+    def _run_raw(self, command:str) -> str:
+        # TODO Add a docstring
+
+        # Send command, then read its output
+        return self._read_output(self._send_command(command))
+
+
+    # Send command
+    def _send_command(self, command:str) -> bytes:
+        # TODO Add a docstring
+
+        # Send command followed by a completion marker. The marker is split
+        # in two quoted halves, so an echoed command line never matches it
+        self._command_counter += 1
+        marker = ADB_SHELL_MARKER.format(self._command_counter)
+        half = len(marker)//2
+        self._connection.write(f'{command}; printf "%s" "{marker[:half]}""{marker[half:]}"\n'
+                               .encode('utf-8'))
+
+        # Return marker to read up to
+        return marker.encode('utf-8')
@@ -0,0 +1,394 @@
+# --- Imports ---
+
+# Standard
+import asyncio
+from itertools import islice
+import logging
+import random
+from urllib.parse import urljoin
+
+# Third party
+import aiohttp
+
+# Local
+from cache import OfferCache
+from offer import Offer
+from resilience import CircuitBreaker, RateLimiter
+from scraping import OfferParseError, Scraper, ScrapingError
+from scraping import CAPTCHA_PAGE_MARKER, DEFAULT_HTTP_HEADERS, DEFAULT_HTTP_TIMEOUT
+from scraping import DEFAULT_SCRAPER_MAX_RETRIES, DEFAULT_SCRAPER_REQUESTS_PER_SECOND
+from scraping import DEFAULT_SCRAPER_RETRY_BASE_DELAY, DEFAULT_SCRAPER_RETRY_MAX_DELAY
+from scraping import THROTTLING_STATUS_CODES
+from urls import CANONICAL_URL_TEMPLATE, DEFAULT_RESOLVER_MAX_REDIRECTS, UrlResolver
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+DEFAULT_ASYNC_SCRAPER_MAX_CONCURRENCY = 100 # requests in flight
+DEFAULT_ASYNC_SCRAPER_MAX_PENDING = None # twice the max concurrency
+
+
+# --- The AsyncScraper class ---
+class AsyncScraper:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 max_concurrency:int,
+                 cache:OfferCache|None = None,
+                 max_retries:int = DEFAULT_SCRAPER_MAX_RETRIES,
+                 requests_per_second:float = DEFAULT_SCRAPER_REQUESTS_PER_SECOND):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate max concurrency
+        if not max_concurrency or max_concurrency < 1:
+            raise ValueError('Async scraper max concurrency must be at least 1.')
+
+        # Validate max retries
+        if max_retries is None or max_retries < 0:
+            raise ValueError('Scraper max retries must be at least 0.')
+
+        # Set object attributes (HTTP session is opened on first use, as it
+        # must be created inside the event loop)
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter.get(rate=requests_per_second)
+        self.circuit_breaker = CircuitBreaker.get()
+        self.session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._short_links = {}
+
+
+    # --- Public methods ---
+
+    # Get AsyncScraper object
+    @classmethod
+    def get(cls,
+            max_concurrency:int = DEFAULT_ASYNC_SCRAPER_MAX_CONCURRENCY,
+            cache:OfferCache|None = None,
+            max_retries:int = DEFAULT_SCRAPER_MAX_RETRIES,
+            requests_per_second:float = DEFAULT_SCRAPER_REQUESTS_PER_SECOND):
+        # TODO Add a docstring
+
+        # Return AsyncScraper object
+        logger.info('Getting AsyncScraper object...')
+        return AsyncScraper(max_concurrency=max_concurrency,
+                            cache=cache,
+                            max_retries=max_retries,
+                            requests_per_second=requests_per_second)
+
+
+    # Close scraper
+    async def close(self) -> None:
+        # TODO Add a docstring
+
+        # Wake up coroutines paused by rate limiter or circuit breaker, then
+        # close HTTP session (if ever opened)
+        self._logger.info('Closing async scraper...')
+        self.rate_limiter.close()
+        self.circuit_breaker.close()
+        if self.session:
+            await self.session.close()
+            self.session = None
+        self._logger.info('Closed async scraper.')
+
+        # Return nothing
+        return None
+
+
+    # Resolve url
+    async def resolve(self, url:str) -> str:
+        """
+        Same as UrlResolver.resolve, following short link redirects with
+        non-blocking HEAD requests.
+        """
+
+        # If url already has an ASIN, or is no short link, build it from url
+        url = url.strip()
+        asin = UrlResolver.extract_asin(url)
+        if not asin and UrlResolver.is_short_link(url):
+
+            # If short link resolved before, use memoized ASIN
+            if url in self._short_links:
+                asin = self._short_links[url]
+            else:
+                asin = await asyncio.to_thread(self.cache.load_short_link, url) \
+                       if self.cache else None
+
+                # Else, follow its redirects
+                if not asin:
+                    asin = await self._resolve_short_link(url)
+                    if asin and self.cache:
+                        await asyncio.to_thread(self.cache.store_short_link, url, asin)
+
+                # Memoize ASIN only if resolved (failures are tried again)
+                if asin:
+                    self._short_links[url] = asin
+
+        # Return canonical url (or url itself, if no ASIN found)
+        return CANONICAL_URL_TEMPLATE.format(asin=asin) if asin else url
+
+
+    # Scrape an amazon.com.br offer
+    async def scrape_amazon_offer(self, url:str) -> Offer:
+        """
+        Async version of Scraper.scrape_amazon_offer, on plain HTTP only
+        (no webdriver fallback: offers whose static page can't be parsed
+        fail, and are better left to Scraper). At most max_concurrency
+        requests are in flight at once (offers waiting on the rate limiter,
+        circuit breaker or a retry backoff hold no slot).
+        Raises ScrapingError once retries run out, or OfferParseError
+        (not retried) if the offer webpage lacks required fields.
+        """
+
+        # Resolve offer url to its canonical product page (memoized)
+        offer_url = url
+        scrape_url = await self.resolve(offer_url)
+
+        # If offer is cached and fresh, skip scraping
+        fields = await asyncio.to_thread(self.cache.load, scrape_url) \
+                 if self.cache else None
+        if fields:
+            self._logger.info('Found fresh offer in cache.')
+            thumbnail_content = fields['thumbnail']
+
+        # Else, scrape offer fields and thumbnail, retrying transient failures
+        else:
+            fields, thumbnail_content = await self._scrape_with_retries(scrape_url)
+
+            # Cache offer fields and thumbnail
+            if self.cache:
+                await asyncio.to_thread(self.cache.store,
+                                        url=scrape_url,
+                                        title=fields['title'],
+                                        thumbnail=thumbnail_content,
+                                        price_now=fields['price_now'],
+                                        price_before=fields['price_before'],
+                                        discount_rate=fields['discount_rate'])
+
+        # Return Offer object
+        self._logger.info('Returning Offer object...')
+        return Offer(url=offer_url,
+                     title=fields['title'],
+                     thumbnail=thumbnail_content,
+                     price_now=fields['price_now'],
+                     price_before=fields['price_before'],
+                     discount_rate=fields['discount_rate'])
+
+
+    # Scrape many amazon.com.br offers concurrently
+    async def scrape_amazon_offers(self,
+                                   urls:list,
+                                   max_pending:int|None = DEFAULT_ASYNC_SCRAPER_MAX_PENDING,
+                                   on_failed=None):
+        """
+        Scrapes urls concurrently, keeping at most max_pending (by default,
+        twice max_concurrency) offers scraped or being scraped but not
+        yet taken.
+        Async iterator of Offer objects, in completion order (not urls
+        order); a failed scrape is re-raised (or, if on_failed given,
+        skipped after calling on_failed with its url), and closing the
+        iterator cancels pending scrapes.
+        """
+
+        # Validate max pending
+        max_pending = max_pending or 2*self.max_concurrency
+        if max_pending < 1:
+            raise ValueError('Scraper max pending must be at least 1.')
+
+        # Start scraping the first urls right away
+        self._logger.info(f'Scraping {len(urls)} offers '\
+                          f'with up to {self.max_concurrency} in flight...')
+        urls = iter(urls)
+        tasks = {asyncio.create_task(self.scrape_amazon_offer(url)): url
+                 for url in islice(urls, max_pending)}
+
+        # Hand offers over as they complete, starting one more scrape for
+        # each offer taken
+        try:
+            while tasks:
+                done_tasks, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done_tasks:
+                    url = tasks.pop(task)
+                    next_url = next(urls, None)
+                    if next_url is not None:
+                        tasks[asyncio.create_task(self.scrape_amazon_offer(next_url))] = next_url
+
+                    # Skip failed offers if caller handles them, else re-raise
+                    try:
+                        offer = task.result()
+                    except Exception as e:
+                        if not on_failed:
+                            raise
+                        self._logger.error(f'Failed to scrape offer "{url}" ({e}). Skipping...')
+                        on_failed(url)
+                        continue
+                    yield offer
+
+        # Cancel whatever is still pending if the caller stops early
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._logger.info('Stopped scraping offers.')
+
+
+    # --- Helper methods ---
+
+    # Download offer thumbnail
+    async def _download_thumbnail(self, url:str) -> bytes:
+        # TODO Add a docstring
+
+        # Download thumbnail (kept in memory, as encoded bytes), taking a
+        # concurrency slot once rate limiter lets request through
+        self._logger.info('Downloading offer thumbnail...')
+        await self.rate_limiter.acquire_async(url)
+        session = self._get_session()
+        async with self._semaphore, session.get(url, raise_for_status=True) as response:
+            return await response.read()
+
+
+    # Get HTTP session
+    def _get_session(self) -> aiohttp.ClientSession:
+        # TODO Add a docstring
+
+        # Open a keep-alive session on first use, one pooled connection
+        # per concurrency slot
+        if not self.session:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 headers=DEFAULT_HTTP_HEADERS,
+                                                 timeout=aiohttp.ClientTimeout(total=DEFAULT_HTTP_TIMEOUT))
+
+        # Return session
+        return self.session
+
+
+    # Resolve short link
+    async def _resolve_short_link(self, url:str) -> str|None:
+        # TODO Add a docstring
+
+        # Follow redirects by hand with HEAD requests, stopping at the first
+        # location that reveals the ASIN (no need to load the product page)
+        self._logger.debug(f'Resolving short link "{url}"...')
+        session = self._get_session()
+        location = url
+        for _ in range(DEFAULT_RESOLVER_MAX_REDIRECTS):
+            await self.rate_limiter.acquire_async(location)
+            try:
+                async with self._semaphore, session.head(location, allow_redirects=False) as response:
+                    redirect_location = response.headers.get('Location') \
+                                        if response.status in (301, 302, 303, 307, 308) else None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self._logger.warning(f'Failed to resolve short link "{url}" ({e}).')
+                return None
+            if not redirect_location:
+                break
+            location = urljoin(location, redirect_location)
+            asin = UrlResolver.extract_asin(location)
+            if asin:
+                self._logger.debug(f'Resolved short link "{url}" to ASIN "{asin}".')
+                return asin
+
+        # If no redirect revealed an ASIN, give up
+        self._logger.warning(f'Short link "{url}" did not resolve to a product.')
+        return None
+
+
+    # Scrape offer fields
+    async def _scrape_fields(self, url:str) -> dict:
+        # TODO Add a docstring
+
+        # Fetch offer page through the pooled session, taking a concurrency
+        # slot once rate limiter lets request through
+        self._logger.info('Fetching offer webpage...')
+        await self.rate_limiter.acquire_async(url)
+        session = self._get_session()
+        async with self._semaphore, session.get(url) as response:
+            html = await response.text()
+
+            # Stop if Amazon is throttling us
+            if response.status in THROTTLING_STATUS_CODES or CAPTCHA_PAGE_MARKER in html:
+                raise ScrapingError(f'Offer webpage is throttled '\
+                                    f'(status {response.status}, or captcha page).')
+            response.raise_for_status()
+
+        # Parse offer page off the event loop (parsing is CPU bound)
+        self._logger.info('Parsing offer webpage...')
+        fields = await asyncio.to_thread(Scraper.parse_amazon_offer_page, html)
+        if not fields:
+            raise OfferParseError('Offer webpage is missing required fields.')
+        self._logger.debug(f'Parsed offer fields: {fields}')
+
+        # Return offer fields
+        return fields
+
+
+    # Scrape offer with retries
+    async def _scrape_with_retries(self, url:str) -> tuple:
+        """
+        Same as Scraper._scrape_with_retries, without blocking the event
+        loop while rate limited, paused or backing off.
+        Returns a (fields, thumbnail content) tuple.
+        """
+
+        for attempt in range(self.max_retries + 1):
+
+            # Wait while circuit breaker has scraping paused
+            await self.circuit_breaker.before_call_async()
+
+            # Scrape offer, reporting outcome to circuit breaker (only
+            # transient failures count; other errors mean Amazon answered,
+            # while unparseable pages and cancellation count for nothing,
+            # only giving back a trial call if in flight)
+            try:
+                fields = await self._scrape_fields(url)
+                thumbnail_content = await self._download_thumbnail(fields['thumbnail_url'])
+            except OfferParseError:
+                self.circuit_breaker.release_call()
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, ScrapingError) as e:
+
+                # Client errors (4xx, but throttling) won't go away on retry,
+                # and mean Amazon answered
+                if isinstance(e, aiohttp.ClientResponseError) \
+                   and 400 <= e.status < 500 and e.status not in THROTTLING_STATUS_CODES:
+                    self.circuit_breaker.record_success()
+                    raise ScrapingError(f'Failed to scrape "{url}" ({e}).') from e
+
+                # Else, count failure and retry
+                self.circuit_breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise ScrapingError(f'Failed to scrape "{url}" '\
+                                        f'after {attempt + 1} attempts ({e}).') from e
+
+                # Back off (2, 4, 8... seconds, capped, half of it random)
+                # before retrying
+                delay = min(DEFAULT_SCRAPER_RETRY_MAX_DELAY,
+                            DEFAULT_SCRAPER_RETRY_BASE_DELAY*2**attempt)
+                delay = random.uniform(delay/2, delay)
+                self._logger.warning(f'Failed to scrape "{url}" ({e}). '\
+                                     f'Retrying in {delay:.1f} seconds...')
+                await asyncio.sleep(delay)
+            except Exception:
+                self.circuit_breaker.record_success()
+                raise
+            except BaseException:
+                self.circuit_breaker.release_call()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return fields, thumbnail_content
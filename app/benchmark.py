@@ -0,0 +1,46 @@
+# --- Imports ---
+
+# Standard
+import glob
+
+# Local
+from image import Generator as ImageGenerator
+from offer import Offer
+
+# Global variables
+DEFAULT_FAKE_THUMBNAIL_PATH = './resources/fake/offer-thumbnail-640x640.png'
+DEFAULT_TEMPLATES_GLOB = './resources/templates/*.png'
+
+
+# --- Main Function ---
+
+def main():
+
+    # Get a fake offer, using the bundled fake thumbnail
+    with open(DEFAULT_FAKE_THUMBNAIL_PATH, 'rb') as file:
+        thumbnail = file.read()
+    offer = Offer.get(url='https://amzn.to/fake',
+                      title='Fone de Ouvido Sem Fio Bluetooth com Cancelamento de Ruído',
+                      thumbnail=thumbnail,
+                      price_now=1299.9,
+                      price_before=1733.2,
+                      discount_rate=0.25)
+
+    # Benchmark every output format on every bundled template
+    generator = ImageGenerator.get()
+    results = generator.benchmark_output_formats(offer=offer,
+                                                 template_paths=sorted(glob.glob(DEFAULT_TEMPLATES_GLOB)))
+
+    # Print results, fastest encode first
+    print(f'{"Template":<34}{"Format":<8}{"Quality":>8}{"Level":>7}{"Encode (ms)":>13}{"Size (KB)":>11}')
+    for result in sorted(results, key=lambda result: result['encode_ms']):
+        print(f'{result["template"]:<34}'\
+              f'{result["format"]:<8}'\
+              f'{str(result["quality"] or "-"):>8}'\
+              f'{str(result["compress_level"] if result["compress_level"] is not None else "-"):>7}'\
+              f'{result["encode_ms"]:>13.1f}'\
+              f'{result["size_kb"]:>11.1f}')
+
+
+# Call main()
+if __name__=='__main__': main()
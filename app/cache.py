@@ -0,0 +1,225 @@
+# --- Imports ---
+
+# Standard
+import logging
+import sqlite3
+import threading
+import time
+
+# Local
+from urls import UrlResolver
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+DEFAULT_CACHE_PATH = './temp/offer-cache.db'
+DEFAULT_CACHE_TTL = 6*60*60 # seconds
+DEFAULT_CACHE_MAX_ENTRIES = 1000
+
+
+# --- The OfferCache class ---
+class OfferCache:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 path:str,
+                 ttl:float,
+                 max_entries:int
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate cache path
+        if not path:
+            raise ValueError('Missing offer cache path.')
+
+        # Validate time to live
+        if not ttl or ttl <= 0:
+            raise ValueError('Offer cache TTL must be positive.')
+
+        # Validate max entries
+        if not max_entries or max_entries < 1:
+            raise ValueError('Offer cache max entries must be at least 1.')
+
+        # Set object attributes
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        # Open database (shared by scraper threads, guarded by lock)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS offers ('
+                                 'key TEXT PRIMARY KEY, '
+                                 'url TEXT NOT NULL, '
+                                 'title TEXT NOT NULL, '
+                                 'thumbnail BLOB NOT NULL, '
+                                 'price_now REAL NOT NULL, '
+                                 'price_before REAL, '
+                                 'discount_rate REAL, '
+                                 'scraped_at REAL NOT NULL, '
+                                 'accessed_at REAL NOT NULL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS offers_accessed_at '
+                                 'ON offers (accessed_at)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS short_links ('
+                                 'url TEXT PRIMARY KEY, '
+                                 'asin TEXT NOT NULL)')
+        self._connection.commit()
+
+
+    # --- Public methods ---
+
+    # Get OfferCache
+    @classmethod
+    def get(cls,
+            path:str = DEFAULT_CACHE_PATH,
+            ttl:float = DEFAULT_CACHE_TTL,
+            max_entries:int = DEFAULT_CACHE_MAX_ENTRIES
+            ):
+        # TODO Add a docstring
+
+        # Return OfferCache object
+        logger.info('Getting OfferCache object...')
+        return OfferCache(path=path,
+                          ttl=ttl,
+                          max_entries=max_entries)
+
+
+    # Get cache key for an url
+    @staticmethod
+    def get_key(url:str) -> str:
+        """
+        Returns the offer's ASIN, if found in url; or the url itself.
+        """
+
+        # Prefer ASIN, so different urls for the same product share an entry
+        return UrlResolver.extract_asin(url) or url.strip()
+
+
+    # Close cache
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Close database
+        with self._lock:
+            self._connection.close()
+
+        # Return nothing
+        return None
+
+
+    # Load offer fields
+    def load(self, url:str) -> dict|None:
+        """
+        Returns cached offer fields (plus "thumbnail" bytes) for url;
+        or None, if not cached or older than the cache TTL.
+        """
+
+        # Look entry up
+        key = self.get_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT title, thumbnail, price_now, price_before, '
+                'discount_rate, scraped_at FROM offers WHERE key = ?',
+                (key,)).fetchone()
+
+            # If not found, stop
+            if not row:
+                self._logger.debug(f'Cache miss for "{key}".')
+                return None
+
+            # If stale, drop entry and stop
+            title, thumbnail, price_now, price_before, discount_rate, scraped_at = row
+            if now - scraped_at > self.ttl:
+                self._logger.debug(f'Cache entry for "{key}" expired.')
+                self._connection.execute('DELETE FROM offers WHERE key = ?', (key,))
+                self._connection.commit()
+                return None
+
+            # Mark entry as recently used
+            self._connection.execute('UPDATE offers SET accessed_at = ? WHERE key = ?',
+                                     (now, key))
+            self._connection.commit()
+        self._logger.debug(f'Cache hit for "{key}".')
+
+        # Return offer fields
+        return {
+            'title': title,
+            'thumbnail': bytes(thumbnail),
+            'price_now': price_now,
+            'price_before': price_before,
+            'discount_rate': discount_rate,
+        }
+
+
+    # Load short link ASIN
+    def load_short_link(self, url:str) -> str|None:
+        # TODO Add a docstring
+
+        # Look short link up (ASINs never change, so no TTL here)
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT asin FROM short_links WHERE url = ?', (url,)).fetchone()
+
+        # Return ASIN, if found
+        return row[0] if row else None
+
+
+    # Store offer fields
+    def store(self,
+              url:str,
+              title:str,
+              thumbnail:bytes,
+              price_now:float,
+              price_before:float|None,
+              discount_rate:float|None
+              ) -> None:
+        # TODO Add a docstring
+
+        # Insert or replace entry
+        key = self.get_key(url)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO offers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, title, thumbnail, price_now, price_before,
+                 discount_rate, now, now))
+
+            # Evict least recently used entries beyond max entries
+            self._connection.execute(
+                'DELETE FROM offers WHERE key IN ('
+                'SELECT key FROM offers ORDER BY accessed_at DESC '
+                'LIMIT -1 OFFSET ?)', (self.max_entries,))
+            self._connection.commit()
+        self._logger.debug(f'Cached offer "{key}".')
+
+        # Return nothing
+        return None
+
+
+    # Store short link ASIN
+    def store_short_link(self, url:str, asin:str) -> None:
+        # TODO Add a docstring
+
+        # Insert or replace short link
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO short_links VALUES (?, ?)', (url, asin))
+            self._connection.commit()
+
+        # Return nothing
+        return None
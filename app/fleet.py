@@ -0,0 +1,309 @@
+# --- Imports ---
+
+# Standard
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+
+# Local
+from android import Device as AndroidDevice
+from android import DEFAULT_ADB_CLIENT_IP, DEFAULT_ADB_LISTEN_PORT
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+DEFAULT_FLEET_DEVICE_NAME = 'device'
+DEFAULT_FLEET_MAX_DEVICES = None # all attached devices
+DEFAULT_FLEET_MAX_STAGED = 3 # per device
+
+# --- The Fleet class ---
+
+class Fleet:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 devices:list,
+                 max_staged:int = DEFAULT_FLEET_MAX_STAGED
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate devices
+        if not devices:
+            raise ValueError('Missing android devices.')
+
+        # Validate max staged stories
+        if not max_staged or max_staged < 1:
+            raise ValueError('Max staged stories must be at least 1.')
+
+        # Set object attributes (work queue holds at most a staging batch
+        # per device, so callers can't run far ahead of posting)
+        self.devices = devices
+        self.max_staged = max_staged
+        self._work_queue = queue.Queue(maxsize=len(devices)*max_staged)
+        self._closing = threading.Event()
+        self._lock = threading.Lock()
+        self._active_devices = len(devices) # devices still taking stories
+
+        # Start a push worker and a post worker per device, linked by a
+        # queue of stories already staged on that device
+        self._workers = []
+        for device in devices:
+            staged_queue = queue.Queue(maxsize=max_staged)
+            self._workers.append(threading.Thread(target=self._run_push_worker,
+                                                  args=(device, staged_queue),
+                                                  name=f'fleet-push-{device.device_id}',
+                                                  daemon=True))
+            self._workers.append(threading.Thread(target=self._run_post_worker,
+                                                  args=(device, staged_queue),
+                                                  name=f'fleet-post-{device.device_id}',
+                                                  daemon=True))
+        for worker in self._workers:
+            worker.start()
+
+
+    # --- Public methods ---
+
+    # Get Fleet
+    @classmethod
+    def get(cls,
+            device_name:str = DEFAULT_FLEET_DEVICE_NAME,
+            client_ip:str = DEFAULT_ADB_CLIENT_IP,
+            listen_port:int = DEFAULT_ADB_LISTEN_PORT,
+            max_devices:int|None = DEFAULT_FLEET_MAX_DEVICES,
+            max_staged:int = DEFAULT_FLEET_MAX_STAGED
+            ):
+        # TODO Add a docstring
+
+        # Return Fleet object, with every attached device
+        logger.info('Getting Fleet object...')
+        return cls(devices=AndroidDevice.get_all(device_name=device_name,
+                                                 client_ip=client_ip,
+                                                 listen_port=listen_port,
+                                                 max_devices=max_devices),
+                   max_staged=max_staged)
+
+
+    # Close fleet
+    def close(self) -> None:
+        """
+        Cancels stories not taken by any device yet, fails stories staged
+        but not posted yet, waits for devices to finish the stories they
+        are posting, then closes every device.
+        """
+
+        # Cancel queued stories
+        self._logger.info('Closing fleet...')
+        self._closing.set()
+        while True:
+            try:
+                future, _, _, _ = self._work_queue.get_nowait()
+            except queue.Empty:
+                break
+            if not future.cancel(): # handed back by a retired device
+                future.set_exception(RuntimeError('Fleet closed before staging story.'))
+
+        # Stop workers (one stop signal per push worker, which passes it on
+        # to its post worker), wait for them
+        for _ in self.devices:
+            self._work_queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+        # Clean up posted images in bulk, close devices
+        for device in self.devices:
+            try:
+                device.clean_up_story_images()
+            except Exception as e:
+                self._logger.error(f'Failed to clean up "{device.device_name}" ({e}).')
+            device.close()
+        self._logger.info('Closed fleet.')
+
+        # Return nothing
+        return None
+
+
+    # Submit story
+    def submit_instagram_story(self,
+                               on_staged=None,
+                               on_posted=None,
+                               **post_kwargs
+                               ) -> Future:
+        """
+        Queues an Instagram story for the first device with room to stage it,
+        with Device.post_instagram_story's keyword arguments. Each device
+        stages (pushes) its next stories in batches while posting the
+        current one; posted images are cleaned up in bulk on close. A
+        device that fails to stage is taken out of rotation, handing its
+        stories back to the others (unless it is the last one left).
+        Blocks while every device is busy and the queue is full.
+        If given, on_staged is called (from a fleet thread) once the story's
+        image is staged on a device, and on_posted once the story is posted
+        (before the future resolves, so it runs even if nobody collects it).
+        Returns a Future, resolved with the posting Device once posted.
+        """
+
+        # Queue story
+        future = Future()
+        self._work_queue.put((future, post_kwargs, on_staged, on_posted))
+        self._logger.debug(f'Queued story "{post_kwargs.get("post_image")}".')
+
+        # Return future
+        return future
+
+
+    # --- Helper methods ---
+
+    # Run callback
+    def _run_callback(self, callback, post_image:str) -> None:
+        # TODO Add a docstring
+
+        # Run caller's callback, logging (not raising) its errors, so they
+        # can't take a worker down
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                self._logger.error(f'Story "{post_image}" callback failed ({e}).')
+
+        # Return nothing
+        return None
+
+
+    # Run post worker
+    def _run_post_worker(self,
+                         device:AndroidDevice,
+                         staged_queue:queue.Queue
+                         ) -> None:
+        # TODO Add a docstring
+
+        # Post staged stories until stop signal
+        work = None
+        try:
+            while True:
+                work = staged_queue.get()
+                if work is None:
+                    break
+                future, post_kwargs, on_posted = work
+
+                # If fleet closing, drop story instead of posting it
+                if self._closing.is_set():
+                    future.set_exception(RuntimeError('Fleet closed before posting story.'))
+                    continue
+
+                # Post story on worker's device, report outcome to future
+                self._logger.info(f'Posting story "{post_kwargs.get("post_image")}" '\
+                                  f'on "{device.device_name}"...')
+                try:
+                    device.post_instagram_story(**post_kwargs)
+                except Exception as e:
+                    self._logger.error(f'Failed to post story on "{device.device_name}" ({e}).')
+                    future.set_exception(e)
+                else:
+                    self._logger.info(f'Posted story on "{device.device_name}".')
+                    self._run_callback(on_posted, post_kwargs.get('post_image'))
+                    future.set_result(device)
+
+        # If worker crashed, fail its current story and every story still
+        # staged (until push worker's stop signal), so no future hangs
+        finally:
+            while work is not None:
+                future = work[0]
+                if not future.done():
+                    future.set_exception(RuntimeError('Fleet worker stopped before posting story.'))
+                work = staged_queue.get()
+
+        # Return nothing
+        return None
+
+
+    # Run push worker
+    def _run_push_worker(self,
+                         device:AndroidDevice,
+                         staged_queue:queue.Queue
+                         ) -> None:
+        # TODO Add a docstring
+
+        # Stage queued stories on worker's device in batches until stop
+        # signal (waits while device already has max staged stories)
+        stopping = False
+        batch = []
+        try:
+            while not stopping:
+
+                # Take a story (waiting for one), plus as many more as are
+                # already queued and fit in device's free staging slots
+                # (stories handed back by a retired device are already running)
+                batch = []
+                work = self._work_queue.get()
+                while work is not None:
+                    future, post_kwargs, on_staged, on_posted = work
+                    if future.running() or future.set_running_or_notify_cancel():
+                        batch.append((future, post_kwargs, on_staged, on_posted))
+                    if len(batch) >= max(1, self.max_staged - staged_queue.qsize()):
+                        break
+                    try:
+                        work = self._work_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                stopping = work is None
+
+                # Push batch's images, hand stories over to post worker
+                if batch:
+                    try:
+                        staged_images = device.stage_story_images([post_kwargs['post_image']
+                                                                   for _, post_kwargs, _, _ in batch])
+                    except Exception as e:
+
+                        # Take device out of rotation, handing batch back to
+                        # the other devices (unless fleet closing, or no
+                        # other device left)
+                        with self._lock:
+                            retiring = self._active_devices > 1 and not self._closing.is_set()
+                            if retiring:
+                                self._active_devices -= 1
+                        if retiring:
+                            self._logger.error(f'Failed to stage stories on "{device.device_name}" ({e}). '\
+                                               f'Taking it out of rotation...')
+                            for work in batch:
+                                self._work_queue.put(work)
+                            batch = []
+                            break
+
+                        # Else, fail batch
+                        self._logger.error(f'Failed to stage stories on "{device.device_name}" ({e}).')
+                        for future, _, _, _ in batch:
+                            future.set_exception(e)
+                    else:
+                        for staged_image in staged_images:
+                            future, post_kwargs, on_staged, on_posted = batch.pop(0)
+                            self._run_callback(on_staged, post_kwargs['post_image'])
+                            staged_queue.put((future,
+                                              {**post_kwargs,
+                                               'post_image': staged_image,
+                                               'post_image_staged': True},
+                                              on_posted))
+
+        # If worker crashed, fail stories taken but not handed over yet (so
+        # no future hangs), then pass stop signal on to post worker
+        finally:
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError('Fleet worker stopped before staging story.'))
+            staged_queue.put(None)
+
+        # Return nothing
+        return None
@@ -1,7 +1,14 @@
 # --- Imports ---
 
 # Standard
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import count, repeat
 import logging
+import os
+import queue
+import threading
+from time import perf_counter
 from textwrap import wrap
 
 # Third party
@@ -29,16 +36,36 @@ DEFAULT_OFFER_TITLE_MAX_LENGTH = 50
 DEFAULT_OUTPUT_FILE_NAME = 'image.png'
 DEFAULT_OUTPUT_FILE_FOLDER = './temp/'
 DEFAULT_IG_POST_TEMPLATE_PATH = './resources/templates/story-720x1280-blue.png'
+DEFAULT_RENDER_WORKERS = os.cpu_count() or 1
+DEFAULT_OUTPUT_FORMAT = 'png'
+DEFAULT_OUTPUT_QUALITY = 90
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+OUTPUT_FORMAT_EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+BENCHMARK_OUTPUT_FORMATS = [('png', None, 9),
+                            ('png', None, 6),
+                            ('png', None, 1),
+                            ('png', None, 0),
+                            ('jpeg', 95, None),
+                            ('jpeg', 85, None),
+                            ('jpeg', 75, None),
+                            ('webp', 90, None),
+                            ('webp', 80, None)]
 
 
 # --- The Generator class ---
 class Generator:
 
+    # Per-process Generator used by batch rendering workers
+    _worker_generator = None
+
     # --- Magic methods ---
 
     # __init__
     def __init__(self,
-                 ig_post_template_path:str):
+                 ig_post_template_path:str,
+                 output_format:str = DEFAULT_OUTPUT_FORMAT,
+                 output_quality:int = DEFAULT_OUTPUT_QUALITY,
+                 png_compress_level:int = DEFAULT_PNG_COMPRESS_LEVEL):
 
         # Instance logger setup
         self._logger = logging.getLogger(__name__)\
@@ -48,8 +75,26 @@ class Generator:
         if not ig_post_template_path:
             raise ValueError('Missing Instagram post template path.')
 
+        # Validate output format
+        if output_format not in OUTPUT_FORMAT_EXTENSIONS:
+            raise ValueError(f'Invalid output format "{output_format}". '\
+                             f'Valid formats: {list(OUTPUT_FORMAT_EXTENSIONS)}.')
+
+        # Validate output quality
+        if not 1 <= output_quality <= 100:
+            raise ValueError('Output quality must be between 1 and 100.')
+
+        # Validate PNG compress level
+        if not 0 <= png_compress_level <= 9:
+            raise ValueError('PNG compress level must be between 0 and 9.')
+
         # Set object variables
         self.ig_post_template_path = ig_post_template_path
+        self.output_format = output_format
+        self.output_quality = output_quality
+        self.png_compress_level = png_compress_level
+        self._font_cache = {}
+        self._template_cache = {}
     
     
     # --- Public methods ---
@@ -57,13 +102,68 @@ class Generator:
     # Get Generator
     @classmethod
     def get(cls, 
-            ig_post_template_path:str = DEFAULT_IG_POST_TEMPLATE_PATH
+            ig_post_template_path:str = DEFAULT_IG_POST_TEMPLATE_PATH,
+            output_format:str = DEFAULT_OUTPUT_FORMAT,
+            output_quality:int = DEFAULT_OUTPUT_QUALITY,
+            png_compress_level:int = DEFAULT_PNG_COMPRESS_LEVEL
             ):
         # TODO Add a docstring
 
         # Return Generator object
         logger.info('Getting Generator object...')
-        return Generator(ig_post_template_path=ig_post_template_path)
+        return Generator(ig_post_template_path=ig_post_template_path,
+                         output_format=output_format,
+                         output_quality=output_quality,
+                         png_compress_level=png_compress_level)
+
+
+    # Benchmark output formats
+    def benchmark_output_formats(self,
+                                 offer:Offer,
+                                 template_paths:list,
+                                 output_formats:list = BENCHMARK_OUTPUT_FORMATS,
+                                 repeats:int = 3
+                                 ) -> list:
+        """
+        Renders offer on each template and encodes it (in memory) with each
+        (format, quality, compress level) in output_formats.
+        Returns one dict per combination, with best encode time and size.
+        """
+
+        # Render and encode offer on every template (restoring ours after)
+        results = []
+        original_template_path = self.ig_post_template_path
+        try:
+            for template_path in template_paths:
+                self.ig_post_template_path = template_path
+                self._render(offer)
+                for output_format, output_quality, png_compress_level in output_formats:
+
+                    # Keep the best of a few encodes, to smooth out noise
+                    encode_times = []
+                    for _ in range(repeats):
+                        buffer = BytesIO()
+                        start = perf_counter()
+                        self._encode_image(fp=buffer,
+                                           output_format=output_format,
+                                           output_quality=output_quality or DEFAULT_OUTPUT_QUALITY,
+                                           png_compress_level=png_compress_level or 0)
+                        encode_times.append(perf_counter() - start)
+
+                    # Save result
+                    result = {'template': os.path.basename(template_path),
+                              'format': output_format,
+                              'quality': output_quality,
+                              'compress_level': png_compress_level,
+                              'encode_ms': min(encode_times)*1000,
+                              'size_kb': buffer.tell()/1024}
+                    self._logger.info(f'Benchmark: {result}')
+                    results.append(result)
+        finally:
+            self.ig_post_template_path = original_template_path
+
+        # Return benchmark results
+        return results
 
 
     # Create Instagram post image
@@ -74,39 +174,11 @@ class Generator:
                              ) -> str:
         # TODO Add a docstring
 
-        # Create new offer image from template
-        self._logger.info('Creating new post image from template...')
-        self._new_image_from_template()
-
-        # Add offer thumbnail to post image
-        # FIXME Make this resize thumbnails while keeping aspect ratio
-        self._logger.info('Adding offer thumbnail to post image...')
-        self._paste(source_path=offer.thumbnail,
-                    x=40,
-                    y=130,
-                    width=640,
-                    heigth=640)
-
-        # Add offer title to post image
-        self._logger.info('Adding offer title to post image...')
-        self._add_offer_title(x=27.5, # (10 + 17.5)
-                              y=827.5, # (100 + 700 + 20 + 7.5)
-                              title=offer.title,
-                              title_max_length=50,
-                              font_size=40,
-                              text_align='left')
-
-        # Add offer price to post image
-        self._logger.info('Adding offer price to post image...')
-        self._add_offer_price(x=27.5, # (10 + 17.5)
-                              y=982.5, # (100 + 700 + 15 + 140 + 15 + 12.5))
-                              price_now=offer.price_now,
-                              price_before=offer.price_before,
-                              font_size=40,
-                              text_align='left')
+        # Render offer into current image
+        self._render(offer)
 
-        # Save offer image as PNG file
-        self._logger.info('Saving post image as PNG file...')
+        # Save offer image as file
+        self._logger.info(f'Saving post image as {self.output_format.upper()} file...')
         output_file_path = self._save_image_as(output_file_name,
                                                output_file_folder)
 
@@ -114,6 +186,93 @@ class Generator:
         return output_file_path
 
 
+    # Create many Instagram post images
+    def create_ig_post_images(self,
+                              offers:list,
+                              output_file_name:str = DEFAULT_OUTPUT_FILE_NAME,
+                              output_file_folder:str = DEFAULT_OUTPUT_FILE_FOLDER,
+                              max_workers:int = DEFAULT_RENDER_WORKERS
+                              ) -> list:
+        """
+        Renders offers across a process pool, one Generator per worker.
+        Outputs are numbered after output_file_name ("image.png" becomes
+        "image-0000.png", "image-0001.png", ...); returns their paths in
+        the same order as offers.
+        """
+
+        # Validate max workers
+        if not max_workers or max_workers < 1:
+            raise ValueError('Render max workers must be at least 1.')
+
+        # Name every output uniquely
+        stem = os.path.splitext(output_file_name)[0]
+        extension = OUTPUT_FORMAT_EXTENSIONS[self.output_format]
+        output_file_names = [f'{stem}-{i:04d}{extension}' for i in range(len(offers))]
+
+        # If a pool is not worth it, render here
+        max_workers = min(max_workers, len(offers))
+        if max_workers <= 1:
+            self._logger.info(f'Rendering {len(offers)} post images...')
+            return [self.create_ig_post_image(offer, name, output_file_folder)
+                    for offer, name in zip(offers, output_file_names)]
+
+        # Else, render across worker processes, keeping offers order
+        self._logger.info(f'Rendering {len(offers)} post images '\
+                          f'with {max_workers} workers...')
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=Generator._init_render_worker,
+                                 initargs=(self.ig_post_template_path,
+                                           self.output_format,
+                                           self.output_quality,
+                                           self.png_compress_level)) as executor:
+            output_file_paths = list(executor.map(Generator._render_in_worker,
+                                                  offers,
+                                                  output_file_names,
+                                                  repeat(output_file_folder)))
+        self._logger.info(f'Rendered {len(offers)} post images.')
+
+        # Return output file paths
+        return output_file_paths
+
+
+    # Iterate over Instagram post images
+    def iter_ig_post_images(self,
+                            offers,
+                            output_file_name:str = DEFAULT_OUTPUT_FILE_NAME,
+                            output_file_folder:str = DEFAULT_OUTPUT_FILE_FOLDER,
+                            max_workers:int = DEFAULT_RENDER_WORKERS,
+                            max_pending:int|None = None
+                            ):
+        """
+        Renders offers (any iterable, e.g. a scraper's offers iterator) on
+        a process pool as they come, keeping at most max_pending (by
+        default, twice max_workers) images rendered or being rendered but
+        not yet taken. Offers are taken on a background thread, so waiting
+        on the next offer (e.g. still being scraped) never holds back
+        images already rendered. Outputs are numbered as in
+        create_ig_post_images.
+        Returns an iterator of (offer, output file path) tuples in the same
+        order as offers; closing it cancels pending renders. Nothing starts
+        (worker processes included) until the iterator is first advanced.
+        """
+
+        # Validate max workers
+        if not max_workers or max_workers < 1:
+            raise ValueError('Render max workers must be at least 1.')
+
+        # Validate max pending
+        max_pending = max_pending or 2*max_workers
+        if max_pending < 1:
+            raise ValueError('Render max pending must be at least 1.')
+
+        # Return post images iterator
+        return self._iter_rendered_images(iter(offers),
+                                          output_file_name,
+                                          output_file_folder,
+                                          max_workers,
+                                          max_pending)
+
+
 # --- Helper methods ---
 
     # Add offer price to current image
@@ -178,6 +337,95 @@ class Generator:
         return None
 
 
+    # Encode current image
+    def _encode_image(self,
+                      fp,
+                      output_format:str,
+                      output_quality:int,
+                      png_compress_level:int
+                      ) -> None:
+        # TODO Add a docstring
+
+        # PNG: lossless, compress level trades encode time for file size
+        if output_format == 'png':
+            self._current_image.save(fp=fp,
+                                     format='PNG',
+                                     compress_level=png_compress_level)
+
+        # JPEG: no alpha channel, so flatten to RGB first
+        elif output_format == 'jpeg':
+            self._current_image.convert('RGB').save(fp=fp,
+                                                    format='JPEG',
+                                                    quality=output_quality,
+                                                    optimize=True)
+
+        # WebP: lossy, keeps alpha channel
+        elif output_format == 'webp':
+            self._current_image.save(fp=fp,
+                                     format='WEBP',
+                                     quality=output_quality)
+
+        # Else, stop
+        else:
+            raise ValueError(f'Invalid output format "{output_format}".')
+
+        # Return nothing
+        return None
+
+
+    # Get font
+    def _get_font(self,
+                  font_path:str,
+                  font_size:float
+                  ) -> ImageFont.FreeTypeFont:
+        # TODO Add a docstring
+
+        # Load font from disk only the first time it is asked for
+        key = (font_path, font_size)
+        if key not in self._font_cache:
+            self._logger.debug(f'Loading font "{font_path}" (size {font_size})...')
+            self._font_cache[key] = ImageFont.truetype(font=font_path,
+                                                       size=font_size,
+                                                       encoding='unic')
+
+        # Return cached font
+        return self._font_cache[key]
+
+
+    # Get template
+    def _get_template(self, template_path:str) -> Image.Image:
+        # TODO Add a docstring
+
+        # Load and decode template only the first time it is asked for
+        if template_path not in self._template_cache:
+            self._logger.debug(f'Loading template "{template_path}"...')
+            template = Image.open(template_path)
+            template.load()
+            self._template_cache[template_path] = template
+
+        # Return cached template (callers must copy it before drawing)
+        return self._template_cache[template_path]
+
+
+    # Initialize render worker
+    @staticmethod
+    def _init_render_worker(ig_post_template_path:str,
+                            output_format:str,
+                            output_quality:int,
+                            png_compress_level:int
+                            ) -> None:
+        # TODO Add a docstring
+
+        # Give this worker process its own Generator (and caches)
+        Generator._worker_generator = Generator(ig_post_template_path=ig_post_template_path,
+                                                output_format=output_format,
+                                                output_quality=output_quality,
+                                                png_compress_level=png_compress_level)
+
+        # Return nothing
+        return None
+
+
     # Insert textbox
     def _insert_textbox(self,
                         text:str,
@@ -190,9 +438,7 @@ class Generator:
         # TODO Add a docstring
         
         # Set the font
-        text_font = ImageFont.truetype(font=font_path,
-                                       size=font_size,
-                                       encoding='unic')
+        text_font = self._get_font(font_path, font_size)
 
         # Add textbox to offer image
         self._logger.debug(f'Inserting textbox at (x,y)=({x}, {y}) '\
@@ -210,12 +456,80 @@ class Generator:
         return None
 
 
+    # Iterate over rendered images
+    def _iter_rendered_images(self,
+                              offers,
+                              output_file_name:str,
+                              output_file_folder:str,
+                              max_workers:int,
+                              max_pending:int):
+        # TODO Add a docstring
+
+        # Start render worker processes
+        self._logger.info(f'Rendering post images with {max_workers} workers...')
+        executor = ProcessPoolExecutor(max_workers=max_workers,
+                                       initializer=Generator._init_render_worker,
+                                       initargs=(self.ig_post_template_path,
+                                                 self.output_format,
+                                                 self.output_quality,
+                                                 self.png_compress_level))
+
+        # Set output file name for each offer index
+        stem = os.path.splitext(output_file_name)[0]
+        extension = OUTPUT_FORMAT_EXTENSIONS[self.output_format]
+        output_file_names = (f'{stem}-{i:04d}{extension}' for i in count())
+
+        # Take offers and submit their renders on a feeder thread, in
+        # offers order, while a slot is free (never more than max_pending
+        # renders not yet taken); a failure taking offers is passed on in
+        # place of the next render, and None marks the end
+        pending = queue.Queue()
+        free_slots = threading.Semaphore(max_pending)
+        stopping = threading.Event()
+        def feed() -> None:
+            try:
+                while True:
+                    while not free_slots.acquire(timeout=0.1):
+                        if stopping.is_set():
+                            return
+                    offer = next(offers, None)
+                    if offer is None or stopping.is_set():
+                        break
+                    pending.put((offer,
+                                 executor.submit(Generator._render_in_worker,
+                                                 offer,
+                                                 next(output_file_names),
+                                                 output_file_folder)))
+            except Exception as e:
+                pending.put((None, e))
+            pending.put(None)
+        feeder = threading.Thread(target=feed, name='render-feeder', daemon=True)
+        feeder.start()
+
+        # Hand images over in offers order as they become ready
+        try:
+            while (work := pending.get()) is not None:
+                offer, render = work
+                if offer is None:
+                    raise render
+                free_slots.release()
+                yield offer, render.result()
+
+        # Stop feeder (once done with the offer it may be waiting on), drop
+        # whatever is still queued if the caller stops early
+        finally:
+            stopping.set()
+            feeder.join()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._logger.info('Stopped rendering post images.')
+
+
     # New image from template
     def _new_image_from_template(self) -> None:
         # TODO Add a docstring
 
-        # Create new PIL Image from template
-        new_image = Image.open(self.ig_post_template_path)
+        # Create new PIL Image as a copy of the pristine template
+        new_image = self._get_template(self.ig_post_template_path).copy()
 
         # Set new image as object current image
         self._current_image = new_image
@@ -226,7 +540,7 @@ class Generator:
 
     # Paste image into current image
     def _paste(self, 
-               source_path:str,
+               source:bytes|str,
                x:int,
                y:int,
                width:int,
@@ -234,8 +548,10 @@ class Generator:
                ) -> None:
         # TODO Add a docstring
 
-        # Load source image as PIL Image
-        im_src = Image.open(fp=source_path)
+        # Load source image (encoded bytes or file path) as PIL Image
+        if isinstance(source, bytes):
+            source = BytesIO(source)
+        im_src = Image.open(fp=source)
 
         # Resize source image
         im_src = im_src.resize(size=(width, heigth))
@@ -247,6 +563,59 @@ class Generator:
         return None
 
 
+    # Render offer into current image
+    def _render(self, offer:Offer) -> None:
+        # TODO Add a docstring
+
+        # Create new offer image from template
+        self._logger.info('Creating new post image from template...')
+        self._new_image_from_template()
+
+        # Add offer thumbnail to post image
+        # FIXME Make this resize thumbnails while keeping aspect ratio
+        self._logger.info('Adding offer thumbnail to post image...')
+        self._paste(source=offer.thumbnail,
+                    x=40,
+                    y=130,
+                    width=640,
+                    heigth=640)
+
+        # Add offer title to post image
+        self._logger.info('Adding offer title to post image...')
+        self._add_offer_title(x=27.5, # (10 + 17.5)
+                              y=827.5, # (100 + 700 + 20 + 7.5)
+                              title=offer.title,
+                              title_max_length=50,
+                              font_size=40,
+                              text_align='left')
+
+        # Add offer price to post image
+        self._logger.info('Adding offer price to post image...')
+        self._add_offer_price(x=27.5, # (10 + 17.5)
+                              y=982.5, # (100 + 700 + 15 + 140 + 15 + 12.5))
+                              price_now=offer.price_now,
+                              price_before=offer.price_before,
+                              font_size=40,
+                              text_align='left')
+
+        # Return nothing
+        return None
+
+
+    # Render in worker
+    @staticmethod
+    def _render_in_worker(offer:Offer,
+                          output_file_name:str,
+                          output_file_folder:str
+                          ) -> str:
+        # TODO Add a docstring
+
+        # Render offer with this worker's Generator
+        return Generator._worker_generator.create_ig_post_image(offer,
+                                                                output_file_name,
+                                                                output_file_folder)
+
+
     # Save current image as
     def _save_image_as(self,
                        output_file_name:str = DEFAULT_OUTPUT_FILE_NAME,
@@ -254,12 +623,18 @@ class Generator:
                        ) -> str:
         # TODO Add a docstring
 
-        # Set destination path
+        # Set destination path, with the extension of the output format
+        output_file_name = os.path.splitext(output_file_name)[0] \
+                           + OUTPUT_FORMAT_EXTENSIONS[self.output_format]
         output_file_path = f'{output_file_folder}{output_file_name}'
 
         # Save current image to output file path
         self._logger.debug(f'Saving current image to "{output_file_path}"...')
-        self._current_image.save(fp=output_file_path)
+        with open(output_file_path, 'wb') as file:
+            self._encode_image(fp=file,
+                               output_format=self.output_format,
+                               output_quality=self.output_quality,
+                               png_compress_level=self.png_compress_level)
         self._logger.debug('Saved current image. Return output file path.')
 
         # Return destination path
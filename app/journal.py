@@ -0,0 +1,216 @@
+# --- Imports ---
+
+# Standard
+import json
+import logging
+import os
+import threading
+import time
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+DEFAULT_JOURNAL_PATH = './temp/progress-journal.jsonl'
+DEFAULT_JOURNAL_COMPACT_MIN_RECORDS = 1000
+JOURNAL_STATES = ['scraped', 'rendered', 'pushed', 'posted', 'failed']
+
+
+# --- The Journal class ---
+class Journal:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 path:str,
+                 compact_min_records:int
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate journal path
+        if not path:
+            raise ValueError('Missing progress journal path.')
+
+        # Validate compaction threshold
+        if not compact_min_records or compact_min_records < 1:
+            raise ValueError('Journal compaction threshold must be at least 1.')
+
+        # Set object attributes
+        self.path = path
+        self.compact_min_records = compact_min_records
+        self._lock = threading.Lock()
+        self._states = {}
+        self._record_count = 0
+
+        # Replay journal (if any), then open it for appending (compacting
+        # it first, if it has unreadable records or an unterminated last
+        # record, which the next append would run into)
+        needs_compaction = self._replay()
+        self._file = open(path, 'a', encoding='utf-8')
+        if needs_compaction:
+            with self._lock:
+                self._compact()
+
+
+    # --- Public methods ---
+
+    # Get Journal
+    @classmethod
+    def get(cls,
+            path:str = DEFAULT_JOURNAL_PATH,
+            compact_min_records:int = DEFAULT_JOURNAL_COMPACT_MIN_RECORDS
+            ):
+        # TODO Add a docstring
+
+        # Return Journal object
+        logger.info('Getting Journal object...')
+        return Journal(path=path,
+                       compact_min_records=compact_min_records)
+
+
+    # Close journal
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Close journal file
+        with self._lock:
+            self._file.close()
+
+        # Return nothing
+        return None
+
+
+    # Compact journal
+    def compact(self, keep_urls:list|None = None) -> None:
+        """
+        Atomically rewrites the journal with a single record (the latest
+        state) per offer url; only for keep_urls, if given (e.g. at a
+        checkpoint, once finished offers are out of input.txt).
+        """
+
+        # Rewrite journal under lock
+        with self._lock:
+            self._compact(keep_urls)
+
+        # Return nothing
+        return None
+
+
+    # Get offer state
+    def get_state(self, url:str) -> str|None:
+        """
+        Returns the latest recorded state for an offer url; or None, if
+        never recorded.
+        """
+
+        # Look state up
+        with self._lock:
+            return self._states.get(url)
+
+
+    # Record offer state
+    def record(self, url:str, state:str) -> None:
+        """
+        Appends an offer url's new state to the journal and syncs it to
+        disk before returning (safe to call from any thread).
+        """
+
+        # Validate state
+        if state not in JOURNAL_STATES:
+            raise ValueError(f'Invalid journal state "{state}". '\
+                             f'Valid states: {JOURNAL_STATES}.')
+
+        # Append record, sync it to disk
+        record = json.dumps({'url': url, 'state': state, 'at': time.time()})
+        with self._lock:
+            self._file.write(f'{record}\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._states[url] = state
+            self._record_count += 1
+            self._logger.debug(f'Recorded "{url}" as {state}.')
+
+            # If journal grew much larger than its live states, compact it
+            if self._record_count >= max(self.compact_min_records, 2*len(self._states)):
+                self._compact()
+
+        # Return nothing
+        return None
+
+
+    # --- Helper methods ---
+
+    # Compact journal (lock held)
+    def _compact(self, keep_urls:list|None = None) -> None:
+        # TODO Add a docstring
+
+        # Keep latest state per url (only for kept urls, if given)
+        if keep_urls is not None:
+            keep_urls = set(keep_urls)
+            self._states = {url: state for url, state in self._states.items()
+                            if url in keep_urls}
+
+        # Write compacted journal to a temporary file, sync it to disk
+        self._logger.debug(f'Compacting journal ({self._record_count} records, '\
+                           f'{len(self._states)} offers)...')
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            for url, state in self._states.items():
+                file.write(json.dumps({'url': url, 'state': state, 'at': time.time()}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+        # Swap it in for the journal (atomic), reopen journal for appending
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._record_count = len(self._states)
+        self._logger.debug('Compacted journal.')
+
+        # Return nothing
+        return None
+
+
+    # Replay journal
+    def _replay(self) -> bool:
+        """
+        Loads the latest state per url from the journal file. Returns True
+        if the file needs rewriting before appending to it (unreadable
+        records, or a last record missing its newline); else False.
+        """
+
+        # If no journal yet, stop
+        if not os.path.exists(self.path):
+            return False
+
+        # Read records in order, latest state per url wins (a torn last
+        # record, from a crash mid-write, is skipped)
+        skipped_records = 0
+        unterminated = False
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                unterminated = not line.endswith('\n')
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    self._logger.warning(f'Skipping unreadable journal record "{line.strip()}".')
+                    skipped_records += 1
+                    continue
+                self._states[record['url']] = record['state']
+                self._record_count += 1
+        self._logger.info(f'Replayed journal ({self._record_count} records, '\
+                          f'{len(self._states)} offers).')
+
+        # Return whether journal needs compaction
+        return bool(skipped_records) or unterminated
@@ -23,7 +23,7 @@ class Offer:
     def __init__(self,
                  url:str,
                  title:str,
-                 thumbnail:str,
+                 thumbnail:bytes,
                  price_now:float,
                  price_before:float|None,
                  discount_rate:float|None,
@@ -63,7 +63,7 @@ class Offer:
         return f'------------------------ Offer Info ------------------------\n'\
                f'URL:            {self.url}\n'\
                f'Title:          {self.title}\n'\
-               f'Thumbnail:      {self.thumbnail}\n'\
+               f'Thumbnail:      {len(self.thumbnail)} bytes\n'\
                f'"Now" price:    {self.price_now}\n'\
                f'"Before" price: {self.price_before}\n'\
                f'Discount rate:  {self.discount_rate}\n'\
@@ -77,7 +77,7 @@ class Offer:
     def get(cls,
             url:str,
             title:str,
-            thumbnail:str,
+            thumbnail:bytes,
             price_now:float,
             price_before:float|None,
             discount_rate:float|None
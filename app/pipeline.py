@@ -1,13 +1,16 @@
 # --- Imports ---
 
 # Standard
+from functools import partial
 import logging
 import os
 import sys
 
 # Local
-from android import Device as AndroidDevice
+from cache import OfferCache
+from fleet import Fleet as DeviceFleet
 from image import Generator as ImageGenerator
+from journal import Journal as ProgressJournal
 from scraping import Scraper as OfferScraper
 
 # --- Global Configuration ---
@@ -31,7 +34,18 @@ DEFAULT_VALID_URL_PREFIXES = ['https://amzn.to/',
 DEFAULT_POST_IMG_TEMPLATE_PATH = './resources/templates/story-720x1280-gray-white.png'
 DEFAULT_POST_IMG_OUTPUT_FILE_NAME = 'post-image.png'
 DEFAULT_POST_IMG_OUTPUT_FOLDER = './temp/'
+DEFAULT_POST_IMG_OUTPUT_FORMAT = 'png'
+DEFAULT_POST_IMG_OUTPUT_QUALITY = 90
+DEFAULT_POST_IMG_PNG_COMPRESS_LEVEL = 6
 DEFAULT_IG_LINK_STICKER_TEXT = 'ver oferta'
+DEFAULT_OFFER_CACHE_PATH = './temp/offer-cache.db'
+DEFAULT_OFFER_CACHE_TTL = 6*60*60 # seconds
+DEFAULT_SCRAPER_ENGINE = 'http'
+DEFAULT_SCRAPER_WORKERS = 4
+DEFAULT_SCRAPER_PROFILE_DIR = None # e.g. './temp/chrome-profile/', for warm webdrivers across runs
+DEFAULT_RENDER_WORKERS = 2
+DEFAULT_MAX_DEVICES = 1 # None for every attached device
+DEFAULT_JOURNAL_PATH = './temp/progress-journal.jsonl'
 
 # --- The Pipeline class ---
 
@@ -48,7 +62,18 @@ class Pipeline:
                  post_img_template_path:str,
                  post_img_output_file_name:str,
                  post_img_output_folder:str,
+                 post_img_output_format:str,
+                 post_img_output_quality:int,
+                 post_img_png_compress_level:int,
                  ig_link_sticker_text:str,
+                 offer_cache_path:str|None,
+                 offer_cache_ttl:float,
+                 scraper_engine:str,
+                 scraper_workers:int,
+                 scraper_profile_dir:str|None,
+                 render_workers:int,
+                 max_devices:int|None,
+                 journal_path:str,
                  ):
 
         # Instance logger setup
@@ -83,10 +108,38 @@ class Pipeline:
         if not post_img_output_folder:
             raise ValueError('Missing post image output folder path.')
         
+        # Validate post image output format
+        if not post_img_output_format:
+            raise ValueError('Missing post image output format.')
+
         # Validate Instagram link sticker text
         if not ig_link_sticker_text:
             raise ValueError('Missing Instagram link sticker text.')
 
+        # Validate offer cache TTL
+        if offer_cache_path and (not offer_cache_ttl or offer_cache_ttl <= 0):
+            raise ValueError('Offer cache TTL must be positive.')
+
+        # Validate scraper engine
+        if not scraper_engine:
+            raise ValueError('Missing scraper engine.')
+
+        # Validate scraper workers
+        if not scraper_workers or scraper_workers < 1:
+            raise ValueError('Scraper workers must be at least 1.')
+
+        # Validate render workers
+        if not render_workers or render_workers < 1:
+            raise ValueError('Render workers must be at least 1.')
+
+        # Validate journal path
+        if not journal_path:
+            raise ValueError('Missing progress journal path.')
+
+        # Validate max devices
+        if max_devices is not None and max_devices < 1:
+            raise ValueError('Max devices must be at least 1 (or None, for every device).')
+
         # Set object variables
         self.input_txt_file_name = input_txt_file_name
         self.input_txt_folder = input_txt_folder
@@ -96,7 +149,18 @@ class Pipeline:
         self.post_img_template_path = post_img_template_path
         self.post_img_output_file_name = post_img_output_file_name
         self.post_img_output_folder = post_img_output_folder
+        self.post_img_output_format = post_img_output_format
+        self.post_img_output_quality = post_img_output_quality
+        self.post_img_png_compress_level = post_img_png_compress_level
         self.ig_link_sticker_text = ig_link_sticker_text
+        self.offer_cache_path = offer_cache_path
+        self.offer_cache_ttl = offer_cache_ttl
+        self.scraper_engine = scraper_engine
+        self.scraper_workers = scraper_workers
+        self.scraper_profile_dir = scraper_profile_dir
+        self.render_workers = render_workers
+        self.max_devices = max_devices
+        self.journal_path = journal_path
 
 
     # --- Public methods ---
@@ -111,7 +175,18 @@ class Pipeline:
             post_img_template_path:str = DEFAULT_POST_IMG_TEMPLATE_PATH,
             post_img_output_file_name:str = DEFAULT_POST_IMG_OUTPUT_FILE_NAME,
             post_img_output_folder:str = DEFAULT_POST_IMG_OUTPUT_FOLDER,
-            ig_link_sticker_text:str = DEFAULT_IG_LINK_STICKER_TEXT
+            post_img_output_format:str = DEFAULT_POST_IMG_OUTPUT_FORMAT,
+            post_img_output_quality:int = DEFAULT_POST_IMG_OUTPUT_QUALITY,
+            post_img_png_compress_level:int = DEFAULT_POST_IMG_PNG_COMPRESS_LEVEL,
+            ig_link_sticker_text:str = DEFAULT_IG_LINK_STICKER_TEXT,
+            offer_cache_path:str|None = DEFAULT_OFFER_CACHE_PATH,
+            offer_cache_ttl:float = DEFAULT_OFFER_CACHE_TTL,
+            scraper_engine:str = DEFAULT_SCRAPER_ENGINE,
+            scraper_workers:int = DEFAULT_SCRAPER_WORKERS,
+            scraper_profile_dir:str|None = DEFAULT_SCRAPER_PROFILE_DIR,
+            render_workers:int = DEFAULT_RENDER_WORKERS,
+            max_devices:int|None = DEFAULT_MAX_DEVICES,
+            journal_path:str = DEFAULT_JOURNAL_PATH
             ):
         # TODO Add a docstring
 
@@ -124,7 +199,18 @@ class Pipeline:
                         post_img_template_path=post_img_template_path,
                         post_img_output_file_name=post_img_output_file_name,
                         post_img_output_folder=post_img_output_folder,
-                        ig_link_sticker_text=ig_link_sticker_text)
+                        post_img_output_format=post_img_output_format,
+                        post_img_output_quality=post_img_output_quality,
+                        post_img_png_compress_level=post_img_png_compress_level,
+                        ig_link_sticker_text=ig_link_sticker_text,
+                        offer_cache_path=offer_cache_path,
+                        offer_cache_ttl=offer_cache_ttl,
+                        scraper_engine=scraper_engine,
+                        scraper_workers=scraper_workers,
+                        scraper_profile_dir=scraper_profile_dir,
+                        render_workers=render_workers,
+                        max_devices=max_devices,
+                        journal_path=journal_path)
 
 
     # Run pipeline
@@ -152,43 +238,113 @@ class Pipeline:
                      f'Add valid urls to the file and '\
                      f'run pipeline again.')
 
+        # Open progress journal, skip offers it has as posted (by a run
+        # that stopped before re-creating input.txt)
+        self._logger.info('Opening progress journal...')
+        journal = ProgressJournal.get(path=self.journal_path)
+        for offer_url in [url for url in offer_urls if journal.get_state(url) == 'posted']:
+            self._logger.info(f'Skipping offer "{offer_url}", already posted.')
+            offer_urls.remove(offer_url)
+
+        # Get offer cache object (if enabled)
+        cache = None
+        if self.offer_cache_path:
+            self._logger.info('Opening offer cache...')
+            cache = OfferCache.get(path=self.offer_cache_path,
+                                   ttl=self.offer_cache_ttl)
+
         # Get offer scraper object
         self._logger.info('Creating offer scraper...')
-        scraper = OfferScraper.get()
-
-        # Get image generator object
-        self._logger.info('Creating offer image generator...')
-        generator = ImageGenerator.get(ig_post_template_path=self.post_img_template_path)
-
-        # Get android device object
-        self._logger.info('Connecting to android device...')
-        device = AndroidDevice.get(device_name='device')
-
-        # Do this (len(offer_urls)+1) times
-        for i in range(len(offer_urls)):
-
-            # Scrape first url on offer urls list
-            offer = scraper.scrape_amazon_offer(offer_urls[0])
-
-            # Create Instagram post image
-            img_post = generator.create_ig_post_image(offer,
-                                                      self.post_img_output_file_name,
-                                                      self.post_img_output_folder)
-
-            # Post Instagram story
-            device.post_instagram_story(post_image=img_post,
-                                        linksticker_url=offer.url,
-                                        linksticker_custom_text=self.ig_link_sticker_text,
-                                        close_friends_only=True)
-
-            # Remove first url from offer urls list
-            offer_urls.pop(0)
-
-            # Re-create input.txt
+        scraper = OfferScraper.get(engine=self.scraper_engine,
+                                   webdriver_pool_size=self.scraper_workers,
+                                   cache=cache,
+                                   webdriver_profile_dir=self.scraper_profile_dir,
+                                   max_workers=self.scraper_workers)
+
+        # Resolve short links and drop repeated offers
+        self._logger.info('Resolving offer urls...')
+        canonical_urls = scraper.url_resolver.resolve_many(offer_urls)
+        offer_urls = self._dedupe_offer_urls(offer_urls, canonical_urls)
+
+        # Start scraping offers ahead of posting, in the background
+        # (scrape stage: a bounded window of offers on a thread pool;
+        # offers still failing after retries are skipped, and stay in
+        # input.txt for next run)
+        self._logger.info('Starting offer scraping...')
+        offers = scraper.scrape_amazon_offers(urls=list(offer_urls),
+                                              on_failed=partial(journal.record,
+                                                                state='failed'))
+        scraped_offers = self._record_offers(offers, journal, 'scraped')
+
+        # From here on, make sure scraper webdrivers are quitted at the end
+        post_images = None
+        fleet = None
+        try:
+
+            # Get image generator object
+            self._logger.info('Creating offer image generator...')
+            generator = ImageGenerator.get(ig_post_template_path=self.post_img_template_path,
+                                           output_format=self.post_img_output_format,
+                                           output_quality=self.post_img_output_quality,
+                                           png_compress_level=self.post_img_png_compress_level)
+
+            # Render offers as they are scraped (render stage: a bounded
+            # window of images on a process pool, each under its own name)
+            post_images = generator.iter_ig_post_images(scraped_offers,
+                                                        self.post_img_output_file_name,
+                                                        self.post_img_output_folder,
+                                                        max_workers=self.render_workers)
+
+            # Get android device fleet object (push and post stages: each
+            # device stages its next story while posting the current one)
+            self._logger.info('Connecting to android devices...')
+            fleet = DeviceFleet.get(max_devices=self.max_devices)
+
+            # Hand images to the fleet as they are rendered (same order as
+            # offer urls list); handing blocks while the fleet is full,
+            # which in turn holds back rendering and scraping
+            posts = []
+            for offer, img_post in post_images:
+                journal.record(offer.url, 'rendered')
+
+                # Queue Instagram story for the first free device
+                future = fleet.submit_instagram_story(on_staged=partial(journal.record,
+                                                                        offer.url,
+                                                                        'pushed'),
+                                                      on_posted=partial(journal.record,
+                                                                        offer.url,
+                                                                        'posted'),
+                                                      post_image=img_post,
+                                                      linksticker_url=offer.url,
+                                                      linksticker_custom_text=self.ig_link_sticker_text,
+                                                      close_friends_only=True)
+                posts.append((offer.url, img_post, future))
+
+                # Check on stories posted so far
+                posts = self._collect_posted_offers(posts, journal)
+
+            # Wait for remaining stories
+            self._collect_posted_offers(posts, journal, wait=True)
+        finally:
+            if post_images:
+                post_images.close()
+            offers.close()
+            scraper.close()
+            if fleet:
+                fleet.close()
+            if cache:
+                cache.close()
+
+            # Checkpoint progress: re-create input.txt without posted
+            # offers, then drop them from journal
+            self._logger.info('Checkpointing progress...')
+            remaining_urls = [url for url in offer_urls if journal.get_state(url) != 'posted']
             self._create_input_txt(content=self.input_txt_default_content,
-                                   urls=offer_urls)
+                                   urls=remaining_urls)
+            journal.compact(keep_urls=remaining_urls)
+            journal.close()
 
-            self._logger.info('Pipeline run complete.')
+        self._logger.info('Pipeline run complete.')
 
 
     # --- Helper methods ---
@@ -221,6 +377,45 @@ class Pipeline:
                 return 1
 
 
+    # Collect posted offers
+    def _collect_posted_offers(self,
+                               posts:list,
+                               journal:ProgressJournal,
+                               wait:bool = False
+                               ) -> list:
+        """
+        Checks on queued stories (list of (offer url, post image path,
+        future) tuples). For each finished story, records it in progress
+        journal as failed if it failed (failed offers stay in input.txt for
+        next run; posted ones were recorded by the fleet as they posted)
+        and removes its post image.
+        If wait, waits for every story to finish.
+        Returns stories still pending.
+        """
+
+        # Check each queued story
+        pending_posts = []
+        for offer_url, img_post, future in posts:
+            if not (wait or future.done()):
+                pending_posts.append((offer_url, img_post, future))
+                continue
+
+            # Record story if it failed
+            try:
+                future.result()
+            except Exception as e:
+                self._logger.error(f'Failed to post offer "{offer_url}" ({e}). '\
+                                   f'Keeping it in input.txt.')
+                journal.record(offer_url, 'failed')
+
+            # Remove post image
+            if os.path.exists(img_post):
+                os.remove(img_post)
+
+        # Return pending stories
+        return pending_posts
+
+
     # Create input.txt
     def _create_input_txt(self,
                           content:str = '',
@@ -231,20 +426,48 @@ class Pipeline:
         # If urls list provided, add urls to content
         if len(urls) > 0:
             self._logger.debug(f'Adding urls to input.txt content...')
-            for url in urls:
-                content = f'{content}{url}\n'
+            content = content + ''.join(f'{url}\n' for url in urls)
             self._logger.debug(f'Added urls.')
 
-        # Create text file and write content
+        # Write content to a temporary file, then swap it in for input.txt
+        # (atomic, so a crash never leaves a half-written file)
         self._logger.debug(f'Creating "{self.input_txt_file_path}"...')
-        with open(self.input_txt_file_path, 'w') as file:
+        temp_file_path = f'{self.input_txt_file_path}.tmp'
+        with open(temp_file_path, 'w') as file:
             file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file_path, self.input_txt_file_path)
         self._logger.debug(f'Created file.')
 
         # Return nothing
         return None
 
 
+    # Dedupe offer urls
+    def _dedupe_offer_urls(self,
+                           offer_urls:list,
+                           canonical_urls:list
+                           ) -> list:
+        # TODO Add a docstring
+
+        # Keep the first offer url seen for each canonical url
+        seen_urls = set()
+        unique_urls = []
+        for offer_url, canonical_url in zip(offer_urls, canonical_urls):
+            if canonical_url in seen_urls:
+                self._logger.info(f'Skipping repeated offer "{offer_url}" '\
+                                  f'("{canonical_url}").')
+                continue
+            seen_urls.add(canonical_url)
+            unique_urls.append(offer_url)
+        self._logger.debug(f'Deduped offer urls. '\
+                           f'Unique offers found: {len(unique_urls)}.')
+
+        # Return unique offer urls
+        return unique_urls
+
+
     # Parse input.txt
     def _parse_input_txt(self) -> list:
         # TODO Add a docstring
@@ -257,7 +480,7 @@ class Pipeline:
         valid_lines = []
         for line in lines:
             for valid_url_prefix in self.valid_url_prefixes:
-                if valid_url_prefix in line:
+                if line.strip().startswith(valid_url_prefix):
                     valid_lines.append(line)
                     break
 
@@ -271,3 +494,15 @@ class Pipeline:
         # Return valid urls list
         return valid_urls
 
+
+    # Record offers
+    def _record_offers(self,
+                       offers,
+                       journal:ProgressJournal,
+                       state:str):
+        # TODO Add a docstring
+
+        # Record each offer's state in progress journal as it passes through
+        for offer in offers:
+            journal.record(offer.url, state)
+            yield offer
@@ -0,0 +1,341 @@
+# --- Imports ---
+
+# Standard
+import asyncio
+from collections import deque
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+DEFAULT_RATE_LIMITER_RATE = 1.0 # requests per second, per host
+DEFAULT_RATE_LIMITER_BURST = 3 # requests, per host
+DEFAULT_CIRCUIT_BREAKER_FAILURE_RATE = 0.5
+DEFAULT_CIRCUIT_BREAKER_WINDOW = 10 # calls
+DEFAULT_CIRCUIT_BREAKER_MIN_CALLS = 4
+DEFAULT_CIRCUIT_BREAKER_COOLDOWN = 60 # seconds
+
+
+# --- The RateLimiter class ---
+class RateLimiter:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 rate:float,
+                 burst:int
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate rate
+        if not rate or rate <= 0:
+            raise ValueError('Rate limiter rate must be positive.')
+
+        # Validate burst
+        if not burst or burst < 1:
+            raise ValueError('Rate limiter burst must be at least 1.')
+
+        # Set object attributes
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {} # host -> (tokens, last refill time)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+
+    # --- Public methods ---
+
+    # Get RateLimiter
+    @classmethod
+    def get(cls,
+            rate:float = DEFAULT_RATE_LIMITER_RATE,
+            burst:int = DEFAULT_RATE_LIMITER_BURST
+            ):
+        # TODO Add a docstring
+
+        # Return RateLimiter object
+        logger.info('Getting RateLimiter object...')
+        return RateLimiter(rate=rate,
+                           burst=burst)
+
+
+    # Acquire token
+    def acquire(self, url:str) -> None:
+        """
+        Blocks until url's host has a token left in its bucket, then takes
+        it. Buckets hold up to burst tokens and refill at rate tokens per
+        second, so each host sees at most rate requests per second (after
+        an initial burst), however many threads are requesting.
+        Raises RuntimeError if the limiter is (or gets) closed meanwhile.
+        """
+
+        # Take a token from host's bucket, waiting for one if empty (until
+        # limiter closes)
+        host = urlsplit(url).netloc
+        while (wait_time := self._take_token(host)):
+            self._logger.debug(f'Rate limiting "{host}" for {wait_time:.2f} seconds...')
+            if self._closed.wait(wait_time):
+                raise RuntimeError('Rate limiter is closed.')
+
+        # Return nothing
+        return None
+
+
+    # Acquire token (async)
+    async def acquire_async(self, url:str) -> None:
+        """
+        Same as acquire, for coroutines (waits without blocking the event
+        loop). Shares buckets with acquire.
+        """
+
+        # Take a token from host's bucket, waiting for one if empty (until
+        # limiter closes, checked at least every second)
+        host = urlsplit(url).netloc
+        while (wait_time := self._take_token(host)):
+            if self._closed.is_set():
+                raise RuntimeError('Rate limiter is closed.')
+            self._logger.debug(f'Rate limiting "{host}" for {wait_time:.2f} seconds...')
+            await asyncio.sleep(min(wait_time, 1))
+
+        # Return nothing
+        return None
+
+
+    # Close rate limiter
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Wake up threads waiting for a token (acquire raises instead of
+        # waiting from now on)
+        self._closed.set()
+
+        # Return nothing
+        return None
+
+
+    # --- Helper methods ---
+
+    # Take token
+    def _take_token(self, host:str) -> float:
+        # TODO Add a docstring
+
+        # Refill host's bucket, then take a token if there is one
+        with self._lock:
+            now = time.monotonic()
+            tokens, refilled_at = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - refilled_at)*self.rate)
+            if tokens >= 1:
+                self._buckets[host] = (tokens - 1, now)
+                return 0
+            self._buckets[host] = (tokens, now)
+
+        # Return time until next token (0 if taken)
+        return (1 - tokens)/self.rate
+
+
+# --- The CircuitBreaker class ---
+class CircuitBreaker:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 failure_rate:float,
+                 window:int,
+                 min_calls:int,
+                 cooldown:float
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate failure rate
+        if not failure_rate or not 0 < failure_rate <= 1:
+            raise ValueError('Circuit breaker failure rate must be in (0, 1].')
+
+        # Validate window
+        if not window or window < 1:
+            raise ValueError('Circuit breaker window must be at least 1.')
+
+        # Validate min calls
+        if not min_calls or not 1 <= min_calls <= window:
+            raise ValueError('Circuit breaker min calls must be in [1, window].')
+
+        # Validate cooldown
+        if not cooldown or cooldown <= 0:
+            raise ValueError('Circuit breaker cooldown must be positive.')
+
+        # Set object attributes
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = 'closed' # 'closed', 'open' or 'half-open'
+        self._outcomes = deque(maxlen=window) # True for failures
+        self._opened_at = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+
+    # --- Public methods ---
+
+    # Get CircuitBreaker
+    @classmethod
+    def get(cls,
+            failure_rate:float = DEFAULT_CIRCUIT_BREAKER_FAILURE_RATE,
+            window:int = DEFAULT_CIRCUIT_BREAKER_WINDOW,
+            min_calls:int = DEFAULT_CIRCUIT_BREAKER_MIN_CALLS,
+            cooldown:float = DEFAULT_CIRCUIT_BREAKER_COOLDOWN
+            ):
+        # TODO Add a docstring
+
+        # Return CircuitBreaker object
+        logger.info('Getting CircuitBreaker object...')
+        return CircuitBreaker(failure_rate=failure_rate,
+                              window=window,
+                              min_calls=min_calls,
+                              cooldown=cooldown)
+
+
+    # Wait until closed
+    def before_call(self) -> None:
+        """
+        Blocks while the circuit is open (scraping paused). Once cooldown
+        is over, lets a single trial call through (half-open); the rest
+        keep waiting until it succeeds (closes) or fails (opens again).
+        Raises RuntimeError if the breaker is (or gets) closed meanwhile.
+        """
+
+        # Wait for circuit to let call through (until breaker closes)
+        while (wait_time := self._try_call()):
+            if self._closed.wait(wait_time):
+                raise RuntimeError('Circuit breaker is closed.')
+
+        # Return nothing
+        return None
+
+
+    # Wait until closed (async)
+    async def before_call_async(self) -> None:
+        """
+        Same as before_call, for coroutines (waits without blocking the
+        event loop).
+        """
+
+        # Wait for circuit to let call through (until breaker closes,
+        # checked at least every second)
+        while (wait_time := self._try_call()):
+            if self._closed.is_set():
+                raise RuntimeError('Circuit breaker is closed.')
+            await asyncio.sleep(min(wait_time, 1))
+
+        # Return nothing
+        return None
+
+
+    # Close circuit breaker
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Wake up threads waiting for circuit (before_call raises instead of
+        # waiting from now on)
+        self._closed.set()
+
+        # Return nothing
+        return None
+
+
+    # Record failure
+    def record_failure(self) -> None:
+        # TODO Add a docstring
+
+        # Record failure, opening circuit if trial failed or failure rate
+        # spiked
+        with self._lock:
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if self.state == 'half-open' \
+               or (self.state == 'closed'
+                   and len(self._outcomes) >= self.min_calls
+                   and failures/len(self._outcomes) >= self.failure_rate):
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self._logger.warning(f'Circuit open ({failures} failures in '\
+                                     f'last {len(self._outcomes)} calls). '\
+                                     f'Pausing for {self.cooldown} seconds...')
+
+        # Return nothing
+        return None
+
+
+    # Record success
+    def record_success(self) -> None:
+        # TODO Add a docstring
+
+        # Record success, closing circuit if trial succeeded
+        with self._lock:
+            self._outcomes.append(False)
+            if self.state == 'half-open':
+                self.state = 'closed'
+                self._outcomes.clear()
+                self._trial_in_flight = False
+                self._logger.info('Circuit closed. Resuming...')
+
+        # Return nothing
+        return None
+
+
+    # Release call
+    def release_call(self) -> None:
+        """
+        Ends a call without recording its outcome (e.g. cancelled). If it
+        was the half-open trial call, lets the next call through as trial.
+        """
+
+        # Give trial back, if in flight
+        with self._lock:
+            if self.state == 'half-open':
+                self._trial_in_flight = False
+
+        # Return nothing
+        return None
+
+
+    # --- Helper methods ---
+
+    # Try call
+    def _try_call(self) -> float:
+        # TODO Add a docstring
+
+        # Let call through if circuit closed, or if cooldown is over and no
+        # trial call is in flight (half-open)
+        with self._lock:
+            if self.state == 'closed':
+                return 0
+            wait_time = self._opened_at + self.cooldown - time.monotonic()
+            if wait_time <= 0 and not self._trial_in_flight:
+                self.state = 'half-open'
+                self._trial_in_flight = True
+                self._logger.info('Circuit half-open. Trying a call...')
+                return 0
+
+        # Return time to wait before trying again (0 if let through)
+        return wait_time if wait_time > 0 else 1
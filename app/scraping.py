@@ -1,18 +1,33 @@
 # --- Imports ---
 
 # Standard
-from io import BytesIO
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from itertools import islice
+import queue
 import requests
+import json
 import logging
+import os
+import random
+import shutil
+import threading
 
 # Third party
-from PIL import Image
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 
 # Local
+from cache import OfferCache
 from offer import Offer
+from resilience import CircuitBreaker, RateLimiter
+from urls import UrlResolver
 
 # --- Global Configuration ---
 
@@ -25,8 +40,77 @@ handler.setFormatter(fmt=formatter)
 logger.addHandler(hdlr=handler)
 
 # Global variables
-DEFAULT_THUMBNAIL_DEST_FILE_NAME = 'thumbnail.png'
-DEFAULT_THUMBNAIL_DEST_FOLDER = './temp/'
+DEFAULT_SCRAPER_ENGINE = 'http'
+DEFAULT_SCRAPER_WORKERS = 4
+DEFAULT_SCRAPER_MAX_PENDING = None # twice the workers
+DEFAULT_HTTP_TIMEOUT = 15
+DEFAULT_HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '\
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '\
+                  'Chrome/127.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+SCRAPER_ENGINES = ['http', 'selenium']
+DEFAULT_SCRAPER_MAX_RETRIES = 3
+DEFAULT_SCRAPER_RETRY_BASE_DELAY = 2 # seconds, doubled on each retry
+DEFAULT_SCRAPER_RETRY_MAX_DELAY = 30 # seconds
+DEFAULT_SCRAPER_REQUESTS_PER_SECOND = 1.0 # per host
+THROTTLING_STATUS_CODES = [429, 503]
+CAPTCHA_PAGE_MARKER = 'validateCaptcha'
+DEFAULT_WEBDRIVER_POOL_SIZE = 1
+DEFAULT_WEBDRIVER_MAX_USES = 50
+DEFAULT_WEBDRIVER_EXTRACTION = 'script'
+DEFAULT_WEBDRIVER_PAGE_LOAD_STRATEGY = 'eager' # return on DOMContentLoaded
+DEFAULT_WEBDRIVER_WAIT_TIMEOUT = 10 # seconds, for the price block
+DEFAULT_WEBDRIVER_BLOCKED_RESOURCES = ['images', 'stylesheets', 'fonts', 'media', 'trackers']
+DEFAULT_WEBDRIVER_PROFILE_DIR = None # e.g. './temp/chrome-profile/', None for throwaway profiles
+DEFAULT_WEBDRIVER_DISK_CACHE_SIZE = 100*1024*1024 # bytes, per profile
+WEBDRIVER_PROFILE_LOCK_FILES = ['SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile']
+WEBDRIVER_PAGE_LOAD_STRATEGIES = ['normal', 'eager', 'none']
+WEBDRIVER_PAGE_ERRORS = (NoSuchElementException, TimeoutException) # page-level, driver stays usable
+WEBDRIVER_BLOCKED_URL_PATTERNS = { # Network.setBlockedURLs patterns, per resource
+    'images': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.svg*', '*.ico*'],
+    'stylesheets': ['*.css*'],
+    'fonts': ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*'],
+    'media': ['*.mp4*', '*.webm*', '*.m3u8*'],
+    'scripts': ['*.js', '*.js?*'],
+    'trackers': ['*amazon-adsystem.com*', '*fls-na.amazon.com*', '*unagi.amazon.com*',
+                 '*/uedata*', '*/rd/uedata*', '*doubleclick.net*', '*google-analytics.com*',
+                 '*googletagmanager.com*', '*facebook.net*'],
+}
+WEBDRIVER_EXTRACTIONS = ['script', 'elements']
+OFFER_EXTRACTION_SCRIPT = '''
+const text = (element) => element ? (element.innerText || element.textContent).trim() || null : null;
+const core = document.getElementById('corePriceDisplay_desktop_feature_div');
+const find = (selector) => core ? core.querySelector(selector) : null;
+const thumbnail = document.querySelector('#imgTagWrapperId img');
+const priceBefore = find('.a-spacing-small .a-text-price');
+return {
+    title: text(document.getElementById('productTitle')),
+    thumbnail_url: thumbnail ? thumbnail.src || null : null,
+    price_whole: text(find('.a-price-whole')),
+    price_fraction: text(find('.a-price-fraction')),
+    price_before: priceBefore
+                  ? text(priceBefore.querySelector('.a-offscreen')) || text(priceBefore)
+                  : null,
+    discount_rate: text(find('.savingsPercentage')),
+    captcha: !!document.querySelector('form[action*="validateCaptcha"]'),
+};
+'''
+
+
+# --- The ScrapingError class ---
+class ScrapingError(Exception):
+    # Raised on captcha or throttled pages, and when retries run out
+    pass
+
+
+# --- The OfferParseError class ---
+class OfferParseError(ScrapingError):
+    # Raised when an offer webpage lacks required fields (retrying won't help)
+    pass
+
 
 # --- The Scraper class ---
 class Scraper:
@@ -34,78 +118,322 @@ class Scraper:
     # --- Magic methods ---
 
     # __init__
-    def __init__(self):
+    def __init__(self,
+                 engine:str,
+                 webdriver_pool_size:int,
+                 webdriver_max_uses:int,
+                 cache:OfferCache|None = None,
+                 webdriver_extraction:str = DEFAULT_WEBDRIVER_EXTRACTION,
+                 webdriver_page_load_strategy:str = DEFAULT_WEBDRIVER_PAGE_LOAD_STRATEGY,
+                 webdriver_blocked_resources:list = DEFAULT_WEBDRIVER_BLOCKED_RESOURCES,
+                 webdriver_profile_dir:str|None = DEFAULT_WEBDRIVER_PROFILE_DIR,
+                 webdriver_disk_cache_size:int = DEFAULT_WEBDRIVER_DISK_CACHE_SIZE,
+                 max_retries:int = DEFAULT_SCRAPER_MAX_RETRIES,
+                 requests_per_second:float = DEFAULT_SCRAPER_REQUESTS_PER_SECOND,
+                 max_workers:int = DEFAULT_SCRAPER_WORKERS):
 
         # Instance logger setup
         self._logger = logging.getLogger(__name__)\
                               .getChild(self.__class__.__name__)
 
+        # Validate scraper engine
+        if engine not in SCRAPER_ENGINES:
+            raise ValueError(f'Invalid scraper engine "{engine}". '\
+                             f'Valid engines: {SCRAPER_ENGINES}.')
+
+        # Validate webdriver extraction mode
+        if webdriver_extraction not in WEBDRIVER_EXTRACTIONS:
+            raise ValueError(f'Invalid webdriver extraction "{webdriver_extraction}". '\
+                             f'Valid extractions: {WEBDRIVER_EXTRACTIONS}.')
+
+        # Validate max retries
+        if max_retries is None or max_retries < 0:
+            raise ValueError('Scraper max retries must be at least 0.')
+
+        # Validate max workers
+        if not max_workers or max_workers < 1:
+            raise ValueError('Scraper max workers must be at least 1.')
+
+        # Set up a keep-alive HTTP session, one pooled connection per
+        # scraper worker (every worker fetches over HTTP, whatever the
+        # webdriver pool size)
+        session = requests.Session()
+        session.headers.update(DEFAULT_HTTP_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers,
+                              pool_maxsize=max_workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
         # Set object attributes
-        self.webdriver = None
+        self.cache = cache
+        self.engine = engine
+        self.session = session
+        self.webdriver_extraction = webdriver_extraction
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter.get(rate=requests_per_second)
+        self.circuit_breaker = CircuitBreaker.get()
+        self.url_resolver = UrlResolver(session=session,
+                                        max_workers=max_workers,
+                                        cache=cache,
+                                        rate_limiter=self.rate_limiter)
+        self.webdriver_pool = WebdriverPool(size=webdriver_pool_size,
+                                            max_uses=webdriver_max_uses,
+                                            page_load_strategy=webdriver_page_load_strategy,
+                                            blocked_resources=webdriver_blocked_resources,
+                                            profile_dir=webdriver_profile_dir,
+                                            disk_cache_size=webdriver_disk_cache_size)
+        self._executors = []
+        self._closing = threading.Event()
 
 
     # --- Public methods ---
 
     # Get Scraper object
     @classmethod
-    def get(cls):
+    def get(cls,
+            engine:str = DEFAULT_SCRAPER_ENGINE,
+            webdriver_pool_size:int = DEFAULT_WEBDRIVER_POOL_SIZE,
+            webdriver_max_uses:int = DEFAULT_WEBDRIVER_MAX_USES,
+            cache:OfferCache|None = None,
+            webdriver_extraction:str = DEFAULT_WEBDRIVER_EXTRACTION,
+            webdriver_page_load_strategy:str = DEFAULT_WEBDRIVER_PAGE_LOAD_STRATEGY,
+            webdriver_blocked_resources:list = DEFAULT_WEBDRIVER_BLOCKED_RESOURCES,
+            webdriver_profile_dir:str|None = DEFAULT_WEBDRIVER_PROFILE_DIR,
+            webdriver_disk_cache_size:int = DEFAULT_WEBDRIVER_DISK_CACHE_SIZE,
+            max_retries:int = DEFAULT_SCRAPER_MAX_RETRIES,
+            requests_per_second:float = DEFAULT_SCRAPER_REQUESTS_PER_SECOND,
+            max_workers:int = DEFAULT_SCRAPER_WORKERS):
         # TODO Add a docstring
 
         # Return Scraper object
         logger.info('Getting Scraper object...')
-        return Scraper()
+        return Scraper(engine=engine,
+                       webdriver_pool_size=webdriver_pool_size,
+                       webdriver_max_uses=webdriver_max_uses,
+                       cache=cache,
+                       webdriver_extraction=webdriver_extraction,
+                       webdriver_page_load_strategy=webdriver_page_load_strategy,
+                       webdriver_blocked_resources=webdriver_blocked_resources,
+                       webdriver_profile_dir=webdriver_profile_dir,
+                       webdriver_disk_cache_size=webdriver_disk_cache_size,
+                       max_retries=max_retries,
+                       requests_per_second=requests_per_second,
+                       max_workers=max_workers)
 
 
-    # Scrape an amazon.com.br offer
-    def scrape_amazon_offer(self,
-                            url:str,
-                            thumbnail_dest_file_name:str = DEFAULT_THUMBNAIL_DEST_FILE_NAME,
-                            thumbnail_dest_folder:str = DEFAULT_THUMBNAIL_DEST_FOLDER
-                            ) -> Offer:
-        # TODO Add a docstring
+    # Close scraper
+    def close(self) -> None:
+        """
+        Cancels pending concurrent scrapes and quits every webdriver kept
+        alive by the scraper's webdriver pool.
+        """
 
-        # Create a web driver
-        self._logger.info('Creating webdriver...')
-        self._create_webdriver()
+        # Cancel pending scrapes (and retries, rate limiting and circuit
+        # breaker pauses), waiting for running ones to finish
+        self._logger.info('Closing scraper...')
+        self._closing.set()
+        self.rate_limiter.close()
+        self.circuit_breaker.close()
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors.clear()
+
+        # Report webdriver network activity (if any page was visited)
+        report = self.webdriver_pool.get_network_report()
+        if report['pages']:
+            self._logger.info(f'Webdriver network report: '\
+                              f'{report["pages"]} pages, '\
+                              f'{report["requests"]} requests, '\
+                              f'{report["blocked_requests"]} blocked '\
+                              f'({report["blocked_by_type"]}), '\
+                              f'{report["transferred_bytes"]/1024:.0f} KB transferred.')
+
+        # Shut down webdriver pool and HTTP session
+        self.webdriver_pool.close()
+        self.session.close()
+        self._logger.info('Closed scraper.')
+
+        # Return nothing
+        return None
+
+
+    # Scrape many amazon.com.br offers concurrently
+    def scrape_amazon_offers(self,
+                             urls:list,
+                             max_workers:int|None = None,
+                             max_pending:int|None = DEFAULT_SCRAPER_MAX_PENDING,
+                             on_failed=None
+                             ):
+        """
+        Scrapes urls on a bounded thread pool of max_workers (by default,
+        the scraper's), ahead of the caller, keeping at most max_pending
+        (by default, twice max_workers) offers scraped or being scraped but
+        not yet taken.
+        Returns an iterator of Offer objects in the same order as urls; a
+        failed scrape is re-raised when its turn comes (or, if on_failed
+        given, skipped after calling on_failed with its url), and closing
+        the iterator cancels pending scrapes.
+        """
+
+        # Validate max workers
+        max_workers = max_workers or self.max_workers
+        if max_workers < 1:
+            raise ValueError('Scraper max workers must be at least 1.')
+
+        # Validate max pending
+        max_pending = max_pending or 2*max_workers
+        if max_pending < 1:
+            raise ValueError('Scraper max pending must be at least 1.')
+
+        # Submit the first urls right away
+        self._logger.info(f'Scraping {len(urls)} offers '\
+                          f'with {max_workers} workers...')
+        executor = ThreadPoolExecutor(max_workers=max_workers,
+                                      thread_name_prefix='scraper')
+        self._executors.append(executor)
+        urls = iter(urls)
+        futures = deque((url, executor.submit(self.scrape_amazon_offer, url))
+                        for url in islice(urls, max_pending))
+
+        # Return offers iterator (scraping is already under way)
+        return self._iter_scraped_offers(executor, futures, urls, on_failed)
+
+
+    # Parse an amazon.com.br offer page
+    @classmethod
+    def parse_amazon_offer_page(cls, html:str) -> dict|None:
+        """
+        Extracts offer fields from a static amazon.com.br product page.
+        Returns a dict with the same keys as the Selenium path; or None,
+        if any required field (title, thumbnail, "now" price) is missing.
+        """
+
+        # Feed page to parser
+        parser = OfferPageParser()
+        parser.feed(html)
+        parser.close()
 
-        # Visit offer url
+        # Stop if any required field is missing (e.g. captcha pages)
+        title = parser.get_text('title')
+        price_whole = parser.get_text('price_whole')
+        price_fraction = parser.get_text('price_fraction')
+        if not (title and parser.thumbnail_url and price_whole and price_fraction):
+            return None
+
+        # Parse optional fields
+        price_before = parser.get_text('price_before_offscreen') \
+                       or parser.get_text('price_before')
+        discount_rate = parser.get_text('discount_rate')
+
+        # Return offer fields
+        return {
+            'title': title,
+            'thumbnail_url': parser.thumbnail_url,
+            'price_now': cls._parse_price_now(price_whole, price_fraction),
+            'price_before': cls._parse_price(price_before) if price_before else None,
+            'discount_rate': cls._parse_discount_rate(discount_rate) if discount_rate else None,
+        }
+
+
+    # Scrape an amazon.com.br offer
+    def scrape_amazon_offer(self, url:str) -> Offer:
+        """
+        Scrapes an offer (or loads it from cache, if fresh). Live scrapes
+        are rate limited per host, paused while the circuit breaker is
+        open, and retried with jittered exponential backoff on transient
+        failures (network errors, missing elements, captcha pages).
+        Raises ScrapingError once retries run out.
+        """
+
+        # Resolve offer url to its canonical product page (memoized)
         offer_url = url
-        self._logger.info('Visiting offer webpage...')
-        self.driver.get(url=offer_url)
+        scrape_url = self.url_resolver.resolve(offer_url)
 
-        # Get offer title
-        self._logger.info('Getting offer title...')
-        offer_title = self.driver.find_element(by=By.ID, value='productTitle').text.strip()
-        self._logger.debug(f'offer_title = "{offer_title}"')
+        # If offer is cached and fresh, skip scraping
+        fields = self.cache.load(scrape_url) if self.cache else None
+        if fields:
+            self._logger.info('Found fresh offer in cache.')
+            thumbnail_content = fields['thumbnail']
+
+        # Else, scrape offer fields and thumbnail, retrying transient failures
+        else:
+            fields, thumbnail_content = self._scrape_with_retries(scrape_url)
 
-        # Get offer thumbnail url
-        self._logger.info('Getting offer thumbnail source url...')
-        _ = self.driver.find_element(by=By.ID, value='imgTagWrapperId')
-        _ = _.find_element(by=By.TAG_NAME, value='img')
-        url = _.get_attribute(name='src')
+            # Cache offer fields and thumbnail
+            if self.cache:
+                self.cache.store(url=scrape_url,
+                                 title=fields['title'],
+                                 thumbnail=thumbnail_content,
+                                 price_now=fields['price_now'],
+                                 price_before=fields['price_before'],
+                                 discount_rate=fields['discount_rate'])
+
+        # Return Offer object
+        self._logger.info('Returning Offer object...')
+        return Offer(url=offer_url,
+                     title=fields['title'],
+                     thumbnail=thumbnail_content,
+                     price_now=fields['price_now'],
+                     price_before=fields['price_before'],
+                     discount_rate=fields['discount_rate'])
+
+
+    # --- Helper methods ---
 
-        # Download offer thumbnail, save file path
+    # Download offer thumbnail
+    def _download_thumbnail(self, url:str) -> bytes:
+        # TODO Add a docstring
+
+        # Download thumbnail (kept in memory, as encoded bytes)
         self._logger.info('Downloading offer thumbnail...')
-        response = requests.get(url)
-        image = Image.open(BytesIO(response.content))
-        offer_thumbnail = f'{thumbnail_dest_folder}{thumbnail_dest_file_name}'
-        image.save(fp=offer_thumbnail)
-        self._logger.debug(f'offer_thumbnail = "{offer_thumbnail}"')
-
-        # Get "now" price
-        self._logger.info('Getting offer "now" price...')
-        element = self.driver.find_element(by=By.ID, value='corePriceDisplay_desktop_feature_div')
-        price_whole = element.find_element(by=By.CLASS_NAME, value='a-price-whole').text.replace('.','').strip()
-        price_fraction = element.find_element(by=By.CLASS_NAME, value='a-price-fraction').text.strip()
-        offer_price_now = float(f'{price_whole}.{price_fraction}')
-        self._logger.debug(f'offer_price_now = {offer_price_now}')
+        self.rate_limiter.acquire(url)
+        response = self.session.get(url, timeout=DEFAULT_HTTP_TIMEOUT)
+        response.raise_for_status()
+
+        # Return thumbnail content
+        return response.content
+
+
+    # Extract offer fields element by element
+    def _extract_fields_with_elements(self, driver:webdriver.Chrome) -> dict:
+        """
+        Extracts offer fields element by element.
+        Raises OfferParseError if a required field is missing.
+        """
+
+        # Get required fields (title, thumbnail url, "now" price), stopping
+        # if any is missing (e.g. unavailable offers)
+        try:
+
+            # Get offer title
+            self._logger.info('Getting offer title...')
+            offer_title = driver.find_element(by=By.ID, value='productTitle').text.strip()
+            self._logger.debug(f'offer_title = "{offer_title}"')
+
+            # Get offer thumbnail url
+            self._logger.info('Getting offer thumbnail source url...')
+            _ = driver.find_element(by=By.ID, value='imgTagWrapperId')
+            _ = _.find_element(by=By.TAG_NAME, value='img')
+            offer_thumbnail_url = _.get_attribute(name='src')
+            self._logger.debug(f'offer_thumbnail_url = "{offer_thumbnail_url}"')
+
+            # Get "now" price
+            self._logger.info('Getting offer "now" price...')
+            element = driver.find_element(by=By.ID, value='corePriceDisplay_desktop_feature_div')
+            price_whole = element.find_element(by=By.CLASS_NAME, value='a-price-whole').text
+            price_fraction = element.find_element(by=By.CLASS_NAME, value='a-price-fraction').text
+            offer_price_now = self._parse_price_now(price_whole, price_fraction)
+            self._logger.debug(f'offer_price_now = {offer_price_now}')
+        except NoSuchElementException as e:
+            raise OfferParseError(f'Offer webpage is missing required fields ({e.msg}).') from e
 
         # Get "before" price
         try:
             self._logger.info('Getting offer "before" price...')
             _ = element.find_element(by=By.CLASS_NAME, value='a-spacing-small')
             _ = _.find_element(by=By.CLASS_NAME, value='a-text-price').text
-            offer_price_before = float(_.replace('R$','').replace('.','').replace(',','.'))
+            offer_price_before = self._parse_price(_)
             self._logger.debug(f'offer_price_before = {offer_price_before}')
         except NoSuchElementException:
             offer_price_before = None
@@ -116,33 +444,500 @@ class Scraper:
         try:
             self._logger.info('Getting offer discount rate...')
             _ = element.find_element(by=By.CLASS_NAME, value='savingsPercentage').text
-            offer_discount_rate = float(_.replace('-','').replace('%',''))/100
+            offer_discount_rate = self._parse_discount_rate(_)
             self._logger.debug(f'offer_discount_rate = {offer_discount_rate}')
         except NoSuchElementException:
             offer_discount_rate = None
             self._logger.debug('Offer discount not found, offer_discount_rate set to None.')
 
-        # Quit web driver
-        self._logger.info('Deleting webdriver...')
-        self._delete_webdriver()
+        # Return offer fields
+        return {
+            'title': offer_title,
+            'thumbnail_url': offer_thumbnail_url,
+            'price_now': offer_price_now,
+            'price_before': offer_price_before,
+            'discount_rate': offer_discount_rate,
+        }
 
-        # Return Offer object
-        self._logger.info('Returning Offer object...')
-        return Offer(url=offer_url,
-                     title=offer_title,
-                     thumbnail=offer_thumbnail,
-                     price_now=offer_price_now,
-                     price_before=offer_price_before,
-                     discount_rate=offer_discount_rate)
+
+    # Extract offer fields with a single script
+    def _extract_fields_with_script(self, driver:webdriver.Chrome) -> dict:
+        """
+        Extracts every offer field in a single execute_script round trip
+        (missing elements come back as null, not exceptions).
+        Raises OfferParseError if a required field is missing, or
+        ScrapingError on captcha pages.
+        """
+
+        # Run extraction script on offer page
+        self._logger.info('Extracting offer fields with script...')
+        raw_fields = driver.execute_script(OFFER_EXTRACTION_SCRIPT)
+        self._logger.debug(f'Extracted raw offer fields: {raw_fields}')
+
+        # Stop if Amazon served a captcha instead of the offer
+        if raw_fields.get('captcha'):
+            raise ScrapingError('Offer webpage is a captcha page.')
+
+        # Stop if any required field is missing
+        missing_fields = [field for field in ['title', 'thumbnail_url', 'price_whole', 'price_fraction']
+                          if not raw_fields.get(field)]
+        if missing_fields:
+            raise OfferParseError(f'Offer webpage is missing required fields: {missing_fields}.')
+
+        # Return offer fields
+        return {
+            'title': raw_fields['title'],
+            'thumbnail_url': raw_fields['thumbnail_url'],
+            'price_now': self._parse_price_now(raw_fields['price_whole'],
+                                               raw_fields['price_fraction']),
+            'price_before': self._parse_price(raw_fields['price_before'])
+                            if raw_fields.get('price_before') else None,
+            'discount_rate': self._parse_discount_rate(raw_fields['discount_rate'])
+                             if raw_fields.get('discount_rate') else None,
+        }
+
+
+    # Iterate over scraped offers
+    def _iter_scraped_offers(self,
+                             executor:ThreadPoolExecutor,
+                             futures:deque,
+                             urls,
+                             on_failed=None):
+        # TODO Add a docstring
+
+        # Hand offers over in submission order as they become ready,
+        # submitting one more url for each offer taken
+        try:
+            while futures:
+                url, future = futures.popleft()
+                next_url = next(urls, None)
+                if next_url is not None:
+                    futures.append((next_url, executor.submit(self.scrape_amazon_offer, next_url)))
+
+                # Skip failed offers if caller handles them, else re-raise
+                try:
+                    offer = future.result()
+                except Exception as e:
+                    if not on_failed:
+                        raise
+                    self._logger.error(f'Failed to scrape offer "{url}" ({e}). Skipping...')
+                    on_failed(url)
+                    continue
+                yield offer
+
+        # Drop whatever is still queued if the caller stops early
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._logger.info('Stopped scraping offers.')
+
+
+    # Parse discount rate text
+    @staticmethod
+    def _parse_discount_rate(text:str) -> float:
+        # TODO Add a docstring
+
+        # '-25%' -> 0.25
+        return float(text.replace('-','').replace('%','').strip())/100
+
+
+    # Parse price text
+    @staticmethod
+    def _parse_price(text:str) -> float:
+        # TODO Add a docstring
+
+        # 'R$1.299,90' -> 1299.9
+        return float(text.replace('R$','').replace('.','').replace(',','.').strip())
+
+
+    # Parse "now" price parts
+    @staticmethod
+    def _parse_price_now(price_whole:str, price_fraction:str) -> float:
+        # TODO Add a docstring
+
+        # ('1.299,', '90') -> 1299.9
+        price_whole = price_whole.replace('.','').replace(',','').strip()
+        price_fraction = price_fraction.strip()
+        return float(f'{price_whole}.{price_fraction}')
+
+
+    # Scrape offer fields with a plain HTTP request
+    def _scrape_fields_with_http(self, url:str) -> dict|None:
+        # TODO Add a docstring
+
+        # Fetch offer page through the pooled session
+        self._logger.info('Fetching offer webpage...')
+        self.rate_limiter.acquire(url)
+        try:
+            response = self.session.get(url, timeout=DEFAULT_HTTP_TIMEOUT)
+        except requests.RequestException as e:
+            self._logger.warning(f'Failed to fetch offer webpage ({e}). '\
+                                 f'Falling back to webdriver...')
+            return None
+
+        # Stop if Amazon is throttling us (a webdriver would get the same)
+        if response.status_code in THROTTLING_STATUS_CODES \
+           or CAPTCHA_PAGE_MARKER in response.text:
+            raise ScrapingError(f'Offer webpage is throttled '\
+                                f'(status {response.status_code}, or captcha page).')
+        try:
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self._logger.warning(f'Failed to fetch offer webpage ({e}). '\
+                                 f'Falling back to webdriver...')
+            return None
+
+        # Parse offer page
+        self._logger.info('Parsing offer webpage...')
+        try:
+            fields = self.parse_amazon_offer_page(response.text)
+        except ValueError as e:
+            self._logger.warning(f'Failed to parse offer webpage ({e}). '\
+                                 f'Falling back to webdriver...')
+            return None
+        if not fields:
+            self._logger.warning('Offer webpage is missing required fields. '\
+                                 'Falling back to webdriver...')
+            return None
+        self._logger.debug(f'Parsed offer fields: {fields}')
+
+        # Return offer fields
+        return fields
+
+
+    # Scrape offer fields with a webdriver
+    def _scrape_fields_with_selenium(self, url:str) -> dict:
+        # TODO Add a docstring
+
+        # Borrow a warm webdriver from the pool
+        self._logger.info('Acquiring webdriver from pool...')
+        with self.webdriver_pool.acquire() as driver:
+
+            # Visit offer url, waiting for the price block (page load may
+            # return before the page is complete)
+            self._logger.info('Visiting offer webpage...')
+            self.rate_limiter.acquire(url)
+            driver.get(url=url)
+            try:
+                WebDriverWait(driver, DEFAULT_WEBDRIVER_WAIT_TIMEOUT).until(
+                    expected_conditions.presence_of_element_located(
+                        (By.ID, 'corePriceDisplay_desktop_feature_div')))
+            except TimeoutException:
+                self._logger.warning('Timed out waiting for offer price block.')
+
+            # Extract offer fields (in one script call, or element by element)
+            try:
+                if self.webdriver_extraction == 'script':
+                    fields = self._extract_fields_with_script(driver)
+                else:
+                    fields = self._extract_fields_with_elements(driver)
+
+            # Account for page's network activity
+            finally:
+                self.webdriver_pool.record_network_activity(driver)
+
+        # Return offer fields
+        return fields
+
+
+    # Scrape offer with retries
+    def _scrape_with_retries(self, url:str) -> tuple:
+        """
+        Scrapes offer fields (falling back to Selenium if static parse
+        fails) and downloads its thumbnail, retrying transient failures
+        up to max_retries times, with jittered exponential backoff.
+        Returns a (fields, thumbnail content) tuple.
+        Raises ScrapingError once retries run out, or OfferParseError (not
+        retried) if the offer webpage lacks required fields.
+        """
+
+        for attempt in range(self.max_retries + 1):
+
+            # Wait while circuit breaker has scraping paused
+            self.circuit_breaker.before_call()
+
+            # Scrape offer, reporting outcome to circuit breaker (only
+            # transient failures count; other errors mean Amazon answered,
+            # while unparseable pages, e.g. unavailable offers, count for
+            # nothing)
+            try:
+                fields = None
+                if self.engine == 'http':
+                    fields = self._scrape_fields_with_http(url)
+                if not fields:
+                    fields = self._scrape_fields_with_selenium(url)
+                thumbnail_content = self._download_thumbnail(fields['thumbnail_url'])
+            except OfferParseError:
+                self.circuit_breaker.release_call()
+                raise
+            except (requests.RequestException, WebDriverException, ScrapingError) as e:
+                self.circuit_breaker.record_failure()
+                if attempt == self.max_retries or self._closing.is_set():
+                    raise ScrapingError(f'Failed to scrape "{url}" '\
+                                        f'after {attempt + 1} attempts ({e}).') from e
+
+                # Back off (2, 4, 8... seconds, capped, half of it random)
+                # before retrying, unless scraper is closing meanwhile
+                delay = min(DEFAULT_SCRAPER_RETRY_MAX_DELAY,
+                            DEFAULT_SCRAPER_RETRY_BASE_DELAY*2**attempt)
+                delay = random.uniform(delay/2, delay)
+                self._logger.warning(f'Failed to scrape "{url}" ({e}). '\
+                                     f'Retrying in {delay:.1f} seconds...')
+                if self._closing.wait(delay):
+                    raise ScrapingError(f'Scraper closed before retrying "{url}".') from e
+            except Exception:
+                self.circuit_breaker.record_success()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return fields, thumbnail_content
+
+
+# --- The WebdriverPool class ---
+class WebdriverPool:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 size:int = DEFAULT_WEBDRIVER_POOL_SIZE,
+                 max_uses:int = DEFAULT_WEBDRIVER_MAX_USES,
+                 page_load_strategy:str = DEFAULT_WEBDRIVER_PAGE_LOAD_STRATEGY,
+                 blocked_resources:list = DEFAULT_WEBDRIVER_BLOCKED_RESOURCES,
+                 profile_dir:str|None = DEFAULT_WEBDRIVER_PROFILE_DIR,
+                 disk_cache_size:int = DEFAULT_WEBDRIVER_DISK_CACHE_SIZE):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate pool size
+        if not size or size < 1:
+            raise ValueError('Webdriver pool size must be at least 1.')
+
+        # Validate max uses per webdriver
+        if not max_uses or max_uses < 1:
+            raise ValueError('Webdriver max uses must be at least 1.')
+
+        # Validate page load strategy
+        if page_load_strategy not in WEBDRIVER_PAGE_LOAD_STRATEGIES:
+            raise ValueError(f'Invalid page load strategy "{page_load_strategy}". '\
+                             f'Valid strategies: {WEBDRIVER_PAGE_LOAD_STRATEGIES}.')
+
+        # Validate blocked resources
+        for resource in blocked_resources:
+            if resource not in WEBDRIVER_BLOCKED_URL_PATTERNS:
+                raise ValueError(f'Invalid blocked resource "{resource}". '\
+                                 f'Valid resources: {list(WEBDRIVER_BLOCKED_URL_PATTERNS)}.')
+
+        # Validate disk cache size
+        if profile_dir and (not disk_cache_size or disk_cache_size < 1):
+            raise ValueError('Webdriver disk cache size must be positive.')
+
+        # Set object attributes
+        self.size = size
+        self.max_uses = max_uses
+        self.page_load_strategy = page_load_strategy
+        self.blocked_resources = blocked_resources
+        self.blocked_url_patterns = [pattern for resource in blocked_resources
+                                     for pattern in WEBDRIVER_BLOCKED_URL_PATTERNS[resource]]
+        self.profile_dir = os.path.abspath(profile_dir) if profile_dir else None
+        self.disk_cache_size = disk_cache_size
+        self._idle_drivers = queue.LifoQueue()
+        self._driver_uses = {}
+        self._live_drivers = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._network_stats = Counter()
+        self._driver_slots = {}
+        self._free_slots = set(range(size))
+        self._blocked_by_type = Counter()
+
+
+    # --- Public methods ---
+
+    # Acquire webdriver
+    @contextmanager
+    def acquire(self):
+        """
+        Lends a warm webdriver for the duration of a "with" block.
+        Drivers that raised a session/driver-level WebDriverException
+        inside the block are quit instead of returned; page-level errors
+        (missing element, wait timeout, captcha...) leave them reusable.
+        """
+
+        # Check out a healthy webdriver
+        driver = self._checkout()
+
+        # Lend it, discarding it if its session failed (drivers that died
+        # some other way are caught by the health check on next checkout)
+        try:
+            yield driver
+        except WebDriverException as e:
+            if isinstance(e, WEBDRIVER_PAGE_ERRORS):
+                self._checkin(driver)
+            else:
+                self._logger.debug('Webdriver session failed. Discarding webdriver...')
+                self._discard(driver)
+            raise
+        except Exception:
+            self._checkin(driver)
+            raise
+        else:
+            self._checkin(driver)
+
+
+    # Close pool
+    def close(self) -> None:
+        # TODO Add a docstring
+
+        # Refuse further check-ins and check-outs
+        with self._lock:
+            self._closed = True
+
+        # Quit every idle webdriver
+        self._logger.debug('Quitting idle webdrivers...')
+        while True:
+            try:
+                driver = self._idle_drivers.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+        self._logger.debug('Quitted idle webdrivers.')
+
+        # Return nothing
+        return None
+
+
+    # Get network report
+    def get_network_report(self) -> dict:
+        """
+        Returns network activity of every page visited so far: pages,
+        requests, blocked requests (also per resource type) and bytes
+        actually transferred. Bytes saved by blocking can't be measured
+        (blocked requests never reach the network), only their count.
+        """
+
+        # Copy counters
+        with self._lock:
+            return {'pages': self._network_stats['pages'],
+                    'requests': self._network_stats['requests'],
+                    'blocked_requests': self._network_stats['blocked_requests'],
+                    'blocked_by_type': dict(self._blocked_by_type),
+                    'transferred_bytes': self._network_stats['transferred_bytes']}
+
+
+    # Record network activity
+    def record_network_activity(self, driver:webdriver.Chrome) -> None:
+        """
+        Drains a webdriver's performance log (network events since last
+        call) into the pool's network counters.
+        """
+
+        # Read network events
+        try:
+            entries = driver.get_log('performance')
+        except WebDriverException as e:
+            self._logger.debug(f'Failed to read performance log ({e}).')
+            return None
+
+        # Count requests, blocked requests and transferred bytes
+        stats = Counter(pages=1)
+        blocked_by_type = Counter()
+        request_types = {}
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                stats['requests'] += 1
+                request_types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFinished':
+                stats['transferred_bytes'] += int(params.get('encodedDataLength', 0))
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                stats['blocked_requests'] += 1
+                blocked_by_type[params.get('type') \
+                                or request_types.get(params.get('requestId'), 'Other')] += 1
+
+        # Add them to pool's counters
+        with self._lock:
+            self._network_stats.update(stats)
+            self._blocked_by_type.update(blocked_by_type)
+        self._logger.debug(f'Page network activity: {dict(stats)}, blocked: {dict(blocked_by_type)}.')
+
+        # Return nothing
+        return None
 
 
     # --- Helper methods ---
 
+    # Check in webdriver
+    def _checkin(self, driver:webdriver.Chrome) -> None:
+        # TODO Add a docstring
+
+        # Count this use
+        self._driver_uses[driver] += 1
+
+        # Recycle worn out webdrivers (and every webdriver after close)
+        if self._closed or self._driver_uses[driver] >= self.max_uses:
+            self._logger.debug(f'Recycling webdriver after '\
+                               f'{self._driver_uses[driver]} uses...')
+            self._discard(driver)
+
+        # Else, put it back in the idle queue
+        else:
+            self._idle_drivers.put(driver)
+
+        # Return nothing
+        return None
+
+
+    # Check out webdriver
+    def _checkout(self) -> webdriver.Chrome:
+        # TODO Add a docstring
+
+        while True:
+
+            # Validate pool state (pool may close while waiting)
+            if self._closed:
+                raise RuntimeError('Webdriver pool is closed.')
+
+            # Prefer an idle webdriver
+            try:
+                driver = self._idle_drivers.get_nowait()
+
+            # If none idle, create one if pool not full (and still open),
+            # else wait for one
+            except queue.Empty:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError('Webdriver pool is closed.')
+                    can_create = self._live_drivers < self.size
+                    if can_create:
+                        self._live_drivers += 1
+                if can_create:
+                    return self._create_webdriver()
+                try:
+                    driver = self._idle_drivers.get(timeout=1)
+                except queue.Empty:
+                    continue
+
+            # If pool closed meanwhile, quit webdriver instead of lending it
+            if self._closed:
+                self._discard(driver)
+                raise RuntimeError('Webdriver pool is closed.')
+
+            # Return webdriver if healthy, else discard it and try again
+            if self._is_healthy(driver):
+                return driver
+            self._logger.warning('Found unhealthy webdriver. Discarding...')
+            self._discard(driver)
+
+
     # Create webdriver
-    def _create_webdriver(self):
+    def _create_webdriver(self) -> webdriver.Chrome:
         # TODO Add a docstring
 
         # Set Chrome webdriver options and start it
+        self._logger.info('Creating webdriver...')
         options = webdriver.ChromeOptions()
         options.add_argument('headless')
         options.add_experimental_option(
@@ -151,28 +946,239 @@ class Scraper:
                 "profile.managed_default_content_settings.images": 2,
             }
         )
-        self.driver = webdriver.Chrome(options=options)
+        options.page_load_strategy = self.page_load_strategy
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        driver = None
+        slot = None
+        try:
 
-        # Return nothing
-        return None
+            # If persistent profiles enabled, run on a pool slot's own
+            # profile (Chrome locks a profile to a single instance)
+            if self.profile_dir:
+                with self._lock:
+                    slot = min(self._free_slots)
+                    self._free_slots.remove(slot)
+                options.add_argument(f'--user-data-dir={self._get_slot_profile_dir(slot)}')
+                options.add_argument(f'--disk-cache-size={self.disk_cache_size}')
 
+            driver = webdriver.Chrome(options=options)
 
-    # Delete webdriver
-    def _delete_webdriver(self, 
-                          driver:webdriver.Chrome|None = None):
+            # Block unneeded resources (scripts, css, fonts, ads, trackers...)
+            # before they are requested
+            if self.blocked_url_patterns:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs',
+                                       {'urls': self.blocked_url_patterns})
+        except Exception:
+            if driver:
+                driver.quit()
+            with self._lock:
+                self._live_drivers -= 1
+                if slot is not None:
+                    self._free_slots.add(slot)
+            raise
+        self._driver_uses[driver] = 0
+        self._driver_slots[driver] = slot
+        self._logger.info('Created webdriver.')
+
+        # Return webdriver
+        return driver
+
+
+    # Discard webdriver
+    def _discard(self, driver:webdriver.Chrome) -> None:
         # TODO Add a docstring
 
-        # If external driver passed, close it
-        if driver:
-            self._logger.debug(f'Quitting specified webdriver...')
+        # Quit webdriver, ignoring already dead ones
+        self._logger.debug('Quitting webdriver...')
+        try:
             driver.quit()
+        except WebDriverException:
+            self._logger.debug('Webdriver was already dead.')
+        self._logger.debug('Quitted webdriver.')
 
-        # Else, close self.webdriver
-        else:
-            self._logger.debug(f'Quitting scraper webdriver...')
-            self.driver.quit()
+        # Forget webdriver, freeing its pool slot (and profile, now unlocked)
+        self._driver_uses.pop(driver, None)
+        slot = self._driver_slots.pop(driver, None)
+        with self._lock:
+            self._live_drivers -= 1
+            if slot is not None:
+                self._free_slots.add(slot)
 
-        self._logger.debug('Quitted webdriver.')
-        
         # Return nothing
         return None
+
+
+    # Get slot profile dir
+    def _get_slot_profile_dir(self, slot:int) -> str:
+        """
+        Returns the persistent profile dir of a pool slot. A slot without
+        one yet gets a copy of another slot's profile that is not in use
+        (so it starts warm), minus Chrome's lock files; or starts empty.
+        The copy is made holding the pool lock, so no webdriver can start
+        on the source slot (and write to its profile) halfway through it.
+        """
+
+        # If slot already has a profile, reuse it
+        slot_profile_dir = os.path.join(self.profile_dir, f'slot-{slot}')
+        if os.path.isdir(slot_profile_dir):
+            return slot_profile_dir
+
+        # Else, seed it from an idle slot's profile, if any (slots are only
+        # taken under the pool lock, so idle ones stay idle while copying;
+        # this happens once per slot)
+        with self._lock:
+            for idle_slot in sorted(self._free_slots):
+                idle_profile_dir = os.path.join(self.profile_dir, f'slot-{idle_slot}')
+                if os.path.isdir(idle_profile_dir):
+                    self._logger.debug(f'Seeding webdriver profile "{slot_profile_dir}" '\
+                                       f'from "{idle_profile_dir}"...')
+                    try:
+                        shutil.copytree(idle_profile_dir, slot_profile_dir,
+                                        ignore=shutil.ignore_patterns(*WEBDRIVER_PROFILE_LOCK_FILES))
+                    except (OSError, shutil.Error) as e:
+                        self._logger.warning(f'Failed to seed webdriver profile ({e}). '\
+                                             f'Starting it empty...')
+                        shutil.rmtree(slot_profile_dir, ignore_errors=True)
+                    break
+
+        # Return slot profile dir (Chrome creates it, if missing)
+        return slot_profile_dir
+
+
+    # Check webdriver health
+    def _is_healthy(self, driver:webdriver.Chrome) -> bool:
+        # TODO Add a docstring
+
+        # A cheap round trip to chromedriver tells whether the session lives
+        try:
+            driver.current_url
+        except WebDriverException:
+            return False
+        return True
+
+
+# --- The OfferPageParser class ---
+class OfferPageParser(HTMLParser):
+
+    # Elements that never get an end tag
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+
+        # Set object attributes
+        self.thumbnail_url = None
+        self._stack = []
+        self._texts = {}
+        self._active_fields = set()
+        self._done_fields = set()
+
+
+    # --- Public methods ---
+
+    # Get field text
+    def get_text(self, field:str) -> str|None:
+        # TODO Add a docstring
+
+        # Join field text chunks, collapsing whitespace like WebElement.text
+        text = ' '.join(''.join(self._texts.get(field, [])).split())
+        return text or None
+
+
+    # --- HTMLParser callbacks ---
+
+    # Handle data
+    def handle_data(self, data:str) -> None:
+
+        # Add data to every field currently open, skipping decimal separators
+        for field in self._active_fields:
+            if field == 'price_whole' and self._is_inside_class('a-price-decimal'):
+                continue
+            if field == 'price_before' and self._is_inside_class('a-offscreen'):
+                self._texts.setdefault('price_before_offscreen', []).append(data)
+                continue
+            self._texts.setdefault(field, []).append(data)
+
+
+    # Handle end tag
+    def handle_endtag(self, tag:str) -> None:
+
+        # Ignore void and stray end tags
+        if tag in self.VOID_TAGS:
+            return
+        for i in range(len(self._stack)-1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+
+        # Close element (and any unclosed children), finishing their fields
+        while len(self._stack) > i:
+            _, _, _, fields = self._stack.pop()
+            self._active_fields.difference_update(fields)
+            self._done_fields.update(fields)
+
+
+    # Handle start tag
+    def handle_starttag(self, tag:str, attrs:list) -> None:
+
+        # Read element id and classes
+        attrs = dict(attrs)
+        element_id = attrs.get('id')
+        element_classes = set((attrs.get('class') or '').split())
+
+        # Thumbnail is the first img inside its wrapper
+        if tag == 'img':
+            if not self.thumbnail_url and self._is_inside_id('imgTagWrapperId'):
+                self.thumbnail_url = attrs.get('src')
+            return
+        if tag in self.VOID_TAGS:
+            return
+
+        # Find which fields this element opens (first match only)
+        fields = []
+        if element_id == 'productTitle':
+            fields.append('title')
+        if self._is_inside_id('corePriceDisplay_desktop_feature_div'):
+            if 'a-price-whole' in element_classes:
+                fields.append('price_whole')
+            if 'a-price-fraction' in element_classes:
+                fields.append('price_fraction')
+            if 'a-text-price' in element_classes \
+               and self._is_inside_class('a-spacing-small'):
+                fields.append('price_before')
+            if 'savingsPercentage' in element_classes:
+                fields.append('discount_rate')
+        fields = [field for field in fields
+                  if field not in self._done_fields
+                  and field not in self._active_fields]
+        self._active_fields.update(fields)
+
+        # Open element
+        self._stack.append((tag, element_id, element_classes, fields))
+
+
+    # Handle self-closing tag
+    def handle_startendtag(self, tag:str, attrs:list) -> None:
+
+        # Treat <tag/> as an element with no content
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_TAGS:
+            self.handle_endtag(tag)
+
+
+    # --- Helper methods ---
+
+    # Check if inside element with class
+    def _is_inside_class(self, class_name:str) -> bool:
+        return any(class_name in classes for _, _, classes, _ in self._stack)
+
+
+    # Check if inside element with id
+    def _is_inside_id(self, element_id:str) -> bool:
+        return any(element_id == id_ for _, id_, _, _ in self._stack)
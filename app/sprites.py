@@ -0,0 +1,289 @@
+# --- Imports ---
+
+# Standard
+import logging
+
+# Third party
+import cv2
+import numpy as np
+from pyscreeze import Box
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+DEFAULT_PYRAMID_SCALES = [1, 0.5, 0.25]
+DEFAULT_MIN_TEMPLATE_SIDE = 12 # pixels
+DEFAULT_COARSE_CONFIDENCE_MARGIN = 0.15
+DEFAULT_REFINE_PADDING = 4 # pixels, at full resolution
+
+
+# --- The SpriteBank class ---
+class SpriteBank:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 sprite_paths:list,
+                 pyramid_scales:list
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate pyramid scales
+        if not pyramid_scales or 1 not in pyramid_scales:
+            raise ValueError('Pyramid scales must include full resolution (1).')
+
+        # Set object attributes
+        self.pyramid_scales = sorted(pyramid_scales, reverse=True)
+        self._templates = {}
+        self._color_templates = {}
+        self._last_locations = {}
+
+        # Load every sprite up front
+        for sprite_path in sprite_paths:
+            self._load_sprite(sprite_path)
+
+
+    # --- Public methods ---
+
+    # Get SpriteBank
+    @classmethod
+    def get(cls,
+            sprite_paths:list,
+            pyramid_scales:list = DEFAULT_PYRAMID_SCALES
+            ):
+        # TODO Add a docstring
+
+        # Return SpriteBank object
+        logger.info(f'Getting SpriteBank object ({len(sprite_paths)} sprites)...')
+        return SpriteBank(sprite_paths=sprite_paths,
+                          pyramid_scales=pyramid_scales)
+
+
+    # Get frame pyramid
+    @staticmethod
+    def get_frame_pyramid(frame:np.ndarray) -> dict:
+        """
+        Returns a frame pyramid (dict of scale -> grayscale frame) holding
+        just the full resolution frame. Lower levels are added on demand,
+        so several sprites located on the same frame share them.
+        A BGR frame is also kept as is (under 'color'), to confirm
+        grayscale matches in colour.
+        """
+
+        # Convert frame to grayscale, if needed, keeping colour frame
+        if frame.ndim == 3:
+            return {1: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 'color': frame}
+        return {1: frame}
+
+
+    # Locate sprite
+    def locate(self,
+               sprite_path:str,
+               frame_pyramid:dict,
+               confidence_lvl:float = 0.9,
+               region:tuple|None = None
+               ) -> Box|None:
+        """
+        Locates a sprite on a frame. Looks first around where the sprite was
+        last found on frames of the same resolution, then inside region
+        (left, top, right, bottom, as fractions of the frame), and only then
+        on the whole frame. Matches are made in grayscale and, if frame
+        pyramid has a colour frame, confirmed in colour (sprites that only
+        differ in colour, like link sticker colours, look alike in
+        grayscale). Returns a pyscreeze.Box object; or None.
+        """
+
+        # Get sprite templates (loading unknown sprites on first use)
+        if sprite_path not in self._templates:
+            self._load_sprite(sprite_path)
+        templates = self._templates[sprite_path]
+        template_height, template_width = templates[1].shape
+        frame_height, frame_width = frame_pyramid[1].shape
+
+        # List search areas, smallest first
+        search_areas = []
+        location_key = (frame_width, frame_height, sprite_path)
+        last_box = self._last_locations.get(location_key)
+        if last_box:
+            padding = max(template_width, template_height)
+            search_areas.append(('last known location',
+                                 (last_box.left - padding,
+                                  last_box.top - padding,
+                                  last_box.left + last_box.width + padding,
+                                  last_box.top + last_box.height + padding)))
+        if region:
+            search_areas.append(('search region',
+                                 (int(region[0]*frame_width),
+                                  int(region[1]*frame_height),
+                                  int(region[2]*frame_width),
+                                  int(region[3]*frame_height))))
+        search_areas.append(('full frame', (0, 0, frame_width, frame_height)))
+
+        # Search areas in order, remembering where sprite was found
+        for search_area_name, search_area in search_areas:
+            box = self._locate_in_area(templates, frame_pyramid, confidence_lvl, search_area)
+            if box and 'color' in frame_pyramid:
+                box = self._confirm_in_color(self._color_templates[sprite_path],
+                                             frame_pyramid['color'],
+                                             confidence_lvl,
+                                             box)
+            if box:
+                self._logger.debug(f'Found "{sprite_path}" in {search_area_name}.')
+                self._last_locations[location_key] = box
+                return box
+
+        # If not found anywhere, return nothing
+        return None
+
+
+    # --- Helper methods ---
+
+    # Confirm match in colour
+    def _confirm_in_color(self,
+                          color_template:np.ndarray,
+                          color_frame:np.ndarray,
+                          confidence_lvl:float,
+                          box:Box
+                          ) -> Box|None:
+        # TODO Add a docstring
+
+        # Match colour template in a small window around grayscale match
+        frame_height, frame_width = color_frame.shape[:2]
+        window_left = max(0, box.left - DEFAULT_REFINE_PADDING)
+        window_top = max(0, box.top - DEFAULT_REFINE_PADDING)
+        window_right = min(frame_width, box.left + box.width + DEFAULT_REFINE_PADDING)
+        window_bottom = min(frame_height, box.top + box.height + DEFAULT_REFINE_PADDING)
+        return self._match(color_frame[window_top:window_bottom, window_left:window_right],
+                           color_template, confidence_lvl, window_left, window_top)
+
+
+    # Get frame level
+    def _get_frame_level(self,
+                         frame_pyramid:dict,
+                         scale:float
+                         ) -> np.ndarray:
+        # TODO Add a docstring
+
+        # Downscale full resolution frame only the first time it is asked for
+        if scale not in frame_pyramid:
+            frame_pyramid[scale] = cv2.resize(frame_pyramid[1], None,
+                                              fx=scale, fy=scale,
+                                              interpolation=cv2.INTER_AREA)
+        return frame_pyramid[scale]
+
+
+    # Load sprite
+    def _load_sprite(self, sprite_path:str) -> None:
+        # TODO Add a docstring
+
+        # Load sprite as grayscale template (and colour one, to confirm
+        # grayscale matches)
+        self._logger.debug(f'Loading sprite "{sprite_path}"...')
+        color_template = cv2.imread(sprite_path, cv2.IMREAD_COLOR)
+        if color_template is None:
+            raise IOError(f'Failed to read sprite "{sprite_path}".')
+        template = cv2.cvtColor(color_template, cv2.COLOR_BGR2GRAY)
+        self._color_templates[sprite_path] = color_template
+
+        # Precompute pyramid levels big enough to still be matched on
+        templates = {}
+        for scale in self.pyramid_scales:
+            height, width = template.shape
+            if scale != 1 and min(height, width)*scale < DEFAULT_MIN_TEMPLATE_SIDE:
+                continue
+            templates[scale] = template if scale == 1 else \
+                               cv2.resize(template, None,
+                                          fx=scale, fy=scale,
+                                          interpolation=cv2.INTER_AREA)
+        self._templates[sprite_path] = templates
+        self._logger.debug(f'Loaded sprite "{sprite_path}" '\
+                           f'(pyramid scales: {list(templates)}).')
+
+        # Return nothing
+        return None
+
+
+    # Locate sprite in area
+    def _locate_in_area(self,
+                        templates:dict,
+                        frame_pyramid:dict,
+                        confidence_lvl:float,
+                        search_area:tuple
+                        ) -> Box|None:
+        # TODO Add a docstring
+
+        # Clip search area to frame
+        frame = frame_pyramid[1]
+        frame_height, frame_width = frame.shape
+        left, top, right, bottom = search_area
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(frame_width, right), min(frame_height, bottom)
+        template = templates[1]
+        template_height, template_width = template.shape
+        if right - left < template_width or bottom - top < template_height:
+            return None
+
+        # Small areas (or small sprites) are matched at full resolution
+        scale = min(templates)
+        if scale == 1 or (right - left)*(bottom - top) <= 16*template_width*template_height:
+            return self._match(frame[top:bottom, left:right], template, confidence_lvl, left, top)
+
+        # Else, match on coarsest level available...
+        frame_level = self._get_frame_level(frame_pyramid, scale)
+        frame_level = frame_level[int(top*scale):int(bottom*scale),
+                                  int(left*scale):int(right*scale)]
+        if templates[scale].shape[0] > frame_level.shape[0] \
+           or templates[scale].shape[1] > frame_level.shape[1]:
+            return None
+        result = cv2.matchTemplate(frame_level, templates[scale], cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val < confidence_lvl - DEFAULT_COARSE_CONFIDENCE_MARGIN:
+            return None
+
+        # ...and confirm candidate at full resolution, in a window around it
+        x = left + int(max_loc[0]/scale)
+        y = top + int(max_loc[1]/scale)
+        padding = int(1/scale) + DEFAULT_REFINE_PADDING
+        window_left = max(0, x - padding)
+        window_top = max(0, y - padding)
+        window_right = min(frame_width, x + template_width + padding)
+        window_bottom = min(frame_height, y + template_height + padding)
+        return self._match(frame[window_top:window_bottom, window_left:window_right],
+                           template, confidence_lvl, window_left, window_top)
+
+
+    # Match template
+    def _match(self,
+               frame:np.ndarray,
+               template:np.ndarray,
+               confidence_lvl:float,
+               x_offset:int,
+               y_offset:int
+               ) -> Box|None:
+        # TODO Add a docstring
+
+        # Match template, keeping best location if confident enough
+        if template.shape[0] > frame.shape[0] or template.shape[1] > frame.shape[1]:
+            return None
+        result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val < confidence_lvl:
+            return None
+
+        # Return box in frame coordinates
+        return Box(left=max_loc[0] + x_offset,
+                   top=max_loc[1] + y_offset,
+                   width=template.shape[1],
+                   height=template.shape[0])
@@ -0,0 +1,198 @@
+# --- Imports ---
+
+# Standard
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import re
+import threading
+from urllib.parse import urljoin, urlsplit
+
+# Third party
+import requests
+
+# --- Global Configuration ---
+
+# Logger setup
+logger = logging.getLogger(name=__name__)
+logger.setLevel(level=logging.INFO)
+handler = logging.FileHandler(filename='./logs/log.log', mode='a')
+formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(fmt=formatter)
+logger.addHandler(hdlr=handler)
+
+# Global variables
+ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d|product)/([A-Z0-9]{10})(?:[/?#]|$)')
+CANONICAL_URL_TEMPLATE = 'https://www.amazon.com.br/dp/{asin}'
+DEFAULT_RESOLVER_WORKERS = 8
+DEFAULT_RESOLVER_MAX_REDIRECTS = 5
+DEFAULT_RESOLVER_TIMEOUT = 10
+SHORT_LINK_HOSTS = ['amzn.to', 'a.co']
+
+
+# --- The UrlResolver class ---
+class UrlResolver:
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self,
+                 session:requests.Session,
+                 max_workers:int,
+                 cache = None,
+                 rate_limiter = None
+                 ):
+
+        # Instance logger setup
+        self._logger = logging.getLogger(__name__)\
+                              .getChild(self.__class__.__name__)
+
+        # Validate session
+        if not session:
+            raise ValueError('Missing HTTP session.')
+
+        # Validate max workers
+        if not max_workers or max_workers < 1:
+            raise ValueError('Resolver max workers must be at least 1.')
+
+        # Set object attributes
+        self.session = session
+        self.max_workers = max_workers
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self._short_links = {}
+        self._lock = threading.Lock()
+
+
+    # --- Public methods ---
+
+    # Get UrlResolver
+    @classmethod
+    def get(cls,
+            session:requests.Session|None = None,
+            max_workers:int = DEFAULT_RESOLVER_WORKERS,
+            cache = None,
+            rate_limiter = None
+            ):
+        # TODO Add a docstring
+
+        # Return UrlResolver object
+        logger.info('Getting UrlResolver object...')
+        return UrlResolver(session=session or requests.Session(),
+                           max_workers=max_workers,
+                           cache=cache,
+                           rate_limiter=rate_limiter)
+
+
+    # Extract ASIN from url
+    @staticmethod
+    def extract_asin(url:str) -> str|None:
+        """
+        Returns the ASIN found in an amazon product url; or None.
+        """
+
+        # Search url path for ASIN
+        match = ASIN_PATTERN.search(url)
+        return match.group(1) if match else None
+
+
+    # Check if url is a short link
+    @staticmethod
+    def is_short_link(url:str) -> bool:
+        # TODO Add a docstring
+
+        # Compare url host with known short link hosts
+        return urlsplit(url.strip()).hostname in SHORT_LINK_HOSTS
+
+
+    # Get ASIN for an url
+    def get_asin(self, url:str) -> str|None:
+        """
+        Returns the ASIN behind an url, resolving short links if needed.
+        Successful short link resolutions are memoized (and persisted, if
+        cache set); failed ones (e.g. a network hiccup) are tried again
+        next time.
+        """
+
+        # If url already has an ASIN, return it
+        url = url.strip()
+        asin = self.extract_asin(url)
+        if asin or not self.is_short_link(url):
+            return asin
+
+        # If short link resolved before, return memoized ASIN
+        with self._lock:
+            if url in self._short_links:
+                return self._short_links[url]
+        asin = self.cache.load_short_link(url) if self.cache else None
+
+        # Else, follow its redirects
+        if not asin:
+            asin = self._resolve_short_link(url)
+            if asin and self.cache:
+                self.cache.store_short_link(url, asin)
+
+        # Memoize ASIN (if resolved), return it
+        if asin:
+            with self._lock:
+                self._short_links[url] = asin
+        return asin
+
+
+    # Resolve url
+    def resolve(self, url:str) -> str:
+        """
+        Returns the canonical amazon.com.br product url for url; or url
+        itself, if no ASIN could be found behind it.
+        """
+
+        # Build canonical url from ASIN
+        asin = self.get_asin(url)
+        return CANONICAL_URL_TEMPLATE.format(asin=asin) if asin else url.strip()
+
+
+    # Resolve many urls
+    def resolve_many(self, urls:list) -> list:
+        # TODO Add a docstring
+
+        # Resolve urls concurrently, keeping input order
+        self._logger.info(f'Resolving {len(urls)} urls...')
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='resolver') as executor:
+            resolved_urls = list(executor.map(self.resolve, urls))
+        self._logger.info(f'Resolved {len(urls)} urls.')
+
+        # Return canonical urls
+        return resolved_urls
+
+
+    # --- Helper methods ---
+
+    # Resolve short link
+    def _resolve_short_link(self, url:str) -> str|None:
+        # TODO Add a docstring
+
+        # Follow redirects by hand with HEAD requests, stopping at the first
+        # location that reveals the ASIN (no need to load the product page)
+        self._logger.debug(f'Resolving short link "{url}"...')
+        location = url
+        for _ in range(DEFAULT_RESOLVER_MAX_REDIRECTS):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(location)
+            try:
+                response = self.session.head(location,
+                                             allow_redirects=False,
+                                             timeout=DEFAULT_RESOLVER_TIMEOUT)
+            except requests.RequestException as e:
+                self._logger.warning(f'Failed to resolve short link "{url}" ({e}).')
+                return None
+            if not response.is_redirect:
+                break
+            location = urljoin(location, response.headers['Location'])
+            asin = self.extract_asin(location)
+            if asin:
+                self._logger.debug(f'Resolved short link "{url}" to ASIN "{asin}".')
+                return asin
+
+        # If no redirect revealed an ASIN, give up
+        self._logger.warning(f'Short link "{url}" did not resolve to a product.')
+        return None
@@ -0,0 +1,14 @@
+# --- Imports ---
+
+# Standard
+import os
+import sys
+
+# --- Global Configuration ---
+
+# Run tests from the repository root (modules log to ./logs/, and load
+# ./resources/), importing app modules the way main.py does
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT_DIR)
+os.makedirs('./logs/', exist_ok=True)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
@@ -0,0 +1,190 @@
+# --- Imports ---
+
+# Standard
+import socket
+import struct
+import threading
+
+# Third party
+from ppadb.client import Client as AdbClient
+from ppadb.device import Device as AdbDevice
+
+# Local
+from android import Device, DEFAULT_ADB_STAGING_FOLDER, SPRITE_LINKSTICKER
+
+
+# --- The FakeAdbServer class ---
+class FakeAdbServer:
+    """
+    Bare-bones adb server that accepts transport and sync services and
+    stores pushed files, replying to each push like adbd does (OKAY
+    followed by a 4-byte length).
+    """
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self):
+
+        # Set object attributes
+        self.files = {}
+        self._socket = socket.create_server(('127.0.0.1', 0))
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+
+    # --- Public methods ---
+
+    # Close server
+    def close(self) -> None:
+        self._socket.close()
+
+
+    # --- Helper methods ---
+
+    # Handle connection
+    def _handle(self, connection:socket.socket) -> None:
+        with connection:
+            while True:
+
+                # Acknowledge host services (transport, sync...)
+                length = self._recv(connection, 4)
+                if not length:
+                    return
+                service = self._recv(connection, int(length, 16)).decode()
+                connection.sendall(b'OKAY')
+                if service != 'sync:':
+                    continue
+
+                # Store pushed files (SEND path,mode / DATA... / DONE mtime)
+                dest, data = None, bytearray()
+                while True:
+                    header = self._recv(connection, 8)
+                    if len(header) < 8:
+                        return
+                    command, length = header[:4], struct.unpack('<I', header[4:])[0]
+                    if command == b'SEND':
+                        dest = self._recv(connection, length).decode().split(',')[0]
+                        data = bytearray()
+                    elif command == b'DATA':
+                        data += self._recv(connection, length)
+                    elif command == b'DONE':
+                        self.files[dest] = bytes(data)
+                        connection.sendall(b'OKAY' + struct.pack('<I', 0))
+                    else:
+                        return
+
+
+    # Receive exactly n bytes (fewer, if connection closed)
+    @staticmethod
+    def _recv(connection:socket.socket, n:int) -> bytes:
+        data = bytearray()
+        while len(data) < n:
+            try:
+                chunk = connection.recv(n - len(data))
+            except OSError:
+                break
+            if not chunk:
+                break
+            data += chunk
+        return bytes(data)
+
+
+    # Serve connections
+    def _serve(self) -> None:
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+
+# Locate link sticker in UI hierarchy
+def test_locate_link_sticker_skips_search_field():
+
+    # Set up a device (no adb server needed, nothing is run on it)
+    device = Device(client_ip='127.0.0.1',
+                    client_port=5037,
+                    device_adb=AdbDevice(AdbClient(host='127.0.0.1', port=5037), 'fake'),
+                    device_id='fake',
+                    device_screen_width=720,
+                    device_screen_height=1280,
+                    device_name='fake device')
+
+    # Search field holds the "link" just typed, ahead of the sticker tile
+    ui_nodes = [{'class': 'android.widget.EditText', 'text': 'link',
+                 'focused': 'true', 'bounds': '[40,100][680,160]'},
+                {'class': 'android.widget.TextView', 'text': 'LINK',
+                 'focused': 'false', 'bounds': '[60,300][240,380]'}]
+
+    # Sticker tile is located, not the search field
+    assert tuple(device._locate_in_ui_hierarchy(SPRITE_LINKSTICKER, ui_nodes)) == (60, 300, 180, 80)
+
+
+# Dump UI hierarchy without the shell session
+def test_dump_ui_hierarchy_falls_back_to_one_off_shell(monkeypatch):
+
+    # Set up a device whose shell session is broken
+    device = Device(client_ip='127.0.0.1',
+                    client_port=5037,
+                    device_adb=AdbDevice(AdbClient(host='127.0.0.1', port=5037), 'fake'),
+                    device_id='fake',
+                    device_screen_width=720,
+                    device_screen_height=1280,
+                    device_name='fake device')
+    def run(command, retry_safe):
+        raise OSError('Connection reset.')
+    monkeypatch.setattr(device.shell_session, 'run', run)
+
+    # One-off adb shells have no terminal, so only files can be dumped to
+    files = {}
+    def shell(command):
+        output = ''
+        for part in command.split(' && '):
+            program, *args = part.split()
+            if program == 'uiautomator' and args[1] != '/dev/tty':
+                files[args[1]] = '<?xml version="1.0"?><hierarchy>'\
+                                 '<node text="LINK" bounds="[60,300][240,380]"/></hierarchy>'
+                output += f'UI hierchary dumped to: {args[1]}\n'
+            elif program == 'cat':
+                output += files[args[0]]
+            else:
+                return '/dev/tty: No such device or address\n'
+        return output
+    monkeypatch.setattr(device.device_adb, 'shell', shell)
+
+    # UI hierarchy is dumped all the same
+    assert device._dump_ui_hierarchy() == [{'text': 'LINK', 'bounds': '[60,300][240,380]'}]
+
+
+# Stage story images
+def test_stage_story_images_pushes_every_file(tmp_path):
+
+    # Connect a device to the fake adb server (staging folder already set up)
+    server = FakeAdbServer()
+    device = Device(client_ip='127.0.0.1',
+                    client_port=server.port,
+                    device_adb=AdbDevice(AdbClient(host='127.0.0.1', port=server.port), 'fake'),
+                    device_id='fake',
+                    device_screen_width=720,
+                    device_screen_height=1280,
+                    device_name='fake device')
+    device._staging_folders.add(DEFAULT_ADB_STAGING_FOLDER)
+
+    # Stage a batch of three images
+    src_file_paths = []
+    for index in range(3):
+        src_file_path = tmp_path / f'post-image-{index}.png'
+        src_file_path.write_bytes(bytes([index])*100)
+        src_file_paths.append(str(src_file_path))
+    try:
+        staged_file_paths = device.stage_story_images(src_file_paths)
+    finally:
+        server.close()
+
+    # Every image lands in staging folder, under its own name
+    assert staged_file_paths == [f'{DEFAULT_ADB_STAGING_FOLDER}post-image-{index}.png'
+                                 for index in range(3)]
+    assert server.files == {staged_file_path: bytes([index])*100
+                            for index, staged_file_path in enumerate(staged_file_paths)}
@@ -0,0 +1,163 @@
+# --- Imports ---
+
+# Standard
+import asyncio
+from collections import Counter
+
+# Third party
+from aiohttp import web
+import pytest
+
+# Local
+import async_scraping as async_scraping_module
+from async_scraping import AsyncScraper
+from scraping import OfferParseError, ScrapingError
+
+
+# Fast retries fixture
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(async_scraping_module, 'DEFAULT_SCRAPER_RETRY_BASE_DELAY', 1)
+
+
+# Run a scrape against a fake Amazon
+def run_scrape(get_routes, scrape, max_concurrency:int = 10) -> tuple:
+    """
+    Serves get_routes(base url) ({path: list of response factories, taken
+    in turn, the last one repeating}) on a local HTTP server, then awaits
+    scrape(scraper, base url) with a fresh AsyncScraper.
+    Returns a (scrape result, request counter, breaker failures) tuple.
+    """
+
+    async def main():
+
+        # Answer requests from routes, counting them
+        requests = Counter()
+        routes = {}
+        async def handle(request):
+            responses = routes[request.path]
+            response = responses[min(requests[request.path], len(responses) - 1)]
+            requests[request.path] += 1
+            return response()
+        app = web.Application()
+        app.router.add_route('GET', '/{path:.*}', handle)
+
+        # Start server on a free port, scrape it
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        base_url = f'http://127.0.0.1:{runner.addresses[0][1]}'
+        routes.update(get_routes(base_url))
+        scraper = AsyncScraper.get(max_concurrency=max_concurrency, requests_per_second=100)
+        failures = []
+        scraper.circuit_breaker.record_failure = lambda: failures.append(True)
+        try:
+            result = await scrape(scraper, base_url)
+        except Exception as e:
+            result = e
+        finally:
+            await scraper.close()
+            await runner.cleanup()
+        return result, requests, len(failures)
+
+    return asyncio.run(main())
+
+
+# Get offer page response factory
+def offer_page(base_url:str, title:str = 'Fake offer'):
+    with open('./resources/fake/offer-page.html', encoding='utf-8') as file:
+        html = file.read()
+    html = html.replace('https://m.media-amazon.com/images/I/fake-thumbnail._AC_SX679_.jpg',
+                        f'{base_url}/thumbnail.jpg')
+    html = html.replace('Fone de Ouvido Sem Fio Bluetooth com Cancelamento de Ruído, Preto', title)
+    return lambda: web.Response(text=html, content_type='text/html')
+
+
+# Get status response factory
+def status(code:int):
+    return lambda: web.Response(status=code, text='Nope.')
+
+
+# Get thumbnail response factory
+def thumbnail():
+    return lambda: web.Response(body=b'thumbnail', content_type='image/jpeg')
+
+
+# Scrape an offer
+def test_scrape_amazon_offer_parses_offer_page():
+    offer, requests, failures = run_scrape(
+        lambda base_url: {'/offer': [offer_page(base_url)], '/thumbnail.jpg': [thumbnail()]},
+        lambda scraper, base_url: scraper.scrape_amazon_offer(f'{base_url}/offer'))
+    assert (offer.title, offer.price_now, offer.thumbnail) == ('Fake offer', 1299.90, b'thumbnail')
+    assert failures == 0
+
+
+# Retry server errors
+def test_scrape_amazon_offer_retries_server_errors():
+    offer, requests, failures = run_scrape(
+        lambda base_url: {'/offer': [status(500), offer_page(base_url)],
+                          '/thumbnail.jpg': [thumbnail()]},
+        lambda scraper, base_url: scraper.scrape_amazon_offer(f'{base_url}/offer'))
+    assert offer.title == 'Fake offer'
+    assert (requests['/offer'], failures) == (2, 1)
+
+
+# Give up on client errors
+def test_scrape_amazon_offer_does_not_retry_client_errors():
+    error, requests, failures = run_scrape(
+        lambda base_url: {'/offer': [status(404)]},
+        lambda scraper, base_url: scraper.scrape_amazon_offer(f'{base_url}/offer'))
+    assert isinstance(error, ScrapingError)
+    assert (requests['/offer'], failures) == (1, 0)
+
+
+# Give up on unparseable pages
+def test_scrape_amazon_offer_does_not_retry_unparseable_pages():
+    error, requests, failures = run_scrape(
+        lambda base_url: {'/offer': [lambda: web.Response(text='<html></html>',
+                                                         content_type='text/html')]},
+        lambda scraper, base_url: scraper.scrape_amazon_offer(f'{base_url}/offer'))
+    assert isinstance(error, OfferParseError)
+    assert (requests['/offer'], failures) == (1, 0)
+
+
+# Free concurrency slots while backing off
+def test_scrape_amazon_offers_backoff_holds_no_concurrency_slot():
+
+    # Scrape a failing-once offer and a healthy one, a single request at a
+    # time
+    async def scrape(scraper, base_url):
+        return [offer.title async for offer
+                in scraper.scrape_amazon_offers([f'{base_url}/flaky', f'{base_url}/healthy'])]
+    titles, requests, failures = run_scrape(
+        lambda base_url: {'/flaky': [status(500), offer_page(base_url, 'Flaky offer')],
+                          '/healthy': [offer_page(base_url, 'Healthy offer')],
+                          '/thumbnail.jpg': [thumbnail()]},
+        scrape,
+        max_concurrency=1)
+
+    # Healthy offer is scraped while flaky one backs off
+    assert titles == ['Healthy offer', 'Flaky offer']
+
+
+# Retry failed short links
+def test_resolve_does_not_memoize_failed_short_links():
+
+    # First resolution hits a network error, next one gets the ASIN
+    async def main():
+        scraper = AsyncScraper.get()
+        asins = [None, 'B0ABCDEFGH']
+        async def resolve_short_link(url):
+            return asins.pop(0)
+        scraper._resolve_short_link = resolve_short_link
+        resolved_urls = [await scraper.resolve('https://amzn.to/abc') for _ in range(3)]
+        await scraper.close()
+        return resolved_urls, asins
+
+    # Failure is tried again, success is memoized
+    resolved_urls, asins = asyncio.run(main())
+    assert resolved_urls == ['https://amzn.to/abc',
+                             'https://www.amazon.com.br/dp/B0ABCDEFGH',
+                             'https://www.amazon.com.br/dp/B0ABCDEFGH']
+    assert asins == []
@@ -0,0 +1,125 @@
+# --- Imports ---
+
+# Third party
+import pytest
+
+# Local
+import cache as cache_module
+from cache import OfferCache
+
+
+# --- The FakeClock class ---
+class FakeClock:
+    """
+    Stand-in for the time module, whose time only moves when told to.
+    """
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self):
+        self.now = 1_000_000.0
+
+
+    # --- Public methods ---
+
+    # Get time
+    def time(self) -> float:
+        return self.now
+
+
+# Fake clock fixture
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+# Store an offer
+def store(offer_cache:OfferCache, asin:str) -> None:
+    offer_cache.store(url=f'https://www.amazon.com.br/dp/{asin}',
+                      title=f'Offer {asin}',
+                      thumbnail=b'thumbnail',
+                      price_now=10.0,
+                      price_before=None,
+                      discount_rate=None)
+
+
+# Load a stored offer
+def test_load_returns_stored_offer_by_asin(tmp_path, clock):
+
+    # Store an offer
+    offer_cache = OfferCache.get(path=str(tmp_path / 'cache.db'))
+    store(offer_cache, 'B0ABCDEFGH')
+
+    # Any url for the same product hits it
+    fields = offer_cache.load('https://www.amazon.com.br/Fone/dp/B0ABCDEFGH?th=1')
+    assert fields == {'title': 'Offer B0ABCDEFGH',
+                      'thumbnail': b'thumbnail',
+                      'price_now': 10.0,
+                      'price_before': None,
+                      'discount_rate': None}
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0ZZZZZZZZ') is None
+    offer_cache.close()
+
+
+# Expire stale offers
+def test_load_expires_offers_older_than_ttl(tmp_path, clock):
+
+    # Store an offer
+    offer_cache = OfferCache.get(path=str(tmp_path / 'cache.db'), ttl=60)
+    store(offer_cache, 'B0ABCDEFGH')
+
+    # Offer is served until its TTL runs out, then dropped
+    clock.now += 60
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0ABCDEFGH')
+    clock.now += 1
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0ABCDEFGH') is None
+    clock.now -= 1
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0ABCDEFGH') is None
+    offer_cache.close()
+
+
+# Evict least recently used offers
+def test_store_evicts_least_recently_used_offers(tmp_path, clock):
+
+    # Fill cache up, then use the oldest offer
+    offer_cache = OfferCache.get(path=str(tmp_path / 'cache.db'), max_entries=2)
+    store(offer_cache, 'B0AAAAAAAA')
+    clock.now += 1
+    store(offer_cache, 'B0BBBBBBBB')
+    clock.now += 1
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0AAAAAAAA')
+
+    # Storing a third offer evicts the least recently used one
+    clock.now += 1
+    store(offer_cache, 'B0CCCCCCCC')
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0AAAAAAAA')
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0BBBBBBBB') is None
+    assert offer_cache.load('https://www.amazon.com.br/dp/B0CCCCCCCC')
+    offer_cache.close()
+
+
+# Persist short links
+def test_short_links_persist_across_reopens(tmp_path, clock):
+
+    # Store a short link, reopen cache
+    path = str(tmp_path / 'cache.db')
+    offer_cache = OfferCache.get(path=path)
+    assert offer_cache.load_short_link('https://amzn.to/abc') is None
+    offer_cache.store_short_link('https://amzn.to/abc', 'B0ABCDEFGH')
+    offer_cache.close()
+    offer_cache = OfferCache.get(path=path)
+
+    # Short link ASIN is still there, however long ago it was stored
+    clock.now += 365*24*60*60
+    assert offer_cache.load_short_link('https://amzn.to/abc') == 'B0ABCDEFGH'
+    offer_cache.close()
+
+
+# Validate settings
+@pytest.mark.parametrize('kwargs', [{'path': ''}, {'ttl': 0}, {'max_entries': 0}])
+def test_get_rejects_invalid_settings(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        OfferCache.get(**{'path': str(tmp_path / 'cache.db'), **kwargs})
@@ -0,0 +1,120 @@
+# --- Imports ---
+
+# Third party
+import pytest
+
+# Local
+from fleet import Fleet
+
+
+# --- The FakeDevice class ---
+class FakeDevice:
+    """
+    Stand-in for android.Device that stages and posts instantly,
+    recording posted images (or fails to stage, if broken).
+    """
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self, device_id:str, broken:bool = False):
+
+        # Set object attributes
+        self.device_id = device_id
+        self.device_name = f'device {device_id}'
+        self.broken = broken
+        self.posted_images = []
+        self.closed = False
+
+
+    # --- Public methods ---
+
+    # Clean up story images
+    def clean_up_story_images(self) -> None:
+        pass
+
+
+    # Close device
+    def close(self) -> None:
+        self.closed = True
+
+
+    # Post story
+    def post_instagram_story(self, post_image:str, post_image_staged:bool = False) -> None:
+        self.posted_images.append(post_image)
+
+
+    # Stage story images
+    def stage_story_images(self, src_file_paths:list) -> list:
+        if self.broken:
+            raise RuntimeError('Device offline.')
+        return [f'/staging/{src_file_path}' for src_file_path in src_file_paths]
+
+
+# Post stories across devices
+def test_fleet_posts_every_story_and_calls_back():
+
+    # Submit a dozen stories to two devices
+    devices = [FakeDevice('1'), FakeDevice('2')]
+    fleet = Fleet(devices=devices, max_staged=2)
+    staged, posted = [], []
+    futures = [fleet.submit_instagram_story(on_staged=lambda index=index: staged.append(index),
+                                            on_posted=lambda index=index: posted.append(index),
+                                            post_image=f'post-{index}.png')
+               for index in range(12)]
+
+    # Every story is posted once, from its staged copy, callbacks included
+    assert all(future.result(timeout=10) in devices for future in futures)
+    fleet.close()
+    assert sorted(staged) == sorted(posted) == list(range(12))
+    assert sorted(image for device in devices for image in device.posted_images) \
+           == sorted(f'/staging/post-{index}.png' for index in range(12))
+    assert all(device.closed for device in devices)
+
+
+# Survive callback errors
+def test_fleet_keeps_posting_when_callbacks_fail():
+
+    # Submit stories whose callbacks raise
+    def fail():
+        raise ValueError('Journal is gone.')
+    fleet = Fleet(devices=[FakeDevice('1')], max_staged=2)
+    futures = [fleet.submit_instagram_story(on_staged=fail,
+                                            on_posted=fail,
+                                            post_image=f'post-{index}.png')
+               for index in range(4)]
+
+    # Stories are still posted
+    assert all(future.result(timeout=10) for future in futures)
+    fleet.close()
+
+
+# Route stories around a broken device
+def test_fleet_hands_broken_device_stories_to_healthy_ones():
+
+    # Submit a dozen stories to a healthy and a broken device
+    healthy_device, broken_device = FakeDevice('1'), FakeDevice('2', broken=True)
+    fleet = Fleet(devices=[healthy_device, broken_device], max_staged=2)
+    futures = [fleet.submit_instagram_story(post_image=f'post-{index}.png')
+               for index in range(12)]
+
+    # Healthy device posts every story
+    assert all(future.result(timeout=10) is healthy_device for future in futures)
+    fleet.close()
+    assert len(healthy_device.posted_images) == 12
+
+
+# Fail stories once every device is broken
+def test_fleet_fails_stories_when_no_device_can_stage():
+
+    # Submit stories to broken devices only
+    fleet = Fleet(devices=[FakeDevice('1', broken=True), FakeDevice('2', broken=True)],
+                  max_staged=2)
+    futures = [fleet.submit_instagram_story(post_image=f'post-{index}.png')
+               for index in range(4)]
+
+    # Every story fails (none hangs)
+    for future in futures:
+        with pytest.raises(RuntimeError, match='Device offline.'):
+            future.result(timeout=10)
+    fleet.close()
@@ -0,0 +1,87 @@
+# --- Imports ---
+
+# Standard
+import multiprocessing
+import os
+import time
+
+# Local
+from image import Generator
+from offer import Offer
+
+
+# Get a fake offer
+def get_offer(index:int) -> Offer:
+    with open('./resources/fake/offer-thumbnail-640x640.png', 'rb') as file:
+        thumbnail = file.read()
+    return Offer(url=f'https://www.amazon.com.br/dp/B00000000{index}',
+                 title=f'Fake offer {index}',
+                 thumbnail=thumbnail,
+                 price_now=1299.90,
+                 price_before=1733.20,
+                 discount_rate=0.25)
+
+
+# Render offers as they come
+def test_iter_ig_post_images_does_not_wait_on_next_offer(tmp_path):
+
+    # Offers arrive slowly after the first (e.g. still being scraped)
+    def slow_offers():
+        yield get_offer(0)
+        time.sleep(5)
+        yield get_offer(1)
+
+    # First image comes out as soon as it is rendered, not once the next
+    # offer arrives
+    generator = Generator.get()
+    post_images = generator.iter_ig_post_images(slow_offers(),
+                                                output_file_folder=f'{tmp_path}/',
+                                                max_workers=2)
+    started_at = time.monotonic()
+    offer, output_file_path = next(post_images)
+    assert time.monotonic() - started_at < 4
+    assert offer.title == 'Fake offer 0'
+    assert os.path.basename(output_file_path) == 'image-0000.png'
+    assert os.path.exists(output_file_path)
+
+    # Rest come out in offers order
+    assert [(offer.title, os.path.basename(output_file_path))
+            for offer, output_file_path in post_images] == [('Fake offer 1', 'image-0001.png')]
+
+
+# Close without iterating
+def test_iter_ig_post_images_starts_nothing_until_iterated(tmp_path):
+
+    # Create post images iterator and close it right away
+    generator = Generator.get()
+    post_images = generator.iter_ig_post_images([get_offer(0)],
+                                                output_file_folder=f'{tmp_path}/',
+                                                max_workers=2)
+    post_images.close()
+
+    # No worker process was left behind
+    assert not multiprocessing.active_children()
+    assert not os.listdir(tmp_path)
+
+
+# Render a batch across processes
+def test_create_ig_post_images_matches_single_process_render(tmp_path):
+
+    # Render the same offers across a process pool and one by one
+    (tmp_path / 'pool').mkdir()
+    (tmp_path / 'single').mkdir()
+    generator = Generator.get()
+    offers = [get_offer(index) for index in range(3)]
+    pool_paths = generator.create_ig_post_images(offers,
+                                                 output_file_folder=f'{tmp_path}/pool/',
+                                                 max_workers=2)
+    single_paths = generator.create_ig_post_images(offers,
+                                                   output_file_folder=f'{tmp_path}/single/',
+                                                   max_workers=1)
+
+    # Outputs are numbered in offers order, with identical images
+    assert [os.path.basename(path) for path in pool_paths] \
+           == ['image-0000.png', 'image-0001.png', 'image-0002.png']
+    for pool_path, single_path in zip(pool_paths, single_paths):
+        with open(pool_path, 'rb') as pool_file, open(single_path, 'rb') as single_file:
+            assert pool_file.read() == single_file.read()
@@ -0,0 +1,77 @@
+# --- Imports ---
+
+# Standard
+import json
+
+# Third party
+import pytest
+
+# Local
+from journal import Journal
+
+
+# Record and replay states
+def test_replay_keeps_latest_state_per_url(tmp_path):
+
+    # Record a few states, then reopen journal
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal.get(path=path)
+    journal.record('https://a', 'scraped')
+    journal.record('https://b', 'scraped')
+    journal.record('https://a', 'posted')
+    journal.close()
+    journal = Journal.get(path=path)
+
+    # Latest state wins
+    assert journal.get_state('https://a') == 'posted'
+    assert journal.get_state('https://b') == 'scraped'
+    assert journal.get_state('https://c') is None
+    journal.close()
+
+
+# Reject unknown states
+def test_record_rejects_invalid_state(tmp_path):
+    journal = Journal.get(path=str(tmp_path / 'journal.jsonl'))
+    with pytest.raises(ValueError):
+        journal.record('https://a', 'liked')
+    journal.close()
+
+
+# Recover from a torn or unterminated last record
+@pytest.mark.parametrize('tail', ['{"url": "https://b", "sta',
+                                  '{"url": "https://b", "state": "posted", "at": 0}'])
+def test_replay_tail_without_newline_survives_next_record(tmp_path, tail):
+
+    # Leave a journal whose last record has no newline (crash mid-write)
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(json.dumps({'url': 'https://a', 'state': 'posted', 'at': 0}) + '\n' + tail,
+                    encoding='utf-8')
+
+    # Append a record after replaying it, then replay again
+    journal = Journal.get(path=str(path))
+    journal.record('https://c', 'posted')
+    journal.close()
+    journal = Journal.get(path=str(path))
+
+    # No record is lost to the new one being written onto the tail
+    assert journal.get_state('https://a') == 'posted'
+    assert journal.get_state('https://c') == 'posted'
+    assert journal.get_state('https://b') == ('posted' if tail.endswith('}') else None)
+    journal.close()
+
+
+# Compact at checkpoint
+def test_compact_keeps_only_given_urls(tmp_path):
+
+    # Record states, compact keeping a single url
+    path = tmp_path / 'journal.jsonl'
+    journal = Journal.get(path=str(path))
+    for url in ('https://a', 'https://b'):
+        journal.record(url, 'scraped')
+        journal.record(url, 'failed')
+    journal.compact(keep_urls=['https://b'])
+    journal.close()
+
+    # Journal holds a single record, for the kept url
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [(record['url'], record['state']) for record in records] == [('https://b', 'failed')]
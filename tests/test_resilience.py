@@ -0,0 +1,182 @@
+# --- Imports ---
+
+# Standard
+import asyncio
+import threading
+import time
+
+# Third party
+import pytest
+
+# Local
+import resilience as resilience_module
+from resilience import CircuitBreaker, RateLimiter
+
+
+# --- The FakeClock class ---
+class FakeClock:
+    """
+    Stand-in for the time module, whose monotonic clock only moves when
+    told to.
+    """
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self):
+        self.now = 1_000.0
+
+
+    # --- Public methods ---
+
+    # Get monotonic time
+    def monotonic(self) -> float:
+        return self.now
+
+
+# Fake clock fixture
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience_module, 'time', clock)
+    return clock
+
+
+# Open a circuit breaker
+def open_breaker(cooldown:float = 60) -> CircuitBreaker:
+    circuit_breaker = CircuitBreaker.get(failure_rate=0.5, window=2, min_calls=2, cooldown=cooldown)
+    circuit_breaker.record_failure()
+    circuit_breaker.record_failure()
+    return circuit_breaker
+
+
+# Refill rate limiter tokens
+def test_rate_limiter_refills_tokens_per_host(clock):
+
+    # Spend a host's burst (a closed limiter raises instead of waiting)
+    rate_limiter = RateLimiter.get(rate=2, burst=2)
+    rate_limiter.acquire('https://a.com/1')
+    rate_limiter.acquire('https://a.com/2')
+    rate_limiter.close()
+    with pytest.raises(RuntimeError):
+        rate_limiter.acquire('https://a.com/3')
+
+    # Other hosts have their own bucket
+    rate_limiter.acquire('https://b.com/1')
+
+    # Host gets a token back after 1/rate seconds
+    clock.now += 0.5
+    rate_limiter.acquire('https://a.com/3')
+    with pytest.raises(RuntimeError):
+        rate_limiter.acquire('https://a.com/4')
+
+
+# Open circuit on failures
+def test_circuit_breaker_opens_on_failure_rate(clock):
+
+    # Successes keep circuit closed
+    circuit_breaker = CircuitBreaker.get(failure_rate=0.5, window=4, min_calls=4, cooldown=60)
+    for _ in range(3):
+        circuit_breaker.record_success()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == 'closed'
+
+    # Failure rate reaching threshold opens it
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == 'open'
+
+
+# Try a single call once cooldown is over
+def test_circuit_breaker_lets_a_single_trial_through(clock):
+
+    # Wait out cooldown, let a trial call through
+    circuit_breaker = open_breaker(cooldown=60)
+    clock.now += 60
+    circuit_breaker.before_call()
+    assert circuit_breaker.state == 'half-open'
+
+    # Other calls wait for the trial's outcome
+    waiter = threading.Thread(target=circuit_breaker.before_call)
+    waiter.start()
+    waiter.join(0.3)
+    assert waiter.is_alive()
+
+    # Trial success closes circuit, letting them through
+    circuit_breaker.record_success()
+    waiter.join(3)
+    assert not waiter.is_alive()
+    assert circuit_breaker.state == 'closed'
+
+
+# Fail trial
+def test_circuit_breaker_reopens_on_failed_trial(clock):
+    circuit_breaker = open_breaker(cooldown=60)
+    clock.now += 60
+    circuit_breaker.before_call()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == 'open'
+
+
+# Release trial
+def test_circuit_breaker_release_call_frees_trial(clock):
+
+    # Let a trial call through, then release it without an outcome
+    circuit_breaker = open_breaker(cooldown=60)
+    clock.now += 60
+    circuit_breaker.before_call()
+    circuit_breaker.release_call()
+
+    # Next call becomes the trial, circuit stays half-open
+    circuit_breaker.before_call()
+    assert circuit_breaker.state == 'half-open'
+
+
+# Wake up waiters on close
+def test_close_wakes_up_sync_waiters():
+
+    # Pause callers on an open breaker and an empty rate limiter bucket
+    circuit_breaker = open_breaker(cooldown=60)
+    rate_limiter = RateLimiter.get(rate=0.01, burst=1)
+    rate_limiter.acquire('https://a.com/')
+    errors = []
+    def wait(function, *args):
+        try:
+            function(*args)
+        except RuntimeError as e:
+            errors.append(str(e))
+    waiters = [threading.Thread(target=wait, args=(circuit_breaker.before_call,)),
+               threading.Thread(target=wait, args=(rate_limiter.acquire, 'https://a.com/'))]
+    for waiter in waiters:
+        waiter.start()
+
+    # Closing them makes waiters raise right away
+    time.sleep(0.2)
+    started_at = time.monotonic()
+    circuit_breaker.close()
+    rate_limiter.close()
+    for waiter in waiters:
+        waiter.join(3)
+    assert time.monotonic() - started_at < 1
+    assert sorted(errors) == ['Circuit breaker is closed.', 'Rate limiter is closed.']
+
+
+# Wake up coroutines on close
+def test_close_wakes_up_async_waiters():
+
+    # Pause coroutines on an open breaker and an empty rate limiter bucket,
+    # then close them
+    async def main():
+        circuit_breaker = open_breaker(cooldown=60)
+        rate_limiter = RateLimiter.get(rate=0.01, burst=1)
+        await rate_limiter.acquire_async('https://a.com/')
+        waiters = [asyncio.create_task(circuit_breaker.before_call_async()),
+                   asyncio.create_task(rate_limiter.acquire_async('https://a.com/'))]
+        await asyncio.sleep(0.2)
+        circuit_breaker.close()
+        rate_limiter.close()
+        return await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), 3)
+
+    # Both raise instead of sitting through cooldown
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ['Circuit breaker is closed.',
+                                                   'Rate limiter is closed.']
@@ -0,0 +1,76 @@
+# --- Imports ---
+
+# Third party
+import pytest
+from requests.adapters import HTTPAdapter
+
+# Local
+import scraping as scraping_module
+from scraping import OfferParseError, Scraper
+
+
+# Parse offer page
+def test_parse_amazon_offer_page_reads_fake_offer():
+
+    # Parse the fake offer page fixture
+    with open('./resources/fake/offer-page.html', encoding='utf-8') as file:
+        fields = Scraper.parse_amazon_offer_page(file.read())
+
+    # Every field comes out parsed (prices in BRL, discount as a fraction)
+    assert fields['title'] == 'Fone de Ouvido Sem Fio Bluetooth com Cancelamento de Ruído, Preto'
+    assert fields['price_now'] == pytest.approx(1299.90)
+    assert fields['price_before'] == pytest.approx(1733.20)
+    assert fields['discount_rate'] == pytest.approx(0.25)
+
+
+# Size HTTP connection pool
+def test_http_pool_matches_scraper_workers(monkeypatch):
+
+    # Record the pool size of every HTTP adapter created
+    pool_sizes = []
+    class RecordingHTTPAdapter(HTTPAdapter):
+        def __init__(self, *args, **kwargs):
+            pool_sizes.append(kwargs.get('pool_maxsize'))
+            super().__init__(*args, **kwargs)
+    monkeypatch.setattr(scraping_module, 'HTTPAdapter', RecordingHTTPAdapter)
+
+    # Set up a scraper with more workers than webdrivers
+    scraper = Scraper.get(webdriver_pool_size=1, max_workers=8)
+    try:
+
+        # Amazon requests go through an adapter pooling a connection per
+        # worker
+        assert isinstance(scraper.session.get_adapter('https://www.amazon.com.br/'),
+                          RecordingHTTPAdapter)
+        assert pool_sizes == [8]
+    finally:
+        scraper.close()
+
+
+# Give up on unparseable offers
+def test_unparseable_offer_is_not_retried_nor_counted(monkeypatch):
+
+    # Set up a scraper whose pages always lack required fields (script
+    # extraction finds no price, e.g. unavailable offer)
+    class FakeDriver:
+        def execute_script(self, script):
+            return {'title': 'Offer', 'thumbnail_url': 'https://img', 'captcha': False}
+    scraper = Scraper.get(engine='selenium', max_retries=3)
+    attempts = []
+    def scrape_fields_with_selenium(url):
+        attempts.append(url)
+        return scraper._extract_fields_with_script(FakeDriver())
+    monkeypatch.setattr(scraper, '_scrape_fields_with_selenium', scrape_fields_with_selenium)
+    outcomes = []
+    monkeypatch.setattr(scraper.circuit_breaker, 'record_failure', lambda: outcomes.append('failure'))
+    monkeypatch.setattr(scraper.circuit_breaker, 'record_success', lambda: outcomes.append('success'))
+    try:
+
+        # Offer fails right away, and circuit breaker records nothing
+        with pytest.raises(OfferParseError):
+            scraper._scrape_with_retries('https://www.amazon.com.br/dp/B000000000')
+        assert len(attempts) == 1
+        assert outcomes == []
+        assert scraper.circuit_breaker.state == 'closed'
+    finally:
+        scraper.close()
@@ -0,0 +1,94 @@
+# --- Imports ---
+
+# Third party
+import pytest
+import requests
+
+# Local
+from urls import UrlResolver
+
+
+# --- The FakeSession class ---
+class FakeSession:
+    """
+    Stand-in for requests.Session answering HEAD requests from a
+    {url: redirect location} map (urls missing from it are no redirects),
+    failing the first failures requests.
+    """
+
+    # --- Magic methods ---
+
+    # __init__
+    def __init__(self, redirects:dict, failures:int = 0):
+
+        # Set object attributes
+        self.redirects = redirects
+        self.failures = failures
+        self.requested_urls = []
+
+
+    # --- Public methods ---
+
+    # HEAD request
+    def head(self, url:str, allow_redirects:bool, timeout:float):
+        self.requested_urls.append(url)
+        if self.failures:
+            self.failures -= 1
+            raise requests.ConnectionError('Network hiccup.')
+        response = requests.Response()
+        response.status_code = 301 if url in self.redirects else 200
+        if url in self.redirects:
+            response.headers['Location'] = self.redirects[url]
+        return response
+
+
+# Extract ASIN
+@pytest.mark.parametrize('url, asin', [
+    ('https://www.amazon.com.br/dp/B0ABCDEFGH', 'B0ABCDEFGH'),
+    ('https://www.amazon.com.br/Fone-Bluetooth/dp/B0ABCDEFGH/ref=sr_1_1?th=1', 'B0ABCDEFGH'),
+    ('https://www.amazon.com.br/gp/product/B0ABCDEFGH', 'B0ABCDEFGH'),
+    ('https://www.amazon.com.br/s?k=fone', None),
+])
+def test_extract_asin(url, asin):
+    assert UrlResolver.extract_asin(url) == asin
+
+
+# Resolve short link
+def test_resolve_follows_short_link_redirects():
+
+    # Short link redirects twice before reaching the product page
+    session = FakeSession({'https://amzn.to/abc': 'https://www.amazon.com.br/deal/abc',
+                           'https://www.amazon.com.br/deal/abc': '/Fone/dp/B0ABCDEFGH?tag=x'})
+    resolver = UrlResolver.get(session=session)
+
+    # Short link resolves to canonical url, other urls pass through
+    assert resolver.resolve('https://amzn.to/abc') == 'https://www.amazon.com.br/dp/B0ABCDEFGH'
+    assert resolver.resolve(' https://www.amazon.com.br/x/dp/B0ABCDEFGH ') \
+           == 'https://www.amazon.com.br/dp/B0ABCDEFGH'
+    assert resolver.resolve('https://example.com/') == 'https://example.com/'
+
+
+# Memoize short links
+def test_get_asin_memoizes_resolved_short_links():
+
+    # Resolve the same short link many times
+    session = FakeSession({'https://amzn.to/abc': 'https://www.amazon.com.br/dp/B0ABCDEFGH'})
+    resolver = UrlResolver.get(session=session)
+    resolved_urls = resolver.resolve_many(['https://amzn.to/abc']*3)
+
+    # Redirects are followed once
+    assert resolved_urls == ['https://www.amazon.com.br/dp/B0ABCDEFGH']*3
+    assert session.requested_urls.count('https://amzn.to/abc') == 1
+
+
+# Retry failed short links
+def test_get_asin_does_not_memoize_failed_resolutions():
+
+    # First resolution hits a network error
+    session = FakeSession({'https://amzn.to/abc': 'https://www.amazon.com.br/dp/B0ABCDEFGH'},
+                          failures=1)
+    resolver = UrlResolver.get(session=session)
+    assert resolver.get_asin('https://amzn.to/abc') is None
+
+    # Next one tries again, and resolves it
+    assert resolver.get_asin('https://amzn.to/abc') == 'B0ABCDEFGH'